@@ -0,0 +1,384 @@
+"""
+pick_daily_candidates için çok günlü, vektörel backtest.
+
+Mum deposundaki (CANDLE_DB) tüm günlük mumlar ve günlük orderflow özetleri
+(orderflow_daily tablosu, her taramada main.py tarafından doldurulur) bir kez
+(sembol x gün) matrislerine dizilir. analyze_altcoin_for_daily /
+pick_daily_candidates'taki trend, net delta, whale ve "buyer var ama hareket yok"
+kuralları tüm günlere aynı anda array işlemleriyle uygulanır; her gün için
+LONG/SHORT/BUYER listelerinin ilk N'i seçilip ileri getirileri hesaplanır.
+Gün aralığı parçalara bölünüp süreç havuzunda işlenir.
+
+Canlı taramaya göre farklar:
+- Sinyal günlük mumun kapanışında değerlendirilir (last = kapanış, 24h değişim = kapanış/açılış),
+  getiri o kapanıştan h gün sonraki kapanışa göredir. SHORT getirisi işareti çevrilerek verilir.
+- Evren her gün o günün quote hacmine göre ilk --top sembol (BTC/ETH hariç), canlıdaki gibi.
+- MCAP sınıfı geçmişte bilinmediği için mcap cache'indeki güncel değerler kullanılır.
+- Orderflow kaydı günü kapsamalı: span_sec'i --min-flow-hours'tan kısa satırlar (ör. varsayılan
+  ALT_ORDERFLOW_WINDOW_MIN=0 ile son TRADES_LIMIT trade, gün içinde birkaç saniyelik örnek) kullanılmaz
+  ve sayısı raporlanır. Günlük kayıt için ALT_ORDERFLOW_WINDOW_MIN=1440 ya da ALT_ORDERFLOW_SOURCE=taker.
+- Orderflow kaydı olmayan günlerde sembol seçilemez. --proxy ile bu günlerde mumdan kaba bir
+  tahmin kullanılır: net delta ≈ quote hacim x (2*kapanış - yüksek - düşük) / (yüksek - düşük),
+  whale ≈ bu tahminin ilgili taraftaki büyüklüğü.
+
+    python backtest.py --start 2025-01-01 --end 2025-12-31 --horizons 1,3,7 --out backtest.json
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+import main
+from indicators import ema_batch
+
+LISTS = ("long", "short", "buyer")
+MIN_CANDLES = 30  # fetch_altcoin_inputs ile aynı: daha az mumu olan sembol taranmaz
+MIN_FLOW_HOURS = 20.0  # Orderflow satırı en az bu kadar saati kapsamalı (günlük eşikler bu ölçekte)
+
+
+# ------------ Veri ------------
+
+def _day_ms(text):
+    return int(datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _ffill(mat):
+    """Satır içi boşlukları (ilk geçerli değerden sonra) bir önceki değerle doldurur."""
+    idx = np.where(~np.isnan(mat), np.arange(mat.shape[1])[None, :], 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    out = mat[np.arange(mat.shape[0])[:, None], idx]
+    out[np.cumsum(~np.isnan(mat), axis=1) == 0] = np.nan
+    return out
+
+
+def load_universe(store, bar="1D", proxy=False, min_flow_hours=MIN_FLOW_HOURS):
+    """
+    Depodaki tüm USDT spot mumları ve orderflow özetleri → (sembol x gün) matrisleri.
+    Dönüş sözlüğü: inst_ids, days (ms), open/high/low/close/vol_quote, net_delta,
+    buy_whale, sell_whale, n_candles (o güne kadarki mum sayısı), flow_used / flow_short
+    (kullanılan / min_flow_hours'tan kısa süreyi kapsadığı için atlanan orderflow satırı).
+    """
+    rows = [r for r in store.all_closed(bar) if r[0].endswith("-USDT") and r[0] not in ("BTC-USDT", "ETH-USDT")]
+    inst_ids = sorted({r[0] for r in rows})
+    sym_idx = {s: i for i, s in enumerate(inst_ids)}
+    days = np.array(sorted({r[1] for r in rows}), dtype=np.int64)
+    shape = (len(inst_ids), len(days))
+
+    cols = {name: np.full(shape, np.nan) for name in ("open", "high", "low", "close", "vol_quote")}
+    if rows:
+        si = np.fromiter((sym_idx[r[0]] for r in rows), dtype=np.int64, count=len(rows))
+        di = np.searchsorted(days, np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows)))
+        vals = np.array([r[2:] for r in rows], dtype=float)
+        for j, name in enumerate(("open", "high", "low", "close", "vol_quote")):
+            cols[name][si, di] = vals[:, j]
+    n_candles = np.cumsum(~np.isnan(cols["close"]), axis=1)
+
+    flow = {name: np.full(shape, np.nan) for name in ("net_delta", "buy_whale", "sell_whale")}
+    of_rows = [r for r in store.all_orderflow() if r[0] in sym_idx]
+    min_span = min_flow_hours * 3600
+    flow_short = sum(1 for r in of_rows if not r[5] or r[5] < min_span)
+    of_rows = [r[:5] for r in of_rows if r[5] and r[5] >= min_span]
+    if of_rows:
+        ts_arr = np.fromiter((r[1] for r in of_rows), dtype=np.int64, count=len(of_rows))
+        di = np.searchsorted(days, ts_arr)
+        ok = (di < len(days)) & (days[np.minimum(di, len(days) - 1)] == ts_arr)
+        si = np.fromiter((sym_idx[r[0]] for r in of_rows), dtype=np.int64, count=len(of_rows))
+        vals = np.array([r[2:] for r in of_rows], dtype=float)
+        for j, name in enumerate(("net_delta", "buy_whale", "sell_whale")):
+            flow[name][si[ok], di[ok]] = vals[ok, j]
+
+    if proxy:
+        rng = cols["high"] - cols["low"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            clv = np.where(rng > 0, (2 * cols["close"] - cols["high"] - cols["low"]) / rng, 0.0)
+        est = cols["vol_quote"] * clv
+        missing = np.isnan(flow["net_delta"])
+        flow["net_delta"][missing] = est[missing]
+        flow["buy_whale"][missing] = np.clip(est, 0, None)[missing]
+        flow["sell_whale"][missing] = np.clip(-est, 0, None)[missing]
+
+    return dict(
+        inst_ids=inst_ids, days=days, n_candles=n_candles, flow_used=len(of_rows), flow_short=flow_short,
+        **cols, **flow,
+    )
+
+
+def symbol_thresholds(inst_ids, mcap_map):
+    """Sembol başına (medium whale, net delta +, net delta -) eşik vektörleri."""
+    medium = np.empty(len(inst_ids))
+    nd_pos = np.empty(len(inst_ids))
+    nd_neg = np.empty(len(inst_ids))
+    for i, inst_id in enumerate(inst_ids):
+        cls = main.classify_mcap(inst_id.split("-")[0], mcap_map)
+        medium[i] = main.whale_thresholds(cls)[0]
+        nd_pos[i], nd_neg[i] = main.net_delta_thresholds(cls)
+    return medium, nd_pos, nd_neg
+
+
+def forward_returns(close, horizons):
+    """(H, S, D): h gün sonraki kapanışa göre getiri; veri yoksa NaN."""
+    out = np.full((len(horizons),) + close.shape, np.nan)
+    for i, h in enumerate(horizons):
+        if h < close.shape[1]:
+            out[i, :, :-h] = close[:, h:] / close[:, :-h] - 1.0
+    return out
+
+
+# ------------ Kurallar (süreç havuzunda) ------------
+
+_W = {}
+
+
+def _init_worker(arrays):
+    _W.clear()
+    _W.update(arrays)
+
+
+def _top_k(ok, key, k):
+    """Gün başına (sütun) ok olanlar içinden key'e göre en büyük k: (k, D) sembol indeksi + geçerlilik."""
+    score = np.where(ok, key, -np.inf)
+    # stable: eşitlikte sembol sırası korunur (canlıdaki list.sort gibi)
+    order = np.argsort(-score, axis=0, kind="stable")[:k]
+    valid = np.take_along_axis(ok, order, axis=0)
+    return order, valid
+
+
+def evaluate_chunk(start, stop):
+    """
+    [start, stop) gün dilimi için LONG/SHORT/BUYER seçimleri ve ileri getirileri.
+    Dönüş: {liste: (sembol indeksleri (k, d), geçerlilik (k, d), getiriler (H, k, d))}
+    """
+    w = _W
+    sl = slice(start, stop)
+    last = w["close"][:, sl]
+    ema20 = w["ema20"][:, sl]
+    nd = w["net_delta"][:, sl]
+    buy_w = w["buy_whale"][:, sl]
+    sell_w = w["sell_whale"][:, sl]
+    medium = w["medium"][:, None]
+
+    # Günün evreni: o gün işlem görmüş, yeterli geçmişi olan ve hacimde ilk --top içindeki semboller
+    vq = np.where(np.isnan(w["vol_quote"][:, sl]), -np.inf, w["vol_quote"][:, sl])
+    rank = np.argsort(np.argsort(-vq, axis=0, kind="stable"), axis=0, kind="stable")
+    live = (rank < w["top"]) & (w["n_candles"][:, sl] >= MIN_CANDLES) & ~np.isnan(last) & ~np.isnan(ema20)
+    live &= ~np.isnan(nd)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        up = last > ema20 * 1.01
+        down = last < ema20 * 0.99
+        flat = ~up & ~down
+        has_buy = buy_w >= medium
+        has_sell = sell_w >= medium
+        opn = w["open"][:, sl]
+        pct = np.where(opn > 0, (last - opn) / opn * 100.0, np.nan)
+
+        long_ok = live & (up | flat) & (nd >= w["nd_pos"][:, None]) & has_buy
+        short_ok = live & (down | flat) & (nd <= w["nd_neg"][:, None]) & has_sell
+        near_ema = np.abs(last - ema20) / ema20 < 0.01
+        low_move = np.abs(pct) < 2.0  # NaN → False (canlıda pct None ise low_move False)
+        buyer_ok = live & has_buy & (nd > 0) & (near_ema | low_move)
+
+    k = w["max_each"]
+    picks = {
+        "long": _top_k(long_ok, nd, k),
+        "short": _top_k(short_ok, -nd, k),
+        "buyer": _top_k(buyer_ok, np.where(has_buy, buy_w, 0.0), k),
+    }
+
+    fwd = w["fwd"][:, :, sl]
+    out = {}
+    for name, (order, valid) in picks.items():
+        rets = np.take_along_axis(fwd, np.broadcast_to(order, (fwd.shape[0],) + order.shape), axis=1)
+        if name == "short":
+            rets = -rets
+        out[name] = (order, valid, rets)
+    return out
+
+
+def _chunks(start, stop, n):
+    step = max(1, -(-(stop - start) // n))
+    return [(a, min(a + step, stop)) for a in range(start, stop, step)]
+
+
+# ------------ Özet ------------
+
+def summarize(picks, horizons):
+    """Liste ve ufuk başına işlem sayısı, ortalama/medyan getiri, isabet oranı; h=1 için bileşik getiri."""
+    summary = {}
+    for name in LISTS:
+        order, valid, rets = picks[name]
+        per_h = {}
+        for hi, h in enumerate(horizons):
+            r = rets[hi][valid & ~np.isnan(rets[hi])]
+            row = {
+                "trades": int(r.size),
+                "mean_pct": float(r.mean() * 100) if r.size else None,
+                "median_pct": float(np.median(r) * 100) if r.size else None,
+                "hit_rate": float((r > 0).mean()) if r.size else None,
+            }
+            if h == 1:
+                # Her gün seçilenlere eşit ağırlık, ertesi güne kadar tut
+                m = valid & ~np.isnan(rets[hi])
+                cnt = m.sum(axis=0)
+                daily = np.where(cnt > 0, np.where(m, rets[hi], 0.0).sum(axis=0) / np.maximum(cnt, 1), 0.0)
+                row["compound_pct"] = float((np.prod(1.0 + daily) - 1.0) * 100)
+                row["active_days"] = int((cnt > 0).sum())
+            per_h[str(h)] = row
+        summary[name] = per_h
+    return summary
+
+
+def pick_log(data, start, picks, horizons):
+    """Gün gün seçimler: [{"date", "long": [{"inst_id", "ret": {h: %}}], ...}]"""
+    days = data["days"]
+    log = []
+    n_days = picks["long"][0].shape[1]
+    for d in range(n_days):
+        entry = {"date": datetime.fromtimestamp(days[start + d] / 1000, timezone.utc).strftime("%Y-%m-%d")}
+        for name in LISTS:
+            order, valid, rets = picks[name]
+            entry[name] = [
+                {
+                    "inst_id": data["inst_ids"][order[j, d]],
+                    "ret": {
+                        str(h): (None if np.isnan(rets[hi, j, d]) else round(float(rets[hi, j, d]) * 100, 3))
+                        for hi, h in enumerate(horizons)
+                    },
+                }
+                for j in range(order.shape[0]) if valid[j, d]
+            ]
+        if any(entry[name] for name in LISTS):
+            log.append(entry)
+    return log
+
+
+def run_backtest(data, mcap_map, start_ms=None, end_ms=None, horizons=(1, 3, 7), top=main.TOP_LIMIT_DAILY,
+                 max_each=3, workers=None):
+    """Yüklenmiş evren üzerinde backtest → (başlangıç gün indeksi, seçimler)."""
+    days = data["days"]
+    start = int(np.searchsorted(days, start_ms)) if start_ms is not None else 0
+    stop = int(np.searchsorted(days, end_ms, side="right")) if end_ms is not None else len(days)
+    if stop <= start:
+        return start, None
+
+    # EMA tüm geçmiş üzerinden (canlıdaki kalıcı state gibi); ara boşluklar bir önceki kapanışla dolar
+    close_ff = _ffill(data["close"])
+    medium, nd_pos, nd_neg = symbol_thresholds(data["inst_ids"], mcap_map)
+    arrays = {
+        "close": data["close"],
+        "open": data["open"],
+        "vol_quote": data["vol_quote"],
+        "n_candles": data["n_candles"],
+        "net_delta": data["net_delta"],
+        "buy_whale": data["buy_whale"],
+        "sell_whale": data["sell_whale"],
+        "ema20": ema_batch(close_ff, (20,))[20],
+        "fwd": forward_returns(close_ff, horizons),
+        "medium": medium,
+        "nd_pos": nd_pos,
+        "nd_neg": nd_neg,
+        "top": top - 2,  # canlı evren BTC/ETH dahil top N, ikisi sonra çıkarılır
+        "max_each": max_each,
+    }
+
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(start, stop, workers)
+    if workers <= 1 or len(chunks) <= 1:
+        _init_worker(arrays)
+        parts = [evaluate_chunk(a, b) for a, b in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=len(chunks), initializer=_init_worker, initargs=(arrays,)) as pool:
+            parts = list(pool.map(evaluate_chunk, *zip(*chunks)))
+
+    picks = {
+        name: (
+            np.concatenate([p[name][0] for p in parts], axis=1),
+            np.concatenate([p[name][1] for p in parts], axis=1),
+            np.concatenate([p[name][2] for p in parts], axis=2),
+        )
+        for name in LISTS
+    }
+    return start, picks
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="pick_daily_candidates backtest'i (mum deposu + orderflow_daily)")
+    parser.add_argument("--db", default=main.CANDLE_DB, help="Mum deposu (varsayılan CANDLE_DB)")
+    parser.add_argument("--start", help="YYYY-MM-DD (dahil)")
+    parser.add_argument("--end", help="YYYY-MM-DD (dahil)")
+    parser.add_argument("--horizons", default="1,3,7", help="Virgülle ayrılmış ileri getiri ufukları (gün)")
+    parser.add_argument("--top", type=int, default=main.TOP_LIMIT_DAILY, help="Günlük evren boyutu (BTC/ETH dahil)")
+    parser.add_argument("--max-each", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None, help="Süreç sayısı (varsayılan: CPU sayısı)")
+    parser.add_argument("--proxy", action="store_true", help="Orderflow kaydı olmayan günlerde mumdan tahmin kullan")
+    parser.add_argument(
+        "--min-flow-hours", type=float, default=MIN_FLOW_HOURS,
+        help="Bu kadar saatten kısa süreyi kapsayan orderflow satırlarını kullanma",
+    )
+    parser.add_argument("--out", help="Özet ve gün gün seçimleri JSON olarak yaz")
+    args = parser.parse_args()
+
+    horizons = tuple(int(h) for h in args.horizons.split(",") if h.strip())
+    t0 = time.perf_counter()
+    data = load_universe(main.CandleStore(args.db), "1D", proxy=args.proxy, min_flow_hours=args.min_flow_hours)
+    t_load = time.perf_counter() - t0
+    if data["flow_short"]:
+        print(
+            f"⚠ {data['flow_short']} orderflow satırı {args.min_flow_hours:g} saatten kısa süreyi kapsıyor, "
+            f"kullanılmadı ({data['flow_used']} satır kullanıldı)."
+            + (" Bu günlerde mumdan tahmin kullanılıyor." if args.proxy else "")
+        )
+    mcap_map = main.McapCache(main.MCAP_CACHE_FILE).mcap_map()
+
+    t1 = time.perf_counter()
+    start, picks = run_backtest(
+        data, mcap_map,
+        start_ms=_day_ms(args.start) if args.start else None,
+        end_ms=_day_ms(args.end) if args.end else None,
+        horizons=horizons, top=args.top, max_each=args.max_each, workers=args.workers,
+    )
+    t_run = time.perf_counter() - t1
+    if picks is None:
+        print("Seçilen aralıkta mum yok.")
+        return
+
+    n_days = picks["long"][0].shape[1]
+    print(
+        f"{len(data['inst_ids'])} sembol x {n_days} gün "
+        f"(yükleme {t_load:.2f} sn, hesap {t_run:.2f} sn)"
+    )
+    summary = summarize(picks, horizons)
+    for name in LISTS:
+        for h, row in summary[name].items():
+            if not row["trades"]:
+                print(f"{name.upper():6} {h:>3}g: işlem yok")
+                continue
+            extra = f", bileşik {row['compound_pct']:.1f}%" if "compound_pct" in row else ""
+            print(
+                f"{name.upper():6} {h:>3}g: {row['trades']} işlem, ort {row['mean_pct']:.2f}%, "
+                f"medyan {row['median_pct']:.2f}%, isabet {row['hit_rate'] * 100:.0f}%{extra}"
+            )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "symbols": len(data["inst_ids"]),
+                    "days": n_days,
+                    "horizons": list(horizons),
+                    "flow_rows": {"used": data["flow_used"], "too_short": data["flow_short"]},
+                    "summary": summary,
+                    "picks": pick_log(data, start, picks, horizons),
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,132 @@
+"""
+Uçtan uca tarama benchmark'ı (canlı API yok).
+
+Her evren boyutu için replay_server.StandInServer başlatılır, main.py ayrı bir
+süreçte bu sunucuya yönlendirilerek çalıştırılır ve ölçülür:
+duvar süresi, istek sayısı, 429/hata sayısı, istemci tarafı p50/p99 çağrı süresi.
+
+    python bench.py --sizes 80,300,700 --latency-ms 40 --jitter-ms 20 --out bench.json
+    python bench.py --baseline bench.json --max-regress 0.2   # %20'den fazla yavaşlarsa çıkış kodu 1
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from replay_server import StandInServer, SyntheticMarket
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_once(server, size, data_dir, extra_env=None):
+    stats_file = os.path.join(data_dir, "http_stats.json")
+    env = dict(os.environ)
+    env.update(server.env())
+    env.update(
+        {
+            "SCAN_BUDGET": str(size),
+            "DATA_DIR": data_dir,
+            "HTTP_STATS_FILE": stats_file,
+            "TELEGRAM_TOKEN": "bench",
+            "CHAT_ID": "1",
+        }
+    )
+    env.update(extra_env or {})
+
+    before = dict(server.counts)
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, os.path.join(HERE, "main.py")],
+        env=env, cwd=data_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        print(proc.stdout[-3000:])
+        raise RuntimeError(f"main.py hata ile bitti (boyut {size})")
+
+    diff = {k: v - before.get(k, 0) for k, v in server.counts.items()}
+    with open(stats_file, encoding="utf-8") as f:
+        http_stats = json.load(f)
+    host = server.base_url.split("//", 1)[1]
+    st = http_stats.get(host, {})
+    return {
+        "size": size,
+        "wall_s": round(wall, 3),
+        "requests": sum(v for (_, kind), v in diff.items() if kind == "ok"),
+        "injected_429": sum(v for (_, kind), v in diff.items() if kind == "429"),
+        "injected_errors": sum(v for (_, kind), v in diff.items() if kind == "error"),
+        "new_connections": st.get("connections"),
+        "p50_ms": round(st.get("p50_ms", 0.0), 2),
+        "p99_ms": round(st.get("p99_ms", 0.0), 2),
+        "telegram_messages": len(server.sent_messages),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uçtan uca tarama benchmark'ı")
+    parser.add_argument("--sizes", default="80,300,700", help="Virgülle ayrılmış evren boyutları")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--warm", action="store_true", help="Aynı veri diziniyle ikinci (sıcak) çalışmayı da ölç")
+    parser.add_argument("--rate-limit-safety", help="RATE_LIMIT_SAFETY (büyük değer = limitsiz, saf kod hızı)")
+    parser.add_argument("--env", action="append", default=[], help="main.py'ye ek ortam değişkeni (AD=DEĞER)")
+    parser.add_argument("--out", help="Sonuçları JSON olarak yaz")
+    parser.add_argument("--baseline", help="Karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument("--max-regress", type=float, default=0.2, help="İzin verilen yavaşlama oranı")
+    args = parser.parse_args()
+
+    extra_env = dict(kv.split("=", 1) for kv in args.env)
+    if args.rate_limit_safety:
+        extra_env["RATE_LIMIT_SAFETY"] = args.rate_limit_safety
+
+    results = []
+    for size in [int(x) for x in args.sizes.split(",") if x]:
+        server = StandInServer(
+            SyntheticMarket(size), latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+            rate_429=args.rate_429, error_rate=args.error_rate,
+        ).start()
+        try:
+            with tempfile.TemporaryDirectory(prefix="bench-") as data_dir:
+                runs = [("cold", run_once(server, size, data_dir, extra_env))]
+                if args.warm:
+                    runs.append(("warm", run_once(server, size, data_dir, extra_env)))
+        finally:
+            server.shutdown()
+            server.server_close()
+        for phase, res in runs:
+            res["phase"] = phase
+            results.append(res)
+            print(
+                f"{size:>5} sembol [{phase}]: {res['wall_s']:.2f} sn, {res['requests']} istek, "
+                f"{res['new_connections']} bağlantı, p50 {res['p50_ms']:.1f} ms, p99 {res['p99_ms']:.1f} ms, "
+                f"429: {res['injected_429']}, hata: {res['injected_errors']}"
+            )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            base = {(r["size"], r.get("phase", "cold")): r for r in json.load(f)}
+        failed = False
+        for r in results:
+            b = base.get((r["size"], r["phase"]))
+            if not b:
+                continue
+            ratio = r["wall_s"] / b["wall_s"] if b["wall_s"] else 1.0
+            flag = "REGRESYON" if ratio > 1 + args.max_regress else "ok"
+            print(f"{r['size']:>5} [{r['phase']}]: {b['wall_s']:.2f} → {r['wall_s']:.2f} sn ({ratio:.2f}x) {flag}")
+            failed |= flag != "ok"
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
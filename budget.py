@@ -0,0 +1,149 @@
+"""
+Çalışma başına süre bütçesi ve hedge (yedek istek) gecikmesi.
+
+RunBudget: toplam süre aşamalara pay olarak dağıtılır; her aşamanın bitişi sabit bir kontrol
+noktasıdır (başlangıç + toplam × o aşamaya kadarki payların toplamı). Hızlı biten aşamanın
+artan süresi böylece sonrakilere kalır. Payların toplamı 1'den küçükse kalan kısım rapor
+oluşturma / gönderim payıdır. HTTP katmanı remaining() ile istek timeout'larını ve backoff
+beklemelerini kırpar; süre dolunca yeni istek yapılmaz.
+
+LatencyWindow: endpoint başına son başarılı denemelerin süreleri. Bir istek bu sürelerin
+pct. yüzdeliğini aşınca aynı isteğin bir kopyası gönderilir, önce gelen yanıt kullanılır.
+
+    budget = RunBudget(600, {"universe": 0.15, "majors": 0.2, "scan": 0.55})
+    with budget.stage("scan"):
+        left = budget.remaining()      # None = bütçe yok
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+def parse_shares(text):
+    """"universe=0.15,majors=0.2,scan=0.55" → {"universe": 0.15, ...} (sıra korunur)."""
+    shares = {}
+    for part in (text or "").split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            shares[name.strip()] = float(value)
+    if sum(shares.values()) > 1.0 + 1e-9:
+        raise ValueError(f"Aşama paylarının toplamı 1'i geçiyor: {text}")
+    return shares
+
+
+class RunBudget:
+    """total_sec <= 0 → bütçe yok: remaining() None, expired() hiçbir zaman True değil."""
+
+    def __init__(self, total_sec, shares=None, clock=time.monotonic):
+        self.total = float(total_sec or 0)
+        self.shares = dict(shares or {})
+        self._clock = clock
+        self.started = clock()
+        self.run_deadline = self.started + self.total if self.enabled else None
+        self._stage = None
+        self._stage_deadline = None
+        self.stages = {}
+        self.skipped = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.total > 0
+
+    def checkpoint(self, name):
+        """Aşamanın bitmesi gereken an (monotonic): önceki aşamaların payları + kendi payı."""
+        cum = 0.0
+        for stage, share in self.shares.items():
+            cum += share
+            if stage == name:
+                return self.started + self.total * cum
+        return self.run_deadline
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield self
+            return
+        prev = (self._stage, self._stage_deadline)
+        self._stage, self._stage_deadline = name, min(self.checkpoint(name), self.run_deadline)
+        t0 = self._clock()
+        try:
+            yield self
+        finally:
+            end = self._clock()
+            # Aynı aşama birden çok blokta açılabilir (ör. universe: tickers + mcap)
+            row = self.stages.setdefault(name, {"used_sec": 0.0, "budget_sec": 0.0, "expired": False})
+            row["used_sec"] += end - t0
+            row["budget_sec"] = self._stage_deadline - self.started
+            row["expired"] = row["expired"] or end >= self._stage_deadline
+            self._stage, self._stage_deadline = prev
+
+    def deadline(self):
+        if not self.enabled:
+            return None
+        return self._stage_deadline if self._stage_deadline is not None else self.run_deadline
+
+    def remaining(self):
+        """Aktif aşamanın (aşama dışında tüm çalışmanın) kalan süresi, sn. Bütçe yoksa None."""
+        deadline = self.deadline()
+        return None if deadline is None else deadline - self._clock()
+
+    def expired(self):
+        left = self.remaining()
+        return left is not None and left <= 0
+
+    def clamp(self, seconds):
+        """Bekleme / timeout'u kalan süreye kırpar (negatif olmaz)."""
+        left = self.remaining()
+        return seconds if left is None else max(0.0, min(seconds, left))
+
+    def close(self):
+        """Çekim bitti: bundan sonra (geride kalan worker'lar dahil) yeni istek yapılmaz."""
+        if self.enabled:
+            self.run_deadline = min(self.run_deadline, self._clock())
+
+    def skip(self, stage, items):
+        with self._lock:
+            self.skipped.setdefault(stage, []).extend(items)
+
+    def summary(self):
+        return {
+            "total_sec": self.total,
+            "elapsed_sec": self._clock() - self.started,
+            "stages": self.stages,
+            "skipped": {k: len(v) for k, v in self.skipped.items()},
+        }
+
+
+class LatencyWindow:
+    """Endpoint başına son `size` başarılı denemenin süresi; hedge gecikmesi bunların yüzdeliği."""
+
+    def __init__(self, pct=95.0, size=256, min_samples=20, floor_sec=0.05):
+        self.pct = pct
+        self.size = size
+        self.min_samples = min_samples
+        self.floor_sec = floor_sec
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, seconds):
+        with self._lock:
+            q = self._samples.get(endpoint)
+            if q is None:
+                q = self._samples[endpoint] = deque(maxlen=self.size)
+            q.append(seconds)
+
+    def hedge_after(self, endpoint):
+        """Yedek isteğin gönderileceği gecikme (sn) ya da yeterli örnek yoksa None."""
+        if self.pct <= 0:
+            return None
+        with self._lock:
+            q = self._samples.get(endpoint)
+            if q is None or len(q) < self.min_samples:
+                return None
+            vals = sorted(q)
+        # nearest-rank yüzdelik
+        return max(self.floor_sec, vals[max(0, math.ceil(self.pct / 100 * len(vals)) - 1)])
@@ -0,0 +1,330 @@
+"""
+Telegram gönderim kuyruğu: rapor taramayı bekletmeden arka plan thread'inde gönderilir.
+
+- Bölme: 4096 karakter sınırı (UTF-16 birimi, Telegram'ın saydığı gibi) satır sınırlarından
+  bölünür; parça sonunda açık kalan Markdown işareti (``` ` * _) kapatılıp sonraki parçada
+  yeniden açılır, böylece hiçbir parça "can't parse entities" hatası almaz. Kod bloğu (```)
+  kendi satırında açılır/kapanır: aynı satırdaki ilk kelime dil etiketi sayılıp kaybolurdu.
+- Fan-out: her parça her sohbete ayrı satır olarak outbox'a yazılır; sohbet başına sıra korunur,
+  bir sohbetin beklemesi diğerlerini durdurmaz.
+- Tekrar deneme: ağ hatası / 5xx için jitter'lı üstel backoff, 429'da Telegram'ın
+  parameters.retry_after süresi kadar bekleme. Markdown ayrıştırılamazsa parça düz metin
+  olarak yeniden gönderilir. Diğer 4xx'ler (sohbet yok, bot engellenmiş) "dead" işaretlenir.
+- Outbox (SQLite): gönderilmeyen satırlar süreç çökse de kalır, sonraki çalışmada ilk iş gönderilir.
+
+    python delivery.py data/telegram_outbox.sqlite           # bekleyen / ölü mesajlar
+"""
+
+import random
+import sqlite3
+import sys
+import threading
+import time
+
+TELEGRAM_MAX_LEN = 4096
+_MARKERS = ("```", "`", "*", "_")
+
+
+def _units(text):
+    """Telegram'ın uzunluk birimi: UTF-16 kod birimi (emoji 2 sayılır)."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def unclosed_marker(text, state=None):
+    """Legacy Markdown: metnin sonunda açık kalan işaret ya da None. Varlıklar iç içe geçmez."""
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == "\\" and state is None:
+            i += 2
+            continue
+        tok = "```" if text.startswith("```", i) else ch if ch in "`*_" else None
+        if tok is None:
+            i += 1
+            continue
+        if state is None:
+            state = tok
+        elif state == tok:
+            state = None
+        i += len(tok)
+    return state
+
+
+def _cut(line, budget):
+    """line[:i] budget'a sığacak en büyük i; mümkünse son boşlukta böler."""
+    lo, hi = 1, len(line)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if _units(line[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    space = line.rfind(" ", 0, lo)
+    return space if space > lo // 2 else lo
+
+
+def _reopen(marker):
+    return marker + "\n" if marker == "```" else marker
+
+
+def _close(marker):
+    return "\n" + marker if marker == "```" else marker
+
+
+def split_message(text, limit=TELEGRAM_MAX_LEN):
+    """Metni limit'e sığan, her biri kendi içinde dengeli Markdown olan parçalara böler."""
+    if _units(text) <= limit:
+        return [text]
+    # Yeniden açma + kapatma işaretleri için pay (``` kendi satırında)
+    budget = limit - 2 * (max(len(m) for m in _MARKERS) + 1)
+    pieces = []
+    for line in text.split("\n"):
+        while _units(line) > budget:
+            i = _cut(line, budget)
+            pieces.append(line[:i])
+            line = line[i:].lstrip(" ")
+        pieces.append(line)
+
+    chunks = []
+    cur = None
+    for piece in pieces:
+        if cur is not None and _units(cur) + 1 + _units(piece) > budget:
+            marker = unclosed_marker(cur)
+            chunks.append(cur + _close(marker) if marker else cur)
+            cur = _reopen(marker) + piece if marker else piece
+        else:
+            cur = piece if cur is None else cur + "\n" + piece
+    if cur is not None and cur.strip():
+        marker = unclosed_marker(cur)
+        chunks.append(cur + _close(marker) if marker else cur)
+    return chunks
+
+
+class Outbox:
+    """Gönderilmeyi bekleyen parçalar (SQLite). Başarılı gönderimde satır silinir."""
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            if path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    parse_mode TEXT,
+                    part INTEGER NOT NULL,
+                    parts INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_at REAL NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    last_error TEXT
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, chat_id, id)")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def add(self, chat_ids, chunks, parse_mode):
+        now = time.time()
+        rows = [
+            (str(chat_id), chunk, parse_mode, i, len(chunks), now)
+            for chat_id in chat_ids
+            for i, chunk in enumerate(chunks, start=1)
+        ]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO outbox (chat_id, text, parse_mode, part, parts, created) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def heads(self):
+        """Sohbet başına sıradaki bekleyen parça (sohbet içi sıra id ile korunur)."""
+        with self._lock:
+            return [
+                dict(r)
+                for r in self._db.execute(
+                    """
+                    SELECT o.* FROM outbox o
+                    JOIN (SELECT MIN(id) AS id FROM outbox WHERE status = 'pending' GROUP BY chat_id) h
+                      ON o.id = h.id
+                    ORDER BY o.id
+                    """
+                ).fetchall()
+            ]
+
+    def done(self, row_id):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+
+    def retry(self, row_id, next_at, error, attempts=None, parse_mode=False):
+        sets = ["next_at = ?", "last_error = ?"]
+        args = [next_at, error]
+        if attempts is not None:
+            sets.append("attempts = ?")
+            args.append(attempts)
+        if parse_mode is not False:
+            sets.append("parse_mode = ?")
+            args.append(parse_mode)
+        with self._lock, self._db:
+            self._db.execute(f"UPDATE outbox SET {', '.join(sets)} WHERE id = ?", args + [row_id])
+
+    def dead(self, row_id, error):
+        with self._lock, self._db:
+            self._db.execute("UPDATE outbox SET status = 'dead', last_error = ? WHERE id = ?", (error, row_id))
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        out = {"pending": 0, "dead": 0}
+        out.update({status: n for status, n in rows})
+        return out
+
+    def rows(self, status=None):
+        sql = "SELECT * FROM outbox" + (" WHERE status = ?" if status else "") + " ORDER BY id"
+        with self._lock:
+            return [dict(r) for r in self._db.execute(sql, (status,) if status else ()).fetchall()]
+
+
+class TelegramDelivery:
+    """
+    Outbox'ı arka planda boşaltan gönderici.
+    send(chat_id, text, parse_mode) -> (HTTP durum kodu ya da ağ hatasında None, JSON gövde dict'i)
+    """
+
+    def __init__(self, send, outbox, max_attempts=8, backoff_base=1.0, backoff_max=300.0, log=print):
+        self._send = send
+        self.outbox = outbox
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._log = log
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._idle = threading.Condition()
+        self._thread = None
+        self.sent = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failed = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="telegram-delivery", daemon=True)
+            self._thread.start()
+        return self
+
+    def enqueue(self, text, chat_ids, parse_mode="Markdown"):
+        """Mesajı böler, her sohbet için outbox'a yazar. Dönüş: parça sayısı."""
+        chunks = split_message(text)
+        self.outbox.add(chat_ids, chunks, parse_mode)
+        self._wake.set()
+        return len(chunks)
+
+    def flush(self, timeout=None):
+        """Hemen gönderilebilecek bekleyen kalmayana kadar bekler. Outbox boşaldıysa True."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self.outbox.counts()["pending"]:
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._wake.set()
+                self._idle.wait(0.5 if left is None else min(left, 0.5))
+        return True
+
+    def close(self, timeout=None):
+        ok = self.flush(timeout)
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        return ok
+
+    def stats(self):
+        counts = self.outbox.counts()
+        return {
+            "sent": self.sent,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failed": self.failed,
+            "pending": counts["pending"],
+            "dead": counts["dead"],
+        }
+
+    def _backoff(self, attempts):
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempts))
+        return cap / 2 + random.uniform(0, cap / 2)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.time()
+            heads = self.outbox.heads()
+            due = [r for r in heads if r["next_at"] <= now]
+            for row in due:
+                if self._stop.is_set():
+                    break
+                self._deliver(row)
+            with self._idle:
+                self._idle.notify_all()
+            if due:
+                continue
+            waits = [r["next_at"] - now for r in heads]
+            self._wake.wait(min(min(waits), 5.0) if waits else None)
+            self._wake.clear()
+
+    def _deliver(self, row):
+        status, body = self._send(row["chat_id"], row["text"], row["parse_mode"])
+        body = body or {}
+        label = f"{row['chat_id']} {row['part']}/{row['parts']}"
+        if status is not None and 200 <= status < 300:
+            self.outbox.done(row["id"])
+            self.sent += 1
+            self._log(f"✅ Telegram → {label} gönderildi.")
+            return
+
+        desc = body.get("description") or (f"HTTP {status}" if status is not None else "ağ hatası")
+        now = time.time()
+        if status == 429:
+            # Telegram'ın istediği bekleme; deneme hakkından düşülmez
+            retry_after = float((body.get("parameters") or {}).get("retry_after") or 1)
+            self.rate_limited += 1
+            self.outbox.retry(row["id"], now + retry_after, desc)
+            self._log(f"  Telegram 429 ({label}): {retry_after:.0f} sn sonra tekrar denenecek")
+            return
+        if status == 400 and "parse entities" in desc and row["parse_mode"]:
+            # Markdown bozuksa raporu kaybetmek yerine düz metin gönder
+            self.retries += 1
+            self.outbox.retry(row["id"], now, desc, parse_mode=None)
+            self._log(f"  Telegram Markdown hatası ({label}): düz metin olarak tekrar gönderilecek")
+            return
+        attempts = row["attempts"] + 1
+        if (status is None or status >= 500) and attempts < self.max_attempts:
+            self.retries += 1
+            delay = self._backoff(row["attempts"])
+            self.outbox.retry(row["id"], now + delay, desc, attempts=attempts)
+            self._log(f"  Telegram hata ({label}): {desc}, {delay:.1f} sn sonra tekrar ({attempts}/{self.max_attempts})")
+            return
+        self.failed += 1
+        self.outbox.dead(row["id"], desc)
+        self._log(f"Telegram hata ({label}): {desc}; mesaj outbox'ta 'dead' olarak bırakıldı")
+
+
+if __name__ == "__main__":
+    for p in sys.argv[1:]:
+        box = Outbox(p)
+        print(f"{p}: {box.counts()}")
+        for r in box.rows():
+            print(f"  #{r['id']} {r['status']:<7} chat {r['chat_id']} {r['part']}/{r['parts']} "
+                  f"deneme {r['attempts']}  {r['last_error'] or ''}")
+        box.close()
@@ -0,0 +1,388 @@
+"""
+Toplu (vektörel) indikatör motoru.
+
+Kapanışlar (sembol x bar) bir matrise dizilir, EMA/MACD serileri tüm semboller ve
+tüm periyotlar için tek geçişte hesaplanır. Farklı uzunluktaki geçmişler sağa
+hizalanır, baştaki boşluklar NaN ile doldurulur.
+
+Sonuçlar main.ema() ile birebir aynıdır: ilk `period` değerin SMA'sı ile başlar,
+sonra v * k + ema * (1 - k) özyinelemesi uygulanır.
+NumPy yoksa aynı sonuçları veren saf Python yoluna düşülür.
+
+Akışlı indikatörler (EmaState/MacdState/IndicatorState) her yeni kapanmış barda
+O(1) güncellenir ve IndicatorStateStore ile çalışmalar arasında saklanır.
+"""
+
+import json
+import os
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy opsiyonel
+    np = None
+
+NAN = float("nan")
+
+
+# ------------ Saf Python (yedek) ------------
+
+def ema_series(values, period):
+    """Tek seri için tam EMA serisi; seed öncesi None."""
+    out = [None] * len(values)
+    if len(values) < period:
+        return out
+    k = 2 / (period + 1)
+    ema_val = sum(values[:period]) / period
+    out[period - 1] = ema_val
+    for i in range(period, len(values)):
+        ema_val = values[i] * k + ema_val * (1 - k)
+        out[i] = ema_val
+    return out
+
+
+def _macd_py(closes, fast, slow, signal):
+    e_fast = ema_series(closes, fast)
+    e_slow = ema_series(closes, slow)
+    macd = [f - s for f, s in zip(e_fast, e_slow) if f is not None and s is not None]
+    sig = ema_series(macd, signal)
+    pad = len(closes) - len(macd)
+    macd_full = [None] * pad + macd
+    sig_full = [None] * pad + sig
+    hist = [m - s if m is not None and s is not None else None for m, s in zip(macd_full, sig_full)]
+    return macd_full, sig_full, hist
+
+
+# ------------ NumPy ------------
+
+def close_matrix(series_list):
+    """
+    Kapanış dizilerini (list, array("d") ya da memoryview) sağa hizalı (S, T) float64 matrise çevirir.
+    Kısa geçmişlerin başı NaN olur. Dönüş: (matris, uzunluklar)
+    """
+    lengths = [len(s) for s in series_list]
+    width = max(lengths, default=0)
+    mat = np.full((len(series_list), width), np.nan)
+    for i, s in enumerate(series_list):
+        if s is not None and len(s):
+            mat[i, width - len(s):] = s
+    return mat, lengths
+
+
+def _first_valid(mat):
+    valid = ~np.isnan(mat)
+    first = valid.argmax(axis=-1)
+    first[~valid.any(axis=-1)] = mat.shape[-1]
+    return first
+
+
+def ema_batch(mat, periods):
+    """
+    (S, T) matris → {period: (S, T) EMA serisi}.
+    Tüm periyotlar (P, S, T) olarak birlikte, zaman ekseninde tek döngüyle hesaplanır.
+    """
+    periods = tuple(periods)
+    n_sym, width = mat.shape
+    out = np.full((len(periods), n_sym, width), np.nan)
+    if not periods or not n_sym or not width:
+        return {p: out[i] for i, p in enumerate(periods)}
+
+    first = _first_valid(mat)
+    seed = first[None, :] + np.array(periods)[:, None] - 1  # (P, S)
+    k = (2.0 / (np.array(periods, dtype=float) + 1.0))[:, None]  # (P, 1)
+
+    # SMA seed: main.ema() ile aynı toplama sırası için Python sum()
+    for pi, p in enumerate(periods):
+        for si in range(n_sym):
+            sd = seed[pi, si]
+            if sd < width:
+                out[pi, si, sd] = sum(mat[si, first[si]:sd + 1].tolist()) / p
+
+    start = int(seed.min())
+    for t in range(max(start + 1, 1), width):
+        cur = mat[None, :, t] * k + out[:, :, t - 1] * (1 - k)
+        np.copyto(out[:, :, t], cur, where=t > seed)
+    return {p: out[i] for i, p in enumerate(periods)}
+
+
+def macd_batch(mat, fast=12, slow=26, signal=9, emas=None):
+    """(S, T) matris → (macd, signal, histogram) matrisleri. emas verilirse yeniden hesaplanmaz."""
+    if emas is None or fast not in emas or slow not in emas:
+        emas = ema_batch(mat, (fast, slow))
+    macd = emas[fast] - emas[slow]
+    sig = ema_batch(macd, (signal,))[signal]
+    return macd, sig, macd - sig
+
+
+def _last(row):
+    v = row[-1] if len(row) else NAN
+    return None if v != v else float(v)
+
+
+# ------------ Ortak API ------------
+
+def compute_indicators(closes_list, ema_periods=(20,), macd=(12, 26, 9)):
+    """
+    Her sembolün kapanış listesi için son değerleri döndürür:
+    [{"ema": {period: değer|None}, "macd": ..., "macd_signal": ..., "macd_hist": ...}, ...]
+    macd=None verilirse MACD hesaplanmaz.
+    """
+    if not closes_list:
+        return []
+
+    if np is None:
+        results = []
+        for closes in closes_list:
+            row = {"ema": {p: ema_series(closes, p)[-1] if closes else None for p in ema_periods}}
+            if macd:
+                m, s, h = _macd_py(closes, *macd)
+                row.update(
+                    macd=m[-1] if m else None,
+                    macd_signal=s[-1] if s else None,
+                    macd_hist=h[-1] if h else None,
+                )
+            results.append(row)
+        return results
+
+    mat, _ = close_matrix(closes_list)
+    periods = set(ema_periods)
+    if macd:
+        periods |= {macd[0], macd[1]}
+    emas = ema_batch(mat, sorted(periods))
+    if macd:
+        m, s, h = macd_batch(mat, *macd, emas=emas)
+
+    results = []
+    for i in range(len(closes_list)):
+        row = {"ema": {p: _last(emas[p][i]) for p in ema_periods}}
+        if macd:
+            row.update(macd=_last(m[i]), macd_signal=_last(s[i]), macd_hist=_last(h[i]))
+        results.append(row)
+    return results
+
+
+# ------------ Akışlı (stateful) indikatörler ------------
+
+class EmaState:
+    """
+    O(1) güncellenen EMA. İlk `period` değerde SMA biriktirir, sonra özyineleme.
+    Aynı seriyi baştan sona besleyince ema_series() ile birebir aynı sonucu verir.
+    """
+
+    __slots__ = ("period", "k", "count", "seed_sum", "value")
+
+    def __init__(self, period, count=0, seed_sum=0.0, value=None):
+        self.period = period
+        self.k = 2 / (period + 1)
+        self.count = count
+        self.seed_sum = seed_sum
+        self.value = value
+
+    def _next(self, x):
+        if self.count + 1 < self.period:
+            return None
+        if self.count + 1 == self.period:
+            return (self.seed_sum + x) / self.period
+        return x * self.k + self.value * (1 - self.k)
+
+    def update(self, x):
+        value = self._next(x)
+        if self.count < self.period:
+            self.seed_sum += x
+        self.count += 1
+        self.value = value
+        return value
+
+    def peek(self, x):
+        """x yeni bar olsaydı EMA ne olurdu (state değişmez) → açık mum için."""
+        return self._next(x)
+
+    def to_dict(self):
+        return {"period": self.period, "count": self.count, "seed_sum": self.seed_sum, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["period"], d["count"], d["seed_sum"], d["value"])
+
+
+class MacdState:
+    """Hızlı/yavaş EMA farkı + o farkın sinyal EMA'sı, bar başına O(1)."""
+
+    __slots__ = ("fast", "slow", "signal")
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EmaState(fast)
+        self.slow = EmaState(slow)
+        self.signal = EmaState(signal)
+
+    def update(self, x):
+        f = self.fast.update(x)
+        s = self.slow.update(x)
+        if f is None or s is None:
+            return None, None
+        macd = f - s
+        return macd, self.signal.update(macd)
+
+    def peek(self, x):
+        f = self.fast.peek(x)
+        s = self.slow.peek(x)
+        if f is None or s is None:
+            return None, None
+        macd = f - s
+        return macd, self.signal.peek(macd)
+
+    def value(self):
+        if self.fast.value is None or self.slow.value is None:
+            return None, None
+        return self.fast.value - self.slow.value, self.signal.value
+
+    def to_dict(self):
+        return {"fast": self.fast.to_dict(), "slow": self.slow.to_dict(), "signal": self.signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, d):
+        obj = cls.__new__(cls)
+        obj.fast = EmaState.from_dict(d["fast"])
+        obj.slow = EmaState.from_dict(d["slow"])
+        obj.signal = EmaState.from_dict(d["signal"])
+        return obj
+
+
+class IndicatorState:
+    """
+    Bir (enstrüman, bar) için EMA'lar + MACD. Sadece kapanmış barlar işlenir (last_ts);
+    açık bar snapshot() ile state'e yazılmadan hesaba katılır.
+    """
+
+    __slots__ = ("ema_periods", "macd_cfg", "emas", "macd", "last_ts")
+
+    def __init__(self, ema_periods=(20,), macd=(12, 26, 9)):
+        self.ema_periods = tuple(sorted(ema_periods))
+        self.macd_cfg = tuple(macd) if macd else None
+        self.emas = {p: EmaState(p) for p in self.ema_periods}
+        self.macd = MacdState(*macd) if macd else None
+        self.last_ts = None
+
+    def matches(self, ema_periods, macd):
+        return self.ema_periods == tuple(sorted(ema_periods)) and self.macd_cfg == (tuple(macd) if macd else None)
+
+    def update(self, ts, close):
+        if self.last_ts is not None and ts <= self.last_ts:
+            return
+        for e in self.emas.values():
+            e.update(close)
+        if self.macd:
+            self.macd.update(close)
+        self.last_ts = ts
+
+    def snapshot(self, open_close=None):
+        """compute_indicators() satırıyla aynı biçim. open_close: henüz kapanmamış barın kapanışı."""
+        if open_close is None:
+            row = {"ema": {p: e.value for p, e in self.emas.items()}}
+            m, s = self.macd.value() if self.macd else (None, None)
+        else:
+            row = {"ema": {p: e.peek(open_close) for p, e in self.emas.items()}}
+            m, s = self.macd.peek(open_close) if self.macd else (None, None)
+        if self.macd:
+            row.update(macd=m, macd_signal=s, macd_hist=m - s if m is not None and s is not None else None)
+        return row
+
+    def to_dict(self):
+        return {
+            "ema_periods": list(self.ema_periods),
+            "macd_cfg": list(self.macd_cfg) if self.macd_cfg else None,
+            "emas": {str(p): e.to_dict() for p, e in self.emas.items()},
+            "macd": self.macd.to_dict() if self.macd else None,
+            "last_ts": self.last_ts,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        obj = cls(d["ema_periods"], d["macd_cfg"])
+        obj.emas = {int(p): EmaState.from_dict(e) for p, e in d["emas"].items()}
+        obj.macd = MacdState.from_dict(d["macd"]) if d["macd"] else None
+        obj.last_ts = d["last_ts"]
+        return obj
+
+
+def _ema_state_from(series_row, values_row, period):
+    """Toplu hesaplanmış tam seriden (NaN'lı) EmaState kurar."""
+    valid = [v for v in values_row if v == v]
+    st = EmaState(period, count=len(valid))
+    st.seed_sum = sum(valid[:period])
+    last = series_row[-1] if len(series_row) else NAN
+    st.value = None if last != last else float(last)
+    return st
+
+
+def seed_states(histories, ema_periods=(20,), macd=(12, 26, 9)):
+    """
+    Kapanmış bar geçmişlerinden [(ts dizisi, kapanış dizisi), ...] yeni IndicatorState'ler
+    (CandleStore.closed_columns'un tipli array'leri kopyalanmadan okunur).
+    NumPy varsa tüm semboller ema_batch/macd_batch ile tek seferde hesaplanır;
+    sonuç barları tek tek update() etmekle aynıdır.
+    """
+    states = [IndicatorState(ema_periods, macd) for _ in histories]
+    if not histories:
+        return states
+
+    if np is None:
+        for st, (tss, closes) in zip(states, histories):
+            for t, c in zip(tss, closes):
+                st.update(t, c)
+        return states
+
+    mat, _ = close_matrix([closes for _, closes in histories])
+    periods = set(ema_periods)
+    if macd:
+        periods |= {macd[0], macd[1]}
+    emas = ema_batch(mat, sorted(periods))
+    if macd:
+        m, sig, _ = macd_batch(mat, *macd, emas=emas)
+
+    for i, (st, (tss, closes)) in enumerate(zip(states, histories)):
+        if not len(closes):
+            continue
+        for p in st.ema_periods:
+            st.emas[p] = _ema_state_from(emas[p][i], mat[i], p)
+        if macd:
+            st.macd.fast = _ema_state_from(emas[macd[0]][i], mat[i], macd[0])
+            st.macd.slow = _ema_state_from(emas[macd[1]][i], mat[i], macd[1])
+            st.macd.signal = _ema_state_from(sig[i], m[i], macd[2])
+        st.last_ts = tss[-1]
+    return states
+
+
+class IndicatorStateStore:
+    """(enstrüman, bar) → IndicatorState; çalışmalar arası JSON dosyasında saklanır."""
+
+    def __init__(self, path):
+        self.path = path
+        self.states = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                raw = json.load(f)
+            self.states = {k: IndicatorState.from_dict(v) for k, v in raw.items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    @staticmethod
+    def key(inst_id, bar):
+        return f"{inst_id}|{bar}"
+
+    def get(self, inst_id, bar, ema_periods, macd):
+        st = self.states.get(self.key(inst_id, bar))
+        if st is not None and not st.matches(ema_periods, macd):
+            return None
+        return st
+
+    def put(self, inst_id, bar, state):
+        self.states[self.key(inst_id, bar)] = state
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({k: v.to_dict() for k, v in self.states.items()}, f)
+        os.replace(tmp, self.path)
@@ -1,99 +1,876 @@
+import heapq
+import json
+import math
 import os
+import random
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
 import time
+import traceback
+import zlib
+from array import array
+from collections import deque
 import requests
-from datetime import datetime, timezone
-
-OKX_BASE = "https://www.okx.com"
-COINGECKO_BASE = "https://api.coingecko.com/api/v3"
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode, urlsplit
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait as wait_futures
+from budget import LatencyWindow, RunBudget, parse_shares
+from delivery import Outbox, TelegramDelivery
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime, timedelta, timezone
+
+from indicators import IndicatorStateStore, compute_indicators, seed_states
+from orderbook import L2Book, book_from_rest
+from orderflow import InstrumentFlow, TradeColumns, orderflow_kernel
+from resample import resample_all
+from results import ResultsStore
+from series import CandleSeries
+from snapshot import SnapshotReader, SnapshotWriter, request_key
+from telemetry import Telemetry
+from wsclient import WebSocketClient
+
+OKX_BASE = os.getenv("OKX_BASE", "https://www.okx.com")
+OKX_WS_URL = os.getenv("OKX_WS_URL", "wss://ws.okx.com:8443/ws/v5/public")
+COINGECKO_BASE = os.getenv("COINGECKO_BASE", "https://api.coingecko.com/api/v3")
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+
+DATA_DIR = os.getenv("DATA_DIR", "data")  # Çalışmalar arası kalıcı veriler (mum deposu vb.)
+CANDLE_DB = os.getenv("CANDLE_DB", os.path.join(DATA_DIR, "candles.sqlite"))
+INDICATOR_STATE_FILE = os.getenv("INDICATOR_STATE_FILE", os.path.join(DATA_DIR, "indicator_state.json"))
+HTTP_RECORD = os.getenv("HTTP_RECORD")  # Dosya ya da dizin: bu çalışmanın tüm HTTP yanıtlarını snapshot'a yaz
+HTTP_REPLAY = os.getenv("HTTP_REPLAY")  # Snapshot dosyası: ağa çıkmadan o çalışmayı yeniden üret
+HTTP_STATS_FILE = os.getenv("HTTP_STATS_FILE")  # Verilirse çalışma sonunda HTTP istatistikleri JSON olarak yazılır
+RESULTS_DB = os.getenv("RESULTS_DB", os.path.join(DATA_DIR, "results.sqlite"))  # Çalışma sonuçları geçmişi (results.py)
+RUN_REPORT_FILE = os.getenv("RUN_REPORT_FILE", os.path.join(DATA_DIR, "run_report.json"))  # Span/metrik JSON raporu
+METRICS_FILE = os.getenv("METRICS_FILE", os.path.join(DATA_DIR, "metrics.prom"))  # Prometheus text formatı
+PROFILE_MODE = os.getenv("PROFILE_MODE", "")  # "", "cpu" (cProfile), "mem" (tracemalloc) ya da "all"
+MCAP_CACHE_FILE = os.getenv("MCAP_CACHE_FILE", os.path.join(DATA_DIR, "mcap_cache.json"))
+TELEGRAM_OUTBOX_DB = os.getenv("TELEGRAM_OUTBOX_DB", os.path.join(DATA_DIR, "telegram_outbox.sqlite"))  # Gönderilmemiş mesajlar
+TRADE_ARCHIVE_DIR = os.getenv("TRADE_ARCHIVE_DIR", "")  # Verilirse REST/WS'ten gelen ham trade'ler buraya arşivlenir (tradearchive.py)
+TRADE_ARCHIVE_FLUSH_SEC = float(os.getenv("TRADE_ARCHIVE_FLUSH_SEC", "60"))  # Daemon'da arşive yazma aralığı
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
-CHAT_ID = os.getenv("CHAT_ID")
+CHAT_ID = os.getenv("CHAT_ID")  # Birden çok sohbet için virgülle: "-100123,456"
+CHAT_IDS = [c.strip() for c in (CHAT_ID or "").split(",") if c.strip()]
+TELEGRAM_MAX_ATTEMPTS = int(os.getenv("TELEGRAM_MAX_ATTEMPTS", "8"))  # Ağ hatası / 5xx için parça başına deneme
+TELEGRAM_FLUSH_SEC = float(os.getenv("TELEGRAM_FLUSH_SEC", "120"))  # Çıkışta kuyruğun boşalması için en fazla bekleme
 
 # ---- PARAMETRELER ----
-TOP_LIMIT_DAILY = 80          # Günlük altcoin taramasında bakılacak en hacimli USDT spot sayısı
+TOP_LIMIT_DAILY = int(os.getenv("TOP_LIMIT_DAILY", "80"))  # WS daemon'un izlediği en hacimli USDT spot sayısı
+# İki aşamalı tarama: 1) tüm USDT çiftleri tek /market/tickers yanıtıyla elenir ve puanlanır,
+# 2) sadece en yüksek puanlı SCAN_BUDGET altcoin için mum + trade çekilir.
+SCAN_BUDGET = int(os.getenv("SCAN_BUDGET", str(TOP_LIMIT_DAILY)))          # 2. aşamaya geçecek altcoin sayısı
+SCREEN_MIN_VOL_QUOTE = float(os.getenv("SCREEN_MIN_VOL_QUOTE", "500000"))  # 24h quote hacmi bunun altındaysa elenir (USDT)
+SCREEN_MIN_ABS_CHANGE_PCT = float(os.getenv("SCREEN_MIN_ABS_CHANGE_PCT", "0"))  # |24h değişim| bunun altındaysa elenir
+SCREEN_W_VOLUME = float(os.getenv("SCREEN_W_VOLUME", "1.0"))  # Puan ağırlığı: log10(quote hacim)
+SCREEN_W_CHANGE = float(os.getenv("SCREEN_W_CHANGE", "0.1"))  # Puan ağırlığı: |24h değişim| (%)
+SCREEN_W_RANGE = float(os.getenv("SCREEN_W_RANGE", "0.5"))    # Puan ağırlığı: 24h high/low'a yakınlık (0..1)
 CANDLE_LIMIT_DAILY = 120      # Günlük mum sayısı (EMA, MACD için)
+CANDLE_HISTORY_DAILY = 250    # BTC/ETH özeti için mum sayısı (EMA200'e yetecek kadar, mum deposundan gelir)
 TRADES_LIMIT = 200            # Orderflow için alınacak trade sayısı
-ORDERBOOK_DEPTH = 20          # Orderbook derinliği
+ORDERFLOW_WINDOW_MIN = int(os.getenv("ORDERFLOW_WINDOW_MIN", "60"))          # BTC/ETH net delta penceresi (dk)
+ORDERFLOW_MAX_PAGES = int(os.getenv("ORDERFLOW_MAX_PAGES", "50"))            # Pencere için en fazla trade sayfası
+ALT_ORDERFLOW_WINDOW_MIN = int(os.getenv("ALT_ORDERFLOW_WINDOW_MIN", "0"))   # Altcoinlerde pencere (0 = son TRADES_LIMIT trade)
+ALT_ORDERFLOW_MAX_PAGES = int(os.getenv("ALT_ORDERFLOW_MAX_PAGES", "5"))     # Altcoin başına en fazla trade sayfası
+# Net delta kaynağı: trades = trade tape'i (pencere sayfalanır), taker = OKX rubik taker alış/satış
+# hacmi (sembol başına tek istek). taker'da whale'ler aynı pencereden, en fazla *_MAX_PAGES trade
+# sayfasıyla aranır (0 = sadece son sayfa, pencereyi kapsamadığı raporda belirtilir).
+# rubik limiti 5 istek / 2 sn: geniş altcoin taramasında süreyi bu limit belirler.
+ORDERFLOW_SOURCE = os.getenv("ORDERFLOW_SOURCE", "trades").strip().lower()  # BTC/ETH özeti
+ALT_ORDERFLOW_SOURCE = os.getenv("ALT_ORDERFLOW_SOURCE", ORDERFLOW_SOURCE).strip().lower()  # Altcoin taraması
+TAKER_WINDOW_MIN = int(os.getenv("TAKER_WINDOW_MIN", "1440"))  # taker kaynağında pencere 0 olan taramalar için (dk, altcoinler: 24 saat)
+ORDERBOOK_DEPTH = int(os.getenv("ORDERBOOK_DEPTH", "20"))  # Taramada /market/books seviye sayısı (0 = defter çekilmez, en fazla 400)
+BOOK_BAND_PCT = float(os.getenv("BOOK_BAND_PCT", "1.0"))     # Derinlik / dengesizlik bandı: orta fiyatın ±%'si
+BOOK_WALL_FACTOR = float(os.getenv("BOOK_WALL_FACTOR", "5.0"))  # Banttaki seviye, bant medyanının bu katıysa "duvar"
+MCAP_TTL_SEC = int(os.getenv("MCAP_TTL_SEC", str(6 * 3600)))          # Market cap değerleri bu kadar süre taze sayılır
+MCAP_ID_MAP_TTL_SEC = int(os.getenv("MCAP_ID_MAP_TTL_SEC", str(7 * 86400)))  # symbol -> CoinGecko id haritası yenileme aralığı
+MCAP_ID_MISSING_SEC = int(os.getenv("MCAP_ID_MISSING_SEC", str(6 * 3600)))   # Haritada olmayan taranan sembol varsa en erken bu kadar sonra yenilenir
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "8"))  # Altcoin taramasında paralel worker sayısı (1 = sıralı)
+SHARD_DIR = os.getenv("SHARD_DIR", os.path.join(DATA_DIR, "shards"))  # Parçalı taramada ortak dizin (universe + part dosyaları)
+SHARD_WAIT_SEC = float(os.getenv("SHARD_WAIT_SEC", "600"))  # Birleştirici eksik shard'ları en fazla bu kadar bekler
+RUN_BUDGET_SEC = float(os.getenv("RUN_BUDGET_SEC", "0"))  # Çalışma süre bütçesi (sn, 0 = sınırsız): dolunca rapor eldekiyle gider
+RUN_BUDGET_SHARES = os.getenv("RUN_BUDGET_SHARES", "universe=0.15,majors=0.2,scan=0.55")  # Aşama payları; kalanı rapor payı
+HTTP_HEDGE_PCT = float(os.getenv("HTTP_HEDGE_PCT", "95"))  # Deneme endpoint'in bu yüzdelik süresini aşınca yedek istek (0 = kapalı)
+HTTP_HEDGE_MIN_SAMPLES = int(os.getenv("HTTP_HEDGE_MIN_SAMPLES", "20"))  # Yüzdelik için gereken en az başarılı deneme
+WS_REPORT_WINDOW = os.getenv("WS_REPORT_WINDOW", "24h")       # Daemon raporunda kullanılan kayan pencere (5m/1h/24h)
+WS_REPORT_TIME_UTC = os.getenv("WS_REPORT_TIME_UTC", "08:00")  # Daemon'un günlük rapor saati (UTC)
+SERVE_REPORT_TIMES_UTC = os.getenv("SERVE_REPORT_TIMES_UTC", WS_REPORT_TIME_UTC)  # serve: günlük rapor saatleri (virgülle)
+SERVE_INTRADAY_MIN = int(os.getenv("SERVE_INTRADAY_MIN", "0"))  # serve: gün içi tarama aralığı (dk, 0 = kapalı)
+SERVE_INTRADAY_SEND = os.getenv("SERVE_INTRADAY_SEND", "0") == "1"  # serve: gün içi tarama raporu da gönderilsin mi
+SERVE_HOST = os.getenv("SERVE_HOST", "127.0.0.1")  # serve: /healthz, /metrics adresi
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8787"))
+MTF_BASE_BAR = os.getenv("MTF_BASE_BAR", "1H")  # Çoklu zaman dilimi taramasında çekilen tek (en ince) bar
+MTF_BARS = [b.strip() for b in os.getenv("MTF_BARS", "1H,4H,1D,1W").split(",") if b.strip()]  # Yerelde türetilen dilimler (UTC)
+MTF_HISTORY_BARS = int(os.getenv("MTF_HISTORY_BARS", "6000"))  # Taban bardan tutulan geçmiş (1H: ~36 hafta, 1W MACD'ye yeter)
+MTF_TOP = int(os.getenv("MTF_TOP", "5"))  # MTF raporunda liste başına sembol
+WS_BOOKS = os.getenv("WS_BOOKS", "1") == "1"  # Daemon `books` kanalına da abone olsun (L2 defter, checksum'lı)
+WS_PING_SEC = 25              # OKX 30 sn sessizlikte bağlantıyı keser
+HTTP_POOL_SIZE = max(SCAN_WORKERS, 4)  # Host başına açık tutulacak keep-alive bağlantı sayısı
+HTTP_STATS_SAMPLES = int(os.getenv("HTTP_STATS_SAMPLES", "4096"))  # Host başına p50/p99 için tutulan son deneme süresi
+HTTP_BACKOFF_BASE = 0.5       # Retry backoff başlangıcı (sn), her denemede 2 katına çıkar
+HTTP_BACKOFF_MAX = 8.0        # Retry backoff üst sınırı (sn)
+
+# Tekrar denemeye değer OKX hata kodları (rate limit / geçici sistem hataları)
+OKX_RETRY_CODES = {"50001", "50004", "50011", "50013", "50026"}
+OKX_RATE_LIMIT_CODES = {"50011"}
+
+# OKX public endpoint limitleri: path -> (istek sayısı, saniye). IP başına, endpoint başına geçerli.
+RATE_LIMITS = {
+    "/api/v5/market/tickers": (20, 2.0),
+    "/api/v5/market/candles": (40, 2.0),
+    "/api/v5/market/history-candles": (20, 2.0),
+    "/api/v5/market/trades": (100, 2.0),
+    "/api/v5/market/history-trades": (20, 2.0),
+    "/api/v5/market/books": (40, 2.0),
+    "/api/v5/rubik/stat/taker-volume": (5, 2.0),
+}
+RATE_LIMIT_DEFAULT = (10, 2.0)  # Listede olmayan endpoint'ler için
+RATE_LIMIT_SAFETY = float(os.getenv("RATE_LIMIT_SAFETY", "0.9"))  # Limitin ne kadarını kullanacağız
+
+# Snapshot replay'inde saat kaydın başladığı ana sabitlenir (rapor birebir aynı çıksın diye)
+_frozen_now = None
+
+
+def now_utc():
+    return _frozen_now or datetime.now(timezone.utc)
+
+
+def now_ms():
+    return int(now_utc().timestamp() * 1000)
+
 
 # Market cap tabanlı eşikler
 def ts():
-    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    return now_utc().strftime("%Y-%m-%d %H:%M:%S UTC")
 
 
 # ------------ HTTP Yardımcıları ------------
 
+class TokenBucket:
+    """
+    Klasik token bucket: kapasite kadar patlama, sonra rate/sn hızında dolum.
+    penalize() ile (429 / rate-limit kodu sonrası) bucket bir süre tamamen durdurulur.
+    """
+
+    def __init__(self, capacity, per_seconds, clock=time.monotonic, sleep=time.sleep):
+        self.capacity = max(1.0, capacity)
+        self.rate = self.capacity / per_seconds
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Token ayırır; beklenmesi gereken süreyi döndürür (0 = hemen gönder)."""
+        with self._lock:
+            now = self._clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Token borca düşebilir: her çağıran kendi sırasını ayırıp o kadar bekler
+            self.tokens -= 1.0
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def try_acquire(self):
+        """Token hemen varsa alır (True); yoksa borca girmeden False döner (hedge istekleri için)."""
+        with self._lock:
+            now = self._clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1.0 or now < self.blocked_until:
+                return False
+            self.tokens -= 1.0
+            return True
+
+    def acquire(self):
+        """Token alır; beklenen süreyi (sn) döndürür."""
+        wait = self._reserve()
+        if wait > 0:
+            self._sleep(wait)
+        return max(wait, 0.0)
+
+    def penalize(self, seconds):
+        with self._lock:
+            now = self._clock()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = now
+
+
+class RateLimiter:
+    """Endpoint path'ine göre ayrı token bucket'lar (RATE_LIMITS)."""
+
+    def __init__(self, limits=None, default=RATE_LIMIT_DEFAULT, safety=RATE_LIMIT_SAFETY,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.limits = dict(RATE_LIMITS if limits is None else limits)
+        self.default = default
+        self.safety = safety
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key):
+        with self._lock:
+            b = self._buckets.get(key)
+            if b is None:
+                count, per = self.limits.get(key, self.default)
+                b = TokenBucket(count * self.safety, per, clock=self._clock, sleep=self._sleep)
+                self._buckets[key] = b
+            return b
+
+    def acquire(self, key):
+        return self.bucket(key).acquire()
+
+    def try_acquire(self, key):
+        return self.bucket(key).try_acquire()
+
+    def penalize(self, key, seconds=None):
+        if seconds is None:
+            _, seconds = self.limits.get(key, self.default)
+        self.bucket(key).penalize(seconds)
+
+
+RATE_LIMITER = RateLimiter()
+
+METRIC_HELP = {
+    "http_request_duration_seconds": "Tek HTTP denemesinin süresi (endpoint başına)",
+    "http_requests_total": "HTTP denemeleri, durum koduna göre (error = ağ hatası)",
+    "http_retries_total": "Tekrar denemeler",
+    "http_failures_total": "Tüm denemeleri başarısız olan çağrılar",
+    "http_response_bytes_total": "Alınan gövde baytları (açılmış)",
+    "http_wire_bytes_total": "Alınan gövde baytları (Content-Length, sıkıştırılmış)",
+    "http_request_bytes_total": "Gönderilen gövde baytları",
+    "ratelimit_wait_seconds_total": "Rate limiter'da beklenen toplam süre",
+    "okx_api_errors_total": "OKX code != 0 yanıtları",
+    "scan_symbols": "Tarama hunisi: evren, ön elemeyi geçen, detaylı taranan, analiz edilen",
+    "report_candidates": "Rapor listelerindeki aday sayısı",
+    "shards_missing": "Birleştirmede eksik kalan shard sayısı",
+    "telegram_parts_total": "Gönderim kuyruğuna alınan Telegram parçaları (sohbet başına)",
+    "http_hedged_total": "Yüzdelik süreyi aşan denemeler için gönderilen yedek istekler",
+    "http_hedge_wins_total": "Yedek isteğin asıl istekten önce yanıt aldığı durumlar",
+    "http_budget_skipped_total": "Süre bütçesi dolduğu için yapılmayan istekler",
+    "budget_skipped_symbols": "Süre bütçesi dolduğu için rapora giremeyen semboller (aşama başına)",
+}
+
+
+def new_telemetry(profile=PROFILE_MODE):
+    """Çalışma başına temiz ölçüm nesnesi (serve modunda her çalışmada yenilenir)."""
+    t = Telemetry(profile=profile)
+    for name, text in METRIC_HELP.items():
+        t.describe(name, text)
+    return t
+
+
+TELEMETRY = new_telemetry()
+
+# Çalışma başına süre bütçesi (main() her çalışmada yeniler); varsayılanı bütçesiz
+RUN_BUDGET = RunBudget(0)
+
+
+class HttpClient:
+    """
+    Tüm HTTP çağrılarının geçtiği ortak istemci:
+    - Host başına ayrı requests.Session + bağlantı havuzu (keep-alive, gzip)
+    - Ağ hatası / 429 / 5xx için jitter'lı üstel backoff
+    - Hedge: GET denemesi endpoint'in HTTP_HEDGE_PCT yüzdelik süresini aşarsa, rate limit
+      bucket'ında boş token varsa aynı isteğin kopyası gönderilir; önce gelen başarılı yanıt alınır
+    - RUN_BUDGET: timeout ve backoff kalan süreye kırpılır, süre dolunca istek yapılmaz
+    - Host başına bağlantı yeniden kullanım ve çağrı süresi istatistikleri
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE):
+        self.pool_size = pool_size
+        self._sessions = {}
+        self._requests = {}
+        self._latencies = {}
+        self._conn_base = {}  # reset_stats() anındaki bağlantı sayısı
+        self._lock = threading.Lock()
+        self.hedge = LatencyWindow(HTTP_HEDGE_PCT, min_samples=HTTP_HEDGE_MIN_SAMPLES)
+        self._hedge_pool = None
+
+    def _session(self, host):
+        with self._lock:
+            sess = self._sessions.get(host)
+            if sess is None:
+                sess = requests.Session()
+                sess.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                sess.mount("https://", adapter)
+                sess.mount("http://", adapter)
+                self._sessions[host] = sess
+                self._requests[host] = 0
+            self._requests[host] += 1
+            return sess
+
+    @staticmethod
+    def backoff(attempt):
+        cap = min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt))
+        # "equal jitter": yarısı sabit, yarısı rastgele → aynı anda düşen worker'lar dağılır
+        time.sleep(RUN_BUDGET.clamp(cap / 2 + random.uniform(0, cap / 2)))
+
+    def request(self, method, url, retries=3, timeout=10, limiter_key=None, endpoint=None, retry_on=None, **kwargs):
+        """
+        Başarılı (2xx) Response döndürür, olmazsa None.
+        Ağ hatası, 429 ve 5xx tekrar denenir; diğer 4xx'ler denenmeden bırakılır.
+        retry_on(r): 2xx yanıtın gövdesi geçici hata ise hata metni (ör. OKX code 50011), değilse
+        None; metin dönerse yanıt 5xx gibi aynı `retries` bütçesiyle tekrar denenir.
+        limiter_key verilirse her denemeden önce RATE_LIMITER'dan token alınır,
+        429 gelirse o endpoint'in bucket'ı Retry-After (yoksa limit penceresi) kadar durdurulur.
+        endpoint: metrik etiketi (varsayılan limiter_key ya da URL path'i; path'te sır varsa verilmeli).
+        """
+        key = None
+        if _snapshot_reader is not None or _snapshot_writer is not None:
+            key = request_key(method, url, kwargs.get("params"))
+        if _snapshot_reader is not None:
+            r = _snapshot_reader.get(key)
+            if r is None:
+                print(f"  Snapshot'ta yok: {key}")
+            return r
+
+        parts = urlsplit(url)
+        host = parts.netloc
+        endpoint = endpoint or limiter_key or parts.path
+        body = kwargs.get("data")
+        sent = len(body) if isinstance(body, (bytes, str)) else len(urlencode(body)) if isinstance(body, dict) else 0
+        last_err = None
+        for attempt in range(retries):
+            if RUN_BUDGET.expired():
+                # Süre doldu: rapor eldekiyle gidecek, yeni istek yok (hata olarak sayılmaz)
+                TELEMETRY.inc("http_budget_skipped_total", endpoint=endpoint)
+                return None
+            if attempt:
+                TELEMETRY.inc("http_retries_total", endpoint=endpoint)
+            if limiter_key is not None:
+                waited = RATE_LIMITER.acquire(limiter_key)
+                if waited:
+                    TELEMETRY.inc("ratelimit_wait_seconds_total", waited, endpoint=endpoint)
+            if sent:
+                TELEMETRY.inc("http_request_bytes_total", sent, host=host, endpoint=endpoint)
+            attempt_timeout = RUN_BUDGET.clamp(timeout)
+            if attempt_timeout <= 0:
+                TELEMETRY.inc("http_budget_skipped_total", endpoint=endpoint)
+                return None
+            if method == "GET":
+                r, err = self._hedged(method, url, host, endpoint, attempt_timeout, limiter_key, retry_on, kwargs)
+            else:
+                r, err = self._judged(method, url, host, endpoint, attempt_timeout, limiter_key, retry_on, kwargs)
+            if err is None:
+                # Sadece GET'ler kaydedilir (Telegram POST'u token içerir, replay'de gönderilmez)
+                if _snapshot_writer is not None and method == "GET":
+                    _snapshot_writer.record(key, r.status_code, r.content)
+                return r
+            last_err = err
+            if r is not None and 300 <= r.status_code < 500 and r.status_code != 429:
+                break
+            if attempt < retries - 1:
+                self.backoff(attempt)
+        if RUN_BUDGET.expired():
+            TELEMETRY.inc("http_budget_skipped_total", endpoint=endpoint)
+            return None
+        TELEMETRY.inc("http_failures_total", endpoint=endpoint)
+        print(f"  HTTP hata {method} {endpoint}: {_redact(last_err, url, endpoint)}")
+        return None
+
+    def _attempt(self, method, url, host, endpoint, timeout, kwargs):
+        """Tek deneme → (Response, None) ya da ağ hatasında (None, hata). Başarılı süreler hedge penceresine girer."""
+        t0 = time.perf_counter()
+        try:
+            r = self._session(host).request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            self._record(host, endpoint, time.perf_counter() - t0, "error")
+            return None, e
+        seconds = time.perf_counter() - t0
+        self._record(host, endpoint, seconds, str(r.status_code), r)
+        if 200 <= r.status_code < 300:
+            self.hedge.add(endpoint, seconds)
+        return r, None
+
+    def _judged(self, method, url, host, endpoint, timeout, limiter_key, retry_on, kwargs):
+        """
+        Tek deneme → (Response, None) başarıda, aksi halde (Response ya da None, hata metni).
+        Her yanıt (hedge'in kazanamayan kopyası dahil) buradan bir kez geçer: 429'da bucket
+        Retry-After kadar durdurulur; 2xx gövdesindeki geçici kodları (OKX 50011) retry_on
+        işaretler ve cezalandırır.
+        """
+        r, err = self._attempt(method, url, host, endpoint, timeout, kwargs)
+        if r is None:
+            return r, err
+        if r.status_code == 429 and limiter_key is not None:
+            RATE_LIMITER.penalize(limiter_key, _retry_after(r))
+        if not 200 <= r.status_code < 300:
+            return r, f"HTTP {r.status_code}"
+        return r, retry_on(r) if retry_on is not None else None
+
+    def _hedged(self, method, url, host, endpoint, timeout, limiter_key, retry_on, kwargs):
+        """
+        Asıl deneme hedge gecikmesinde bitmezse aynı isteğin kopyası gönderilir; ilk başarılı
+        yanıt döner, diğeri beklenmez (kendi timeout'unda biter, 429 / rate-limit cezası yine
+        uygulanır, sonucu atılır). Yüzdelik için yeterli örnek yoksa ya da rate limit
+        bucket'ında boş token yoksa tek deneme yapılır.
+        """
+        args = (method, url, host, endpoint, timeout, limiter_key, retry_on, kwargs)
+        delay = self.hedge.hedge_after(endpoint)
+        if delay is None or delay >= timeout:
+            return self._judged(*args)
+        pool = self._hedge_executor()
+        first = pool.submit(self._judged, *args)
+        done, _ = wait_futures([first], timeout=delay)
+        if done:
+            return first.result()
+        second_timeout = RUN_BUDGET.clamp(timeout - delay)
+        if second_timeout <= 0 or (limiter_key is not None and not RATE_LIMITER.try_acquire(limiter_key)):
+            return first.result()
+        TELEMETRY.inc("http_hedged_total", endpoint=endpoint)
+        second = pool.submit(
+            self._judged, method, url, host, endpoint, second_timeout, limiter_key, retry_on, kwargs
+        )
+        pending = {first, second}
+        fallback = None
+        while pending:
+            done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                r, err = f.result()
+                if err is None:
+                    if f is second:
+                        TELEMETRY.inc("http_hedge_wins_total", endpoint=endpoint)
+                    for other in pending:
+                        other.cancel()
+                    return r, None
+                fallback = fallback or (r, err)
+        return fallback
+
+    def _hedge_executor(self):
+        with self._lock:
+            if self._hedge_pool is None:
+                # Worker başına asıl + yedek deneme aynı anda uçuşta olabilir
+                self._hedge_pool = ThreadPoolExecutor(max_workers=self.pool_size * 2, thread_name_prefix="http-hedge")
+            return self._hedge_pool
+
+    def send_once(self, method, url, timeout=10, endpoint=None, **kwargs):
+        """
+        Tek deneme: durum kodu ne olursa olsun Response, ağ hatasında None.
+        Tekrar deneme kararı çağırandadır (Telegram kuyruğu 429/5xx'i kendisi zamanlar).
+        """
+        parts = urlsplit(url)
+        host = parts.netloc
+        endpoint = endpoint or parts.path
+        t0 = time.perf_counter()
+        try:
+            r = self._session(host).request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            self._record(host, endpoint, time.perf_counter() - t0, "error")
+            print(f"  HTTP hata {method} {endpoint}: {_redact(e, url, endpoint)}")
+            return None
+        self._record(host, endpoint, time.perf_counter() - t0, str(r.status_code), r)
+        return r
+
+    def _record(self, host, endpoint, seconds, status, r=None):
+        with self._lock:
+            lat = self._latencies.get(host)
+            if lat is None:
+                lat = self._latencies[host] = deque(maxlen=HTTP_STATS_SAMPLES)
+            lat.append(seconds)
+        TELEMETRY.observe("http_request_duration_seconds", seconds, host=host, endpoint=endpoint)
+        TELEMETRY.inc("http_requests_total", host=host, endpoint=endpoint, status=status)
+        if r is not None:
+            TELEMETRY.inc("http_response_bytes_total", len(r.content), host=host, endpoint=endpoint)
+            wire = r.headers.get("Content-Length")
+            if wire and wire.isdigit():
+                TELEMETRY.inc("http_wire_bytes_total", int(wire), host=host, endpoint=endpoint)
+
+    @staticmethod
+    def _connections(sess):
+        conns = 0
+        # Aynı adapter https:// ve http:// için mount edili: her havuz bir kez sayılır
+        for adapter in {id(a): a for a in sess.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    conns += pool.num_connections
+        return conns
+
+    def reset_stats(self):
+        """Çalışma başı: istek sayıları, süreler ve yeni bağlantı sayısı sıfırlanır (havuzlar kalır)."""
+        with self._lock:
+            for host, sess in self._sessions.items():
+                self._requests[host] = 0
+                self._conn_base[host] = self._connections(sess)
+            self._latencies.clear()
+
+    def stats(self):
+        """
+        Host -> {requests, connections, reused, p50_ms, p99_ms}, son reset_stats()'tan beri.
+        connections = açılan yeni TCP/TLS bağlantı sayısı, p50/p99 = son HTTP_STATS_SAMPLES deneme.
+        """
+        out = {}
+        with self._lock:
+            for host, sess in self._sessions.items():
+                conns = max(self._connections(sess) - self._conn_base.get(host, 0), 0)
+                reqs = self._requests[host]
+                lat = sorted(self._latencies.get(host, []))
+                out[host] = {
+                    "requests": reqs,
+                    "connections": conns,
+                    "reused": max(reqs - conns, 0),
+                    "p50_ms": _percentile(lat, 50) * 1000,
+                    "p99_ms": _percentile(lat, 99) * 1000,
+                }
+        return out
+
+
+def _redact(err, url, endpoint):
+    """Hata metnindeki URL / path'i (Telegram'da bot token'ı içerir) endpoint etiketiyle değiştirir."""
+    text = str(err)
+    parts = urlsplit(url)
+    for secret in (url, parts.path + ("?" + parts.query if parts.query else ""), parts.path):
+        if secret:
+            text = text.replace(secret, endpoint)
+    return text
+
+
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return 0.0
+    # nearest-rank yüzdelik
+    return sorted_vals[max(0, math.ceil(pct / 100 * len(sorted_vals)) - 1)]
+
+
+def _retry_after(r):
+    try:
+        return float(r.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+HTTP = HttpClient()
+
+_snapshot_writer = None
+_snapshot_reader = None
+
+
+def start_snapshot(record=None, replay=None):
+    """
+    HTTP snapshot kaydı / replay'i başlatır. İki modda da kalıcı depolar (mum deposu,
+    indikatör state'i, mcap cache) bellekte tutulur: kayıt kendi başına yeterli olur,
+    replay aynı istekleri aynı sırayla yapar.
+    """
+    global _snapshot_writer, _snapshot_reader, _frozen_now
+    global CANDLE_DB, INDICATOR_STATE_FILE, MCAP_CACHE_FILE, RESULTS_DB, TELEGRAM_OUTBOX_DB, TRADE_ARCHIVE_DIR
+    global TOP_LIMIT_DAILY, SCAN_BUDGET
+    if not record and not replay:
+        return
+    CANDLE_DB = ":memory:"
+    INDICATOR_STATE_FILE = None
+    MCAP_CACHE_FILE = None
+    RESULTS_DB = None
+    TELEGRAM_OUTBOX_DB = None
+    TRADE_ARCHIVE_DIR = None
+
+    if replay:
+        _snapshot_reader = SnapshotReader(replay)
+        meta = _snapshot_reader.meta
+        if meta.get("started"):
+            _frozen_now = datetime.fromisoformat(meta["started"])
+        TOP_LIMIT_DAILY = meta.get("top_limit", TOP_LIMIT_DAILY)
+        SCAN_BUDGET = meta.get("scan_budget", SCAN_BUDGET)
+        n = sum(len(v) for v in _snapshot_reader.keys.values())
+        print(f"Snapshot replay: {replay} ({n} yanıt, kayıt zamanı {meta.get('started')})")
+    else:
+        if os.path.isdir(record) or record.endswith(os.sep):
+            record = os.path.join(record, now_utc().strftime("%Y%m%d-%H%M%S") + ".okxsnap")
+        started = now_utc()
+        _frozen_now = started  # kayıtta da aynı "şimdi" kullanılsın ki replay birebir tutsun
+        meta = {"started": started.isoformat(), "top_limit": TOP_LIMIT_DAILY, "scan_budget": SCAN_BUDGET}
+        _snapshot_writer = SnapshotWriter(record, meta)
+        print(f"Snapshot kaydı: {record}")
+
+
+def close_snapshot():
+    global _snapshot_writer, _snapshot_reader
+    if _snapshot_writer is not None:
+        _snapshot_writer.close()
+        _snapshot_writer = None
+    if _snapshot_reader is not None:
+        _snapshot_reader.close()
+        _snapshot_reader = None
+
+
 def jget_okx(path, params=None, retries=3, timeout=10):
-    url = f"{OKX_BASE}{path}"
-    for _ in range(retries):
+    """
+    OKX REST GET → "data" alanı ya da None.
+    HTTP hataları HttpClient'ta ele alınır; geçici OKX kodları (OKX_RETRY_CODES) da retry_on ile
+    aynı döngüde, aynı `retries` bütçesiyle tekrar denenir (50011'de bucket cezalandırılır).
+    Her istek endpoint'in rate limit bucket'ından geçer.
+    """
+    parsed = {}
+
+    def retry_on(r):
         try:
-            r = requests.get(url, params=params, timeout=timeout)
-            if r.status_code == 200:
-                j = r.json()
-                if j.get("code") == "0" and j.get("data") is not None:
-                    return j["data"]
-        except Exception:
-            time.sleep(0.5)
+            j = parsed[id(r)] = r.json()
+        except ValueError:
+            return None
+        code = str(j.get("code"))
+        if code not in OKX_RETRY_CODES:
+            return None
+        TELEMETRY.inc("okx_api_errors_total", endpoint=path, code=code)
+        if code in OKX_RATE_LIMIT_CODES:
+            RATE_LIMITER.penalize(path)
+        return f"OKX code={code}"
+
+    r = HTTP.request(
+        "GET", f"{OKX_BASE}{path}", params=params, retries=retries, timeout=timeout, limiter_key=path,
+        retry_on=retry_on,
+    )
+    if r is None:
+        return None
+    j = parsed.get(id(r))
+    if j is None:
+        try:
+            j = r.json()  # replay: yanıt snapshot'tan, retry_on çağrılmadı
+        except ValueError:
+            print(f"  OKX hata {path}: JSON çözülemedi")
+            return None
+    code = str(j.get("code"))
+    if code == "0" and j.get("data") is not None:
+        return j["data"]
+    TELEMETRY.inc("okx_api_errors_total", endpoint=path, code=code)
+    print(f"  OKX hata {path} {params}: code={code} msg={j.get('msg')}")
     return None
 
 
 def jget_json(url, params=None, retries=3, timeout=10):
-    for _ in range(retries):
-        try:
-            r = requests.get(url, params=params, timeout=timeout)
-            if r.status_code == 200:
-                return r.json()
-        except Exception:
-            time.sleep(0.5)
-    return None
+    r = HTTP.request("GET", url, params=params, retries=retries, timeout=timeout)
+    if r is None:
+        return None
+    try:
+        return r.json()
+    except ValueError:
+        return None
+
+
+# ------------ Telegram Gönderimi ------------
+
+_delivery = None
+_delivery_lock = threading.Lock()
+
+
+def _telegram_send(chat_id, text, parse_mode):
+    url = f"{TELEGRAM_API_BASE}/bot{TELEGRAM_TOKEN}/sendMessage"
+    payload = {"chat_id": chat_id, "text": text}
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    r = HTTP.send_once("POST", url, data=payload, timeout=10, endpoint="/bot/sendMessage")
+    if r is None:
+        return None, None
+    try:
+        body = r.json()
+    except ValueError:
+        body = {}
+    if r.status_code == 429 and not (body.get("parameters") or {}).get("retry_after"):
+        retry_after = _retry_after(r)
+        if retry_after:
+            body.setdefault("parameters", {})["retry_after"] = retry_after
+    return r.status_code, body
+
+
+def delivery():
+    """Süreç başına tek gönderim kuyruğu; ilk çağrıda önceki çalışmadan kalan outbox da gönderilmeye başlar."""
+    global _delivery
+    with _delivery_lock:
+        if _delivery is None:
+            path = TELEGRAM_OUTBOX_DB or ":memory:"
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            _delivery = TelegramDelivery(_telegram_send, Outbox(path), max_attempts=TELEGRAM_MAX_ATTEMPTS).start()
+        return _delivery
+
+
+def resume_delivery():
+    """Önceki çalışmadan (çökme / zaman aşımı) kalan mesajlar varsa kuyruğu şimdiden başlatır."""
+    if TELEGRAM_TOKEN and TELEGRAM_OUTBOX_DB and os.path.exists(TELEGRAM_OUTBOX_DB):
+        pending = delivery().outbox.counts()["pending"]
+        if pending:
+            print(f"Telegram outbox: önceki çalışmadan {pending} mesaj gönderilecek.")
+
+
+def close_delivery(timeout=TELEGRAM_FLUSH_SEC):
+    """Kuyruğu en fazla timeout sn boşaltır; kalanlar outbox'ta sonraki çalışmayı bekler."""
+    global _delivery
+    if _delivery is None:
+        return
+    ok = _delivery.close(timeout)
+    st = _delivery.stats()
+    print(
+        f"Telegram: {st['sent']} parça gönderildi, {st['retries']} tekrar, {st['rate_limited']} kez 429, "
+        f"{st['dead']} gönderilemedi"
+    )
+    if not ok:
+        print(f"⚠ Telegram: {st['pending']} parça gönderilemedi, outbox'ta bekliyor; sonraki çalışmada tekrar denenecek.")
+    _delivery.outbox.close()
+    _delivery = None
 
 
 def telegram(msg: str):
-    if not TELEGRAM_TOKEN or not CHAT_ID:
+    """Mesajı gönderim kuyruğuna alır (bölme, fan-out ve tekrar deneme arka planda); beklemez."""
+    if _snapshot_reader is not None:
+        print("--- Snapshot replay: mesaj gönderilmedi ---")
+        print(msg)
+        return
+    if not TELEGRAM_TOKEN or not CHAT_IDS:
         print("⚠ TELEGRAM_TOKEN veya CHAT_ID yok, mesaj gönderemem.")
         print("--- Mesaj içeriği ---")
         print(msg)
         print("---------------------")
         return
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    payload = {"chat_id": CHAT_ID, "text": msg, "parse_mode": "Markdown"}
-    try:
-        r = requests.post(url, data=payload, timeout=10)
-        if r.status_code != 200:
-            print("Telegram hata:", r.text)
-    except Exception as e:
-        print("Telegram exception:", e)
+    parts = delivery().enqueue(msg, CHAT_IDS)
+    TELEMETRY.inc("telegram_parts_total", parts * len(CHAT_IDS))
+    print(f"Telegram: {parts} parça × {len(CHAT_IDS)} sohbet gönderim kuyruğuna alındı.")
 
 
 # ------------ CoinGecko MCAP Haritası ------------
 
-def load_mcap_map(max_pages: int = 2):
-    """
-    CoinGecko /coins/markets → symbol -> market_cap map
-    En yüksek mcap'i olan symbol kazanır (aynı sembolü kullananlar için).
-    """
-    mcap_map = {}
-    for page in range(1, max_pages + 1):
-        data = jget_json(
-            f"{COINGECKO_BASE}/coins/markets",
-            params={
-                "vs_currency": "usd",
-                "order": "market_cap_desc",
-                "per_page": 250,
-                "page": page,
-                "sparkline": "false",
-            },
+class McapCache:
+    """
+    Kalıcı market cap cache'i (JSON):
+    - ids:   SYMBOL -> CoinGecko id (aynı sembolde en yüksek mcap'li coin kazanır)
+    - mcaps: CoinGecko id -> [market_cap, güncellenme zamanı]
+    Yenilemede sadece taradığımız id'ler istenir; API yavaş/kapalıysa eski değerler kullanılır.
+    """
+
+    def __init__(self, path=MCAP_CACHE_FILE):
+        self.path = path
+        self.ids = {}
+        self.ids_updated = 0
+        self.mcaps = {}
+        if not path:
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                raw = json.load(f)
+            self.ids = raw.get("ids", {})
+            self.ids_updated = raw.get("ids_updated", 0)
+            self.mcaps = raw.get("mcaps", {})
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "ids_updated": self.ids_updated, "mcaps": self.mcaps}, f)
+        os.replace(tmp, self.path)
+
+    def rebuild_ids(self, max_pages=2):
+        """Sayfalı /coins/markets çekimiyle id haritasını kurar (ilk çalışma / haftada bir)."""
+        ids = {}
+        best = {}
+        now = time.time()
+        for page in range(1, max_pages + 1):
+            data = jget_json(
+                f"{COINGECKO_BASE}/coins/markets",
+                params={
+                    "vs_currency": "usd",
+                    "order": "market_cap_desc",
+                    "per_page": 250,
+                    "page": page,
+                    "sparkline": "false",
+                },
+            )
+            if not data:
+                break
+            for row in data:
+                sym = str(row.get("symbol", "")).upper()
+                cg_id = row.get("id")
+                mc = row.get("market_cap") or 0
+                if not sym or not cg_id or not mc:
+                    continue
+                self.mcaps[cg_id] = [mc, now]
+                if sym not in best or mc > best[sym]:
+                    best[sym] = mc
+                    ids[sym] = cg_id
+        if ids:
+            self.ids = ids
+            self.ids_updated = now
+        return bool(ids)
+
+    def refresh(self, symbols, ttl=MCAP_TTL_SEC):
+        """Sadece verilen sembollerin süresi dolmuş mcap'lerini /coins/markets?ids=... ile tazeler."""
+        now = time.time()
+        stale = sorted(
+            {
+                self.ids[s]
+                for s in symbols
+                if s in self.ids and now - self.mcaps.get(self.ids[s], [0, 0])[1] > ttl
+            }
         )
-        if not data:
-            break
-        for row in data:
-            sym = str(row.get("symbol", "")).upper()
-            mc = row.get("market_cap") or 0
-            if not sym or not mc:
-                continue
-            if sym not in mcap_map or mc > mcap_map[sym]:
-                mcap_map[sym] = mc
-    return mcap_map
+        for i in range(0, len(stale), 250):
+            chunk = stale[i:i + 250]
+            data = jget_json(
+                f"{COINGECKO_BASE}/coins/markets",
+                params={"vs_currency": "usd", "ids": ",".join(chunk), "per_page": 250, "sparkline": "false"},
+            )
+            if not data:
+                print(f"CoinGecko yanıt vermedi, {len(stale) - i} coin için eski mcap değerleri kullanılıyor.")
+                return
+            for row in data:
+                mc = row.get("market_cap") or 0
+                if row.get("id") and mc:
+                    self.mcaps[row["id"]] = [mc, now]
+
+    def mcap_map(self, symbols=None):
+        """symbol -> market_cap (classify_mcap'in beklediği biçim)."""
+        syms = self.ids.keys() if symbols is None else symbols
+        out = {}
+        for sym in syms:
+            entry = self.mcaps.get(self.ids.get(sym))
+            if entry:
+                out[sym] = entry[0]
+        return out
+
+
+_mcap_cache = None
+
+
+def mcap_cache():
+    """Süreç boyunca tek McapCache (serve modunda çalışmalar arası bellekte kalır)."""
+    global _mcap_cache
+    if _mcap_cache is None or _mcap_cache.path != MCAP_CACHE_FILE:
+        _mcap_cache = McapCache(MCAP_CACHE_FILE)
+    return _mcap_cache
+
+
+def load_mcap_map(symbols=None, max_pages: int = 2):
+    """
+    symbol -> market_cap map, McapCache üzerinden.
+    symbols verilirse yalnızca onlar için (eskiyse) CoinGecko'ya gidilir.
+    Sayfalı tam çekim id haritası yoksa/eskiyse yapılır; taranan semboller arasında haritada
+    olmayan varsa (top-500'e yeni girmiş olabilir) MCAP_ID_MISSING_SEC'te bir erken yenilenir.
+    """
+    cache = mcap_cache()
+    symbols = [s.upper() for s in symbols] if symbols is not None else None
+    age = time.time() - cache.ids_updated
+    missing = [s for s in symbols or () if s not in cache.ids]
+    if not cache.ids or age > MCAP_ID_MAP_TTL_SEC:
+        print("CoinGecko symbol -> id haritası yenileniyor...")
+        if not cache.rebuild_ids(max_pages) and cache.ids:
+            print("CoinGecko id haritası yenilenemedi, eski harita kullanılıyor.")
+    elif missing and age > MCAP_ID_MISSING_SEC:
+        print(f"{len(missing)} taranan sembol id haritasında yok, harita erken yenileniyor...")
+        if not cache.rebuild_ids(max_pages):
+            print("CoinGecko id haritası yenilenemedi, eski harita kullanılıyor.")
+    cache.refresh(symbols if symbols is not None else list(cache.ids))
+    cache.save()
+    return cache.mcap_map(symbols)
 
 
 def classify_mcap(base: str, mcap_map: dict):
@@ -162,15 +939,23 @@ def tier_nice_label(tier: str):
 
 # ------------ OKX Yardımcıları ------------
 
-def get_spot_usdt_top_tickers(limit=TOP_LIMIT_DAILY):
+def _float_or_none(v):
+    try:
+        return float(v) if v is not None and v != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def get_spot_usdt_tickers():
     """
-    OKX SPOT tickers → USDT pariteleri içinden en yüksek 24h notional hacme göre ilk N'yi döndürür.
+    OKX SPOT tickers (tek bulk istek) → tüm USDT pariteleri, sırasız.
     Her eleman:
     {
         "inst_id": "ARB-USDT",
         "last": son fiyat,
         "sod": UTC0 açılış fiyatı (varsa, yoksa None),
-        "vol_quote": 24h quote hacmi
+        "vol_quote": 24h quote hacmi,
+        "high24h" / "low24h": 24h en yüksek / en düşük (varsa, yoksa None)
     }
     """
     data = jget_okx("/api/v5/market/tickers", {"instType": "SPOT"})
@@ -182,66 +967,549 @@ def get_spot_usdt_top_tickers(limit=TOP_LIMIT_DAILY):
         inst_id = d.get("instId", "")
         if not inst_id.endswith("-USDT"):
             continue
-        volCcy24h = d.get("volCcy24h")
-        last = d.get("last")
-        sod = d.get("sodUtc0")  # UTC0 günü başı fiyatı
-        try:
-            vol_quote = float(volCcy24h)
-        except Exception:
-            vol_quote = 0.0
-        try:
-            last_px = float(last)
-        except Exception:
-            last_px = None
-        try:
-            sod_px = float(sod) if sod is not None else None
-        except Exception:
-            sod_px = None
-
         rows.append(
             {
                 "inst_id": inst_id,
-                "last": last_px,
-                "sod": sod_px,
-                "vol_quote": vol_quote,
+                "last": _float_or_none(d.get("last")),
+                "sod": _float_or_none(d.get("sodUtc0")),  # UTC0 günü başı fiyatı
+                "vol_quote": _float_or_none(d.get("volCcy24h")) or 0.0,
+                "high24h": _float_or_none(d.get("high24h")),
+                "low24h": _float_or_none(d.get("low24h")),
             }
         )
+    return rows
 
-    rows.sort(key=lambda x: x["vol_quote"], reverse=True)
-    return rows[:limit]
 
+def get_spot_usdt_top_tickers(limit=TOP_LIMIT_DAILY):
+    """USDT pariteleri içinden en yüksek 24h notional hacme göre ilk N (kısmi top-k, hacme göre azalan)."""
+    return heapq.nlargest(limit, get_spot_usdt_tickers(), key=lambda x: x["vol_quote"])
 
-def get_candles(inst_id, bar="1D", limit=CANDLE_LIMIT_DAILY):
-    data = jget_okx("/api/v5/market/candles", {"instId": inst_id, "bar": bar, "limit": limit})
-    if not data:
-        return []
 
-    data = list(reversed(data))  # en eski en başa
-    candles = []
-    for row in data:
+def screen_score(t):
+    """
+    1. aşama puanı (sadece ticker alanları). Elenen enstrüman için None.
+    - log10(quote hacim): whale / net delta eşiklerini geçme ihtimali hacimle artar
+    - |24h değişim| (sodUtc0'a göre, %)
+    - 24h aralığın ucuna yakınlık: 1 = high/low'da, 0 = tam ortada
+    """
+    last, sod, vol = t["last"], t["sod"], t["vol_quote"]
+    if last is None or not sod or sod <= 0 or vol < SCREEN_MIN_VOL_QUOTE or vol <= 0:
+        return None
+    change_pct = abs(last - sod) / sod * 100.0
+    if change_pct < SCREEN_MIN_ABS_CHANGE_PCT:
+        return None
+    hi, lo = t.get("high24h"), t.get("low24h")
+    edge = 0.0
+    if hi is not None and lo is not None and hi > lo:
+        pos = min(max((last - lo) / (hi - lo), 0.0), 1.0)
+        edge = 1.0 - 2.0 * min(pos, 1.0 - pos)
+    return SCREEN_W_VOLUME * math.log10(vol) + SCREEN_W_CHANGE * change_pct + SCREEN_W_RANGE * edge
+
+
+def screen_tickers(rows, budget=SCAN_BUDGET):
+    """
+    Tüm USDT evreni → 2. aşamaya geçecek en fazla `budget` altcoin (puana göre azalan).
+    BTC/ETH ayrıca analiz edildiği için bütçeden yemez. Dönüş: (seçilenler, filtreyi geçen sayısı)
+    """
+    scored = []
+    for t in rows:
+        if t["inst_id"] in ("BTC-USDT", "ETH-USDT"):
+            continue
+        score = screen_score(t)
+        if score is not None:
+            scored.append((score, t))
+    # Tam sıralama yerine heap: O(n log budget)
+    top = heapq.nlargest(budget, scored, key=lambda x: x[0])
+    return [dict(t, screen_score=score) for score, t in top], len(scored)
+
+
+class CandleStore:
+    """
+    Yerel mum deposu (SQLite). (inst_id, bar, ts) birincil anahtar → index.
+    Kapanmamış son mum confirm=0 ile tutulur ve bir sonraki çekimde üzerine yazılır.
+    """
+
+    def __init__(self, path=CANDLE_DB):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            if path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS candles (
+                    inst_id TEXT NOT NULL,
+                    bar TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL,
+                    vol REAL, vol_quote REAL,
+                    confirm INTEGER NOT NULL DEFAULT 1,
+                    PRIMARY KEY (inst_id, bar, ts)
+                ) WITHOUT ROWID
+                """
+            )
+            # Geriye doğru geçmiş bitti mi (yeni listelenen coinlerde her gün boşuna sayfalamamak için)
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS candle_meta (
+                    inst_id TEXT NOT NULL,
+                    bar TEXT NOT NULL,
+                    history_done INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (inst_id, bar)
+                ) WITHOUT ROWID
+                """
+            )
+            # Günlük tarama orderflow özetleri (backtest.py'nin geçmiş orderflow kaynağı).
+            # ts = taramanın yapıldığı günlük mumun açılış zamanı; gün içinde tekrar taranırsa yalnızca
+            # en az o kadar süreyi kapsayan özet üzerine yazar (kısa gün içi taramalar günlüğü bozmaz).
+            # span_sec = özetin gerçekten kapsadığı süre (son TRADES_LIMIT trade birkaç saniye olabilir);
+            # backtest günü kapsamayan satırları kullanmaz.
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS orderflow_daily (
+                    inst_id TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    buy_notional REAL, sell_notional REAL, net_delta REAL,
+                    buy_whale_usd REAL, sell_whale_usd REAL,
+                    trades INTEGER, span_sec REAL,
+                    PRIMARY KEY (inst_id, ts)
+                ) WITHOUT ROWID
+                """
+            )
+
+    def upsert(self, inst_id, bar, rows):
+        if not rows:
+            return
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(inst_id, bar) + tuple(r) for r in rows],
+            )
+
+    def bounds(self, inst_id, bar):
+        """(kayıt sayısı, en eski ts, son kapanmış mumun ts'i)"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*), MIN(ts), MAX(CASE WHEN confirm = 1 THEN ts END) "
+                "FROM candles WHERE inst_id = ? AND bar = ?",
+                (inst_id, bar),
+            ).fetchone()
+
+    def closed_columns(self, inst_id, bar):
+        """Tüm kapanmış mumlar tipli kolonlar olarak: (ts array("q"), close array("d")), en eski başta."""
+        ts_col, close_col = array("q"), array("d")
+        with self._lock:
+            for ts_ms, close in self._db.execute(
+                "SELECT ts, close FROM candles WHERE inst_id = ? AND bar = ? AND confirm = 1 ORDER BY ts",
+                (inst_id, bar),
+            ):
+                ts_col.append(ts_ms)
+                close_col.append(close)
+        return ts_col, close_col
+
+    def closed_since(self, inst_id, bar, after_ts=None):
+        """after_ts'ten (hariç) sonraki kapanmış mumlar: [(ts, close), ...], en eski başta."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT ts, close FROM candles WHERE inst_id = ? AND bar = ? AND confirm = 1 AND ts > ? "
+                "ORDER BY ts",
+                (inst_id, bar, after_ts if after_ts is not None else -1),
+            ).fetchall()
+
+    def latest(self, inst_id, bar, limit):
+        """Son limit mum → CandleSeries (en eski başta, açık son mum confirm=0)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT ts, open, high, low, close, vol, vol_quote, confirm FROM candles "
+                "WHERE inst_id = ? AND bar = ? ORDER BY ts DESC LIMIT ?",
+                (inst_id, bar, limit),
+            ).fetchall()
+        rows.reverse()  # en eski en başa
+        return CandleSeries.from_rows(rows)
+
+    def all_closed(self, bar, inst_ids=None):
+        """Tüm kapanmış mumlar: [(inst_id, ts, open, high, low, close, vol_quote), ...] (backtest için)."""
+        sql = "SELECT inst_id, ts, open, high, low, close, vol_quote FROM candles WHERE bar = ? AND confirm = 1"
+        args = [bar]
+        if inst_ids is not None:
+            sql += f" AND inst_id IN ({','.join('?' * len(inst_ids))})"
+            args += list(inst_ids)
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def put_orderflow(self, rows):
+        """
+        rows: [(inst_id, ts, orderflow sözlüğü), ...]
+        Aynı gün için kayıtlı satır, yenisinin span_sec'i ondan kısa değilse değiştirilir.
+        """
+        if not rows:
+            return
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO orderflow_daily VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (inst_id, ts) DO UPDATE SET "
+                "buy_notional = excluded.buy_notional, sell_notional = excluded.sell_notional, "
+                "net_delta = excluded.net_delta, buy_whale_usd = excluded.buy_whale_usd, "
+                "sell_whale_usd = excluded.sell_whale_usd, trades = excluded.trades, span_sec = excluded.span_sec "
+                "WHERE COALESCE(excluded.span_sec, 0) >= COALESCE(orderflow_daily.span_sec, 0)",
+                [
+                    (
+                        inst_id, ts_ms, of["buy_notional"], of["sell_notional"], of["net_delta"],
+                        of["buy_whale"]["usd"] if of["buy_whale"] else 0.0,
+                        of["sell_whale"]["usd"] if of["sell_whale"] else 0.0,
+                        of.get("trades"), of.get("span_sec"),
+                    )
+                    for inst_id, ts_ms, of in rows
+                ],
+            )
+
+    def all_orderflow(self):
+        """[(inst_id, ts, net_delta, buy_whale_usd, sell_whale_usd, span_sec), ...]; span_sec = kapsanan süre."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT inst_id, ts, net_delta, buy_whale_usd, sell_whale_usd, span_sec FROM orderflow_daily"
+            ).fetchall()
+
+    def history_done(self, inst_id, bar):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT history_done FROM candle_meta WHERE inst_id = ? AND bar = ?", (inst_id, bar)
+            ).fetchone()
+        return bool(row and row[0])
+
+    def mark_history_done(self, inst_id, bar):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO candle_meta VALUES (?, ?, 1)", (inst_id, bar))
+
+
+_candle_store = None
+_candle_store_lock = threading.Lock()
+
+
+def candle_store():
+    global _candle_store
+    with _candle_store_lock:
+        if _candle_store is None:
+            _candle_store = CandleStore(CANDLE_DB)
+        return _candle_store
+
+
+def _parse_candle_rows(data):
+    rows = []
+    for row in data or []:
         try:
-            ts_ms = int(row[0])
-            o = float(row[1])
-            h = float(row[2])
-            l = float(row[3])
-            c = float(row[4])
+            rows.append(
+                (
+                    int(row[0]),
+                    float(row[1]),
+                    float(row[2]),
+                    float(row[3]),
+                    float(row[4]),
+                    float(row[5]) if len(row) > 5 else 0.0,
+                    float(row[6]) if len(row) > 6 else 0.0,
+                    int(row[8]) if len(row) > 8 else 1,
+                )
+            )
         except Exception:
             continue
-        candles.append(
-            {
-                "ts": ts_ms,
-                "open": o,
-                "high": h,
-                "low": l,
-                "close": c,
-            }
+    return rows
+
+
+def _fetch_new_candles(inst_id, bar, since_ts):
+    """since_ts'ten (hariç) yeni mumları /market/candles ile sayfa sayfa çeker."""
+    rows = []
+    after = None
+    while True:
+        params = {"instId": inst_id, "bar": bar, "limit": 300}
+        if since_ts is not None:
+            params["before"] = since_ts
+        if after is not None:
+            params["after"] = after
+        page = _parse_candle_rows(jget_okx("/api/v5/market/candles", params))
+        rows.extend(page)
+        # Sayfa dolu değilse aradaki boşluk kapandı; ilk çekimde (since_ts yok) tek sayfa yeter
+        if since_ts is None or len(page) < 300:
+            return rows
+        after = min(r[0] for r in page)
+
+
+def _backfill_candles(store, inst_id, bar, oldest_ts, need):
+    """Depodaki en eski mumdan geriye /market/history-candles ile need kadar mum ekler."""
+    while need > 0 and oldest_ts is not None:
+        data = jget_okx(
+            "/api/v5/market/history-candles",
+            {"instId": inst_id, "bar": bar, "after": oldest_ts, "limit": 100},
         )
-    return candles
+        if data is None:
+            return  # geçici hata: bir sonraki çalışmada tekrar denenir
+        page = _parse_candle_rows(data)
+        if not page:
+            store.mark_history_done(inst_id, bar)
+            return
+        store.upsert(inst_id, bar, page)
+        need -= len(page)
+        oldest_ts = min(r[0] for r in page)
+
+
+def get_candles(inst_id, bar="1D", limit=CANDLE_LIMIT_DAILY):
+    """
+    Mumları yerel depodan CandleSeries olarak döndürür; OKX'ten yalnızca son kapanmış mumdan
+    yeni olanları çeker (açık son mum her seferinde güncellenir). Depoda limit kadar geçmiş
+    yoksa geriye doğru tamamlanır.
+    """
+    store = candle_store()
+    count, oldest_ts, last_closed_ts = store.bounds(inst_id, bar)
+
+    store.upsert(inst_id, bar, _fetch_new_candles(inst_id, bar, last_closed_ts))
+
+    count, oldest_ts, _ = store.bounds(inst_id, bar)
+    if count < limit and not store.history_done(inst_id, bar):
+        _backfill_candles(store, inst_id, bar, oldest_ts, limit - count)
+
+    return store.latest(inst_id, bar, limit)
+
+
+def get_orderbook(inst_id, depth=ORDERBOOK_DEPTH):
+    """/market/books snapshot'ı → L2Book, alınamazsa None."""
+    data = jget_okx("/api/v5/market/books", {"instId": inst_id, "sz": depth})
+    if not data:
+        return None
+    return book_from_rest(inst_id, data[0], max_levels=depth)
+
+
+def book_metrics(book):
+    return book.metrics(BOOK_BAND_PCT, BOOK_WALL_FACTOR) if book is not None else None
+
+
+_trade_archive = None
+
+
+def trade_archive():
+    """TRADE_ARCHIVE_DIR verildiyse süreç boyunca tek TradeArchive, yoksa None (NumPy gerektirir)."""
+    global _trade_archive
+    if not TRADE_ARCHIVE_DIR:
+        return None
+    if _trade_archive is None or _trade_archive.root != TRADE_ARCHIVE_DIR:
+        from tradearchive import TradeArchive
+        _trade_archive = TradeArchive(TRADE_ARCHIVE_DIR)
+    return _trade_archive
+
+
+def archive_trades(inst_id, cols):
+    archive = trade_archive()
+    if archive is not None and len(cols):
+        archive.append(inst_id, cols)
+
+
+def flush_trade_archive():
+    if _trade_archive is not None:
+        written = _trade_archive.flush()
+        if written:
+            print(f"Trade arşivi: {written} yeni trade yazıldı ({_trade_archive.root}).")
+
+
+def archived_orderflow(inst_id, start_ms, end_ms, mcap_class=None):
+    """
+    Arşivden [start_ms, end_ms) penceresinin orderflow'u (stream_orderflow ile aynı alanlar).
+    Kolonlar mmap'li dosyaların kopyasız view'larıdır; API çağrısı yapılmaz.
+    mcap_class verilmezse yerel mcap cache'inden (ağa çıkmadan) sınıflanır.
+    """
+    archive = trade_archive()
+    if archive is None:
+        raise RuntimeError("TRADE_ARCHIVE_DIR tanımlı değil")
+    archive.flush()
+    base = inst_id.split("-")[0]
+    if mcap_class is None:
+        mcap_class = classify_mcap(base, mcap_cache().mcap_map([base]))
+    agg = OrderflowAggregator(*whale_thresholds(mcap_class))
+    for cols in archive.columns(inst_id, start_ms, end_ms):
+        agg.add(cols)
+    out = agg.result()
+    out["mcap_class"] = mcap_class
+    return out
 
 
 def get_trades(inst_id, limit=TRADES_LIMIT):
+    """Son trade'ler → TradeColumns (JSON dict'leri tutulmaz)."""
     data = jget_okx("/api/v5/market/trades", {"instId": inst_id, "limit": limit})
-    return data or []
+    cols = TradeColumns.from_json(data or [])
+    archive_trades(inst_id, cols)
+    return cols
+
+
+def iter_trade_pages(inst_id, since_ms=None, max_trades=None, max_pages=None):
+    """
+    Trade geçmişini yeniden eskiye sayfa sayfa TradeColumns olarak üretir (generator).
+    İlk sayfa /market/trades (500), devamı /market/history-trades (tradeId ile geriye, 100'er).
+    since_ms'ten eski trade'e, max_trades'e ya da max_pages'e ulaşınca durur; kırpılan
+    sayfalar kopyasız view'dır.
+    """
+    after = None
+    fetched = 0
+    pages = 0
+    while max_pages is None or pages < max_pages:
+        if after is None:
+            page_size = 500
+            data = jget_okx("/api/v5/market/trades", {"instId": inst_id, "limit": page_size})
+        else:
+            page_size = 100
+            data = jget_okx(
+                "/api/v5/market/history-trades",
+                {"instId": inst_id, "type": "1", "after": after, "limit": page_size},
+            )
+        pages += 1
+        if not data:
+            return
+
+        cols = TradeColumns.from_json(data)
+        # Pencere dışına düşen kısım dahil tüm sayfa arşive gider
+        archive_trades(inst_id, cols)
+        page = cols
+        if since_ms is not None:
+            # Sayfa yeniden eskiye: pencere dışına düşen ilk trade'den itibaren kesilir
+            keep = next((i for i, t in enumerate(cols.ts) if t < since_ms), len(cols))
+            page = cols.view(0, keep)
+        if max_trades is not None and len(page) > max_trades - fetched:
+            page = page.view(0, max_trades - fetched)
+        if len(page):
+            fetched += len(page)
+            yield page
+
+        done_window = len(page) < len(cols)
+        done_budget = max_trades is not None and fetched >= max_trades
+        if done_window or done_budget or len(data) < page_size:
+            return
+        after = data[-1].get("tradeId")
+        if not after:
+            return
+
+
+def stream_orderflow(inst_id, medium_thr, whale_thr, super_thr, window_min=0, max_pages=ORDERFLOW_MAX_PAGES):
+    """
+    Orderflow'u sayfalar geldikçe toplar; bellekte tek sayfadan fazlası tutulmaz.
+    window_min > 0 → son window_min dakikalık trade'ler (max_pages bütçesiyle),
+    window_min = 0 → sadece son TRADES_LIMIT trade.
+    Sonuç analyze_trades_orderflow ile aynı alanlar + "trades", "span_sec", "complete".
+    """
+    agg = OrderflowAggregator(medium_thr, whale_thr, super_thr)
+    if window_min > 0:
+        since_ms = now_ms() - window_min * 60_000
+        pages = iter_trade_pages(inst_id, since_ms=since_ms, max_pages=max_pages)
+    else:
+        since_ms = None
+        pages = [get_trades(inst_id)]
+    for page in pages:
+        agg.add(page)
+    out = agg.result()
+    # Pencere başına kadar inildiyse tam; sayfa bütçesi bittiyse kısmi
+    out["complete"] = since_ms is None or (agg.oldest_ts is not None and agg.oldest_ts <= since_ms + 60_000)
+    return out
+
+
+TAKER_PERIOD_MS = {"5m": 300_000, "1H": 3_600_000, "1D": 86_400_000}
+
+
+def taker_period(window_min):
+    """Pencere için rubik periyodu: kısa pencerede 5m, 4 güne kadar 1H, ötesinde 1D."""
+    if window_min <= 240:
+        return "5m"
+    if window_min <= 5760:
+        return "1H"
+    return "1D"
+
+
+def get_taker_volume(ccy, period, begin_ms=None):
+    """
+    OKX rubik taker hacmi → [(ts, sell_vol, buy_vol), ...] eskiden yeniye, alınamazsa None.
+    Hacim ccy cinsinden ve ccy'nin tüm spot paritelerinin toplamıdır; son periyot açıktır.
+    """
+    params = {"ccy": ccy, "instType": "SPOT", "period": period}
+    if begin_ms is not None:
+        params["begin"] = begin_ms
+    data = jget_okx("/api/v5/rubik/stat/taker-volume", params)
+    if data is None:
+        return None
+    rows = []
+    for row in data:
+        try:
+            rows.append((int(row[0]), float(row[1]), float(row[2])))
+        except (IndexError, TypeError, ValueError):
+            continue
+    rows.sort()
+    return rows
+
+
+def taker_orderflow(inst_id, medium_thr, whale_thr, super_thr, window_min=0, max_pages=0, price=None):
+    """
+    Net delta rubik taker hacminden (tek istek), whale'ler aynı pencerenin trade'lerinden:
+    max_pages > 0 → pencere başına kadar en fazla max_pages sayfa, 0 → sadece son trade sayfası.
+    window_min = 0 → TAKER_WINDOW_MIN. Hacim `price` (yoksa en yeni trade'in fiyatı) ile
+    USDT'ye çevrilir. Taker verisi alınamazsa trade'lerin kendi net delta'sı kalır
+    (source="trades"). Sonuç stream_orderflow ile aynı alanlar + "source", "window_min",
+    whale'lerin gerçekten kapsadığı süre "whale_span_sec" ve pencereyi kapsayıp kapsamadığı "whale_complete".
+    """
+    window_min = window_min or TAKER_WINDOW_MIN
+    period = taker_period(window_min)
+    step = TAKER_PERIOD_MS[period]
+    at_ms = now_ms()
+    since_ms = at_ms - window_min * 60_000
+
+    agg = OrderflowAggregator(medium_thr, whale_thr, super_thr)
+    if max_pages > 0:
+        pages = iter_trade_pages(inst_id, since_ms=since_ms, max_pages=max_pages)
+    else:
+        pages = [get_trades(inst_id)]
+    for page in pages:
+        if price is None and len(page):
+            price = page.px[0]  # ilk sayfa yeniden eskiye: en yeni trade
+        agg.add(page)
+    out = agg.result()
+    whale_complete = agg.oldest_ts is not None and agg.oldest_ts <= since_ms + 60_000
+    out.update(
+        whale_span_sec=(at_ms - agg.oldest_ts) / 1000.0 if agg.oldest_ts is not None else 0.0,
+        whale_complete=whale_complete,
+    )
+    if max_pages > 0:
+        out.update(complete=whale_complete, source="trades", window_min=window_min)
+    else:
+        out.update(complete=True, source="trades", window_min=0)
+
+    rows = get_taker_volume(inst_id.split("-")[0], period, begin_ms=since_ms // step * step)
+    rows = [r for r in rows or () if r[0] + step > since_ms]
+    if not rows or not price:
+        return out
+    buy = sum(r[2] for r in rows) * price
+    sell = sum(r[1] for r in rows) * price
+    out.update(
+        buy_notional=buy,
+        sell_notional=sell,
+        net_delta=buy - sell,
+        span_sec=(at_ms - rows[0][0]) / 1000.0,
+        complete=rows[0][0] <= since_ms,
+        source="taker",
+        window_min=window_min,
+    )
+    return out
+
+
+def trade_orderflow(inst_id, medium_thr, whale_thr, super_thr, window_min=0, max_pages=ORDERFLOW_MAX_PAGES, price=None):
+    out = stream_orderflow(inst_id, medium_thr, whale_thr, super_thr, window_min=window_min, max_pages=max_pages)
+    out["source"] = "trades"
+    return out
+
+
+# ORDERFLOW_SOURCE → kaynak; hepsi aynı imza ve aynı sonuç alanları
+ORDERFLOW_SOURCES = {"trades": trade_orderflow, "taker": taker_orderflow}
+
+
+def fetch_orderflow(source_name, inst_id, mcap_class, window_min, max_pages, price=None):
+    """ORDERFLOW_SOURCES'tan seçilen kaynakla orderflow sözlüğü; eşikler MCAP sınıfından."""
+    source = ORDERFLOW_SOURCES.get(source_name)
+    if source is None:
+        raise ValueError(f"Bilinmeyen orderflow kaynağı: {source_name} ({', '.join(ORDERFLOW_SOURCES)})")
+    return source(inst_id, *whale_thresholds(mcap_class), window_min=window_min, max_pages=max_pages, price=price)
 
 
 # ------------ Teknik Hesaplar ------------
@@ -256,76 +1524,149 @@ def ema(values, period):
     return ema_val
 
 
-def analyze_trades_orderflow(trades, medium_thr, whale_thr, super_thr):
+_indicator_states = None
+_indicator_states_lock = threading.Lock()
+
+
+def indicator_states():
+    global _indicator_states
+    with _indicator_states_lock:
+        if _indicator_states is None:
+            _indicator_states = IndicatorStateStore(INDICATOR_STATE_FILE)
+        return _indicator_states
+
+
+def indicator_snapshots(inst_ids, bar, candles_list, ema_periods=(20,), macd=(12, 26, 9)):
+    """
+    Kalıcı akışlı indikatörlerle son değerler (compute_indicators ile aynı satır biçimi).
+    - Kayıtlı state varsa sadece son çalışmadan beri kapanan barlar beslenir (O(1)/bar).
+    - State yoksa mum deposundaki tüm kapanmış geçmişten toplu olarak kurulur.
+    - Açık son mum state'e yazılmadan hesaba katılır.
+    Mumlar get_candles ile depoya yazılmış olmalı; candles_list sadece açık mum için kullanılır.
     """
-    Spot için orderflow:
+    store = candle_store()
+    states = indicator_states()
+
+    with _indicator_states_lock:
+        fresh = []
+        current = []
+        for inst_id in inst_ids:
+            st = states.get(inst_id, bar, ema_periods, macd)
+            if st is None:
+                fresh.append(inst_id)
+            current.append(st)
+
+        if fresh:
+            histories = [store.closed_columns(inst_id, bar) for inst_id in fresh]
+            for inst_id, st in zip(fresh, seed_states(histories, ema_periods, macd)):
+                states.put(inst_id, bar, st)
+
+        results = []
+        for inst_id, st, candles in zip(inst_ids, current, candles_list):
+            if st is None:
+                st = states.get(inst_id, bar, ema_periods, macd)
+            else:
+                for ts_ms, close in store.closed_since(inst_id, bar, st.last_ts):
+                    st.update(ts_ms, close)
+            open_close = None
+            open_bar = candles.open_bar if candles is not None else None
+            if open_bar and open_bar[0] > (st.last_ts or -1):
+                open_close = open_bar[1]
+            results.append(st.snapshot(open_close))
+    return results
+
+
+class OrderflowAggregator:
+    """
+    Spot için artımlı orderflow (sayfa sayfa beslenir, bellek sabit):
     - Net notional delta (buy_notional - sell_notional)
     - S / M / X seviyesinde en büyük buy whale
     - S / M / X seviyesinde en büyük sell whale
+    Her sayfa bir kez TradeColumns'a çevrilip vektörel orderflow_kernel ile işlenir.
     """
-    buy_notional = 0.0
-    sell_notional = 0.0
-    best_buy = None
-    best_sell = None
 
-    for t in trades:
-        try:
-            px = float(t.get("px"))
-            sz = float(t.get("sz"))
-            side = t.get("side", "").lower()
-        except Exception:
-            continue
+    def __init__(self, medium_thr, whale_thr, super_thr):
+        self.medium_thr = medium_thr
+        self.whale_thr = whale_thr
+        self.super_thr = super_thr
+        self.buy_notional = 0.0
+        self.sell_notional = 0.0
+        self.best_buy = None
+        self.best_sell = None
+        self.count = 0
+        self.oldest_ts = None
+        self.newest_ts = None
+
+    def add(self, trades):
+        """trades: OKX trade dict listesi ya da TradeColumns."""
+        cols = trades if isinstance(trades, TradeColumns) else TradeColumns.from_json(trades)
+        if not len(cols):
+            return
+        part = orderflow_kernel(cols, self.medium_thr, self.whale_thr, self.super_thr)
+
+        self.count += len(cols)
+        self.buy_notional += part["buy_notional"]
+        self.sell_notional += part["sell_notional"]
+        # Eşitlikte önce gelen kalır (tek listede döngüyle aynı davranış)
+        if part["buy_whale"] and (self.best_buy is None or part["buy_whale"]["usd"] > self.best_buy["usd"]):
+            self.best_buy = part["buy_whale"]
+        if part["sell_whale"] and (self.best_sell is None or part["sell_whale"]["usd"] > self.best_sell["usd"]):
+            self.best_sell = part["sell_whale"]
+
+        oldest, newest = cols.ts_range()
+        if oldest is not None:
+            self.oldest_ts = oldest if self.oldest_ts is None else min(self.oldest_ts, oldest)
+            self.newest_ts = newest if self.newest_ts is None else max(self.newest_ts, newest)
+
+    def result(self):
+        span_sec = 0.0
+        if self.oldest_ts is not None:
+            span_sec = (self.newest_ts - self.oldest_ts) / 1000.0
+        return {
+            "buy_notional": self.buy_notional,
+            "sell_notional": self.sell_notional,
+            "net_delta": self.buy_notional - self.sell_notional,
+            "buy_whale": self.best_buy,
+            "sell_whale": self.best_sell,
+            "has_buy_whale": self.best_buy is not None,
+            "has_sell_whale": self.best_sell is not None,
+            "trades": self.count,
+            "span_sec": span_sec,
+        }
 
-        notional = px * abs(sz)
-
-        tier = None
-        if notional >= super_thr:
-            tier = "X"
-        elif notional >= whale_thr:
-            tier = "M"
-        elif notional >= medium_thr:
-            tier = "S"
-
-        if side == "buy":
-            buy_notional += notional
-            if tier:
-                if (best_buy is None) or (notional > best_buy["usd"]):
-                    best_buy = {
-                        "px": px,
-                        "sz": sz,
-                        "usd": notional,
-                        "side": side,
-                        "tier": tier,
-                        "ts": t.get("ts"),
-                    }
-        elif side == "sell":
-            sell_notional += notional
-            if tier:
-                if (best_sell is None) or (notional > best_sell["usd"]):
-                    best_sell = {
-                        "px": px,
-                        "sz": sz,
-                        "usd": notional,
-                        "side": side,
-                        "tier": tier,
-                        "ts": t.get("ts"),
-                    }
-
-    net_delta = buy_notional - sell_notional
 
-    return {
-        "buy_notional": buy_notional,
-        "sell_notional": sell_notional,
-        "net_delta": net_delta,
-        "buy_whale": best_buy,
-        "sell_whale": best_sell,
-        "has_buy_whale": best_buy is not None,
-        "has_sell_whale": best_sell is not None,
-    }
+def analyze_trades_orderflow(trades, medium_thr, whale_thr, super_thr):
+    """Tek seferlik trade listesi için orderflow (OrderflowAggregator sarmalayıcısı)."""
+    agg = OrderflowAggregator(medium_thr, whale_thr, super_thr)
+    agg.add(trades)
+    return agg.result()
+
+
+def orderflow_label(of, window_min):
+    """Rapor için net delta açıklaması: hangi pencereyi gerçekten kapsadığı ile."""
+    if of.get("source") == "taker":
+        window_min = of["window_min"]
+        span = f"{window_min // 60} saat" if window_min % 60 == 0 else f"{window_min} dk"
+        if of.get("complete"):
+            label = f"taker hacmi, son {span}"
+        else:
+            label = f"taker hacmi, son ~{of['span_sec'] / 60:.0f} dk — eksik veri"
+        if of.get("whale_complete") is False:
+            label += f"; whale'ler son ~{of['whale_span_sec'] / 60:.0f} dk"
+        return label
+    window_min = of.get("window_min", window_min)  # taker alınamadıysa tek trade sayfası
+    if window_min <= 0:
+        return f"son {of['trades']} trade"
+    if of.get("complete"):
+        return f"son {window_min} dk, {of['trades']} trade"
+    return f"son ~{of['span_sec'] / 60:.0f} dk, {of['trades']} trade — sayfa limiti"
 
 
 # ------------ BTC & ETH Günlük Özeti ------------
 
+SUMMARY_EMA_PERIODS = (20, 50, 200)
+
+
 def daily_direction_label(trend_txt, mom_txt, net_delta):
     """
     BTC/ETH için basit yön yorumu:
@@ -342,24 +1683,14 @@ def daily_direction_label(trend_txt, mom_txt, net_delta):
     return "Yönsüz / Nötr"
 
 
-def get_daily_summary(inst_id, mcap_map):
-    candles = get_candles(inst_id, bar="1D", limit=CANDLE_LIMIT_DAILY)
-    if len(candles) < 50:
-        return None
-
-    closes = [c["close"] for c in candles]
-    last = closes[-1]
-
-    ema20 = ema(closes, 20)
-    ema50 = ema(closes, 50)
-    ema200 = ema(closes, 200) if len(closes) >= 200 else None
-
-    # MACD (12-26)
-    ema_fast = ema(closes, 12)
-    ema_slow = ema(closes, 26)
-    macd = None
-    if ema_fast is not None and ema_slow is not None:
-        macd = ema_fast - ema_slow
+def build_daily_summary(inst_id, mcap_map, last, ind, of, delta_label):
+    """
+    BTC/ETH günlük özeti (veriler hazır): trend + momentum + orderflow yorumu.
+    ind: EMA 20/50/200 + MACD satırı, of: orderflow sözlüğü ya da None.
+    """
+    ema50 = ind["ema"][50]
+    ema200 = ind["ema"][200]
+    macd = ind["macd"]
 
     # Trend yorumu
     if ema200 is not None:
@@ -391,10 +1722,6 @@ def get_daily_summary(inst_id, mcap_map):
 
     base = inst_id.split("-")[0]
     mcap_class = classify_mcap(base, mcap_map)
-    medium_thr, whale_thr, super_thr = whale_thresholds(mcap_class)
-
-    trades = get_trades(inst_id)
-    of = analyze_trades_orderflow(trades, medium_thr, whale_thr, super_thr) if trades else None
 
     whale_txt = "Veri yok"
     delta_txt = "Veri yok"
@@ -402,7 +1729,7 @@ def get_daily_summary(inst_id, mcap_map):
 
     if of:
         net_delta_val = of["net_delta"]
-        delta_txt = f"Net delta (son {TRADES_LIMIT} trade): {of['net_delta']:.0f} USDT"
+        delta_txt = f"Net delta ({delta_label}): {of['net_delta']:.0f} USDT"
         w_buy = of["buy_whale"]
         w_sell = of["sell_whale"]
         if w_buy and (not w_sell or w_buy["usd"] >= (w_sell["usd"] if w_sell else 0)):
@@ -427,44 +1754,73 @@ def get_daily_summary(inst_id, mcap_map):
     }
 
 
+def get_daily_summary(inst_id, mcap_map):
+    candles = get_candles(inst_id, bar="1D", limit=CANDLE_HISTORY_DAILY)
+    if len(candles) < 50:
+        return None
+
+    # EMA 20/50/200 + MACD (12-26): kalıcı akışlı state'ten
+    ind = indicator_snapshots([inst_id], "1D", [candles], SUMMARY_EMA_PERIODS, macd=(12, 26, 9))[0]
+
+    of = fetch_orderflow(
+        ORDERFLOW_SOURCE, inst_id, classify_mcap(inst_id.split("-")[0], mcap_map),
+        ORDERFLOW_WINDOW_MIN, ORDERFLOW_MAX_PAGES, price=candles.close[-1],
+    )
+    if not of["trades"]:
+        of = None
+    label = orderflow_label(of, ORDERFLOW_WINDOW_MIN) if of else ""
+
+    return build_daily_summary(inst_id, mcap_map, candles.close[-1], ind, of, label)
+
+
 # ------------ Altcoin Tarama (Günün adayları) ------------
 
-def analyze_altcoin_for_daily(inst_id, ticker_info, mcap_map):
+def fetch_altcoin_inputs(inst_id, mcap_map):
     """
-    Günlük altcoin analizi:
-    - Trend (fiyat vs EMA20)
-    - Net delta + whale
-    - 24h % değişim
+    Altcoin analizi için ağdan gelen veriler: (candles, orderflow, book), yetersizse None.
+    Orderflow ALT_ORDERFLOW_SOURCE'tan (trades: sayfalar geldikçe toplanır, ALT_ORDERFLOW_WINDOW_MIN).
+    book: L2 defter özeti (ORDERBOOK_DEPTH > 0 ise), alınamazsa None — analiz defter olmadan da yapılır.
     """
     candles = get_candles(inst_id, bar="1D", limit=60)
     if len(candles) < 30:
         return None
 
-    closes = [c["close"] for c in candles]
-    last = closes[-1]
-    ema20 = ema(closes, 20)
+    of = fetch_orderflow(
+        ALT_ORDERFLOW_SOURCE, inst_id, classify_mcap(inst_id.split("-")[0], mcap_map),
+        ALT_ORDERFLOW_WINDOW_MIN, ALT_ORDERFLOW_MAX_PAGES, price=candles.close[-1],
+    )
+    if not of["trades"]:
+        return None
+    book = book_metrics(get_orderbook(inst_id)) if ORDERBOOK_DEPTH > 0 else None
+    return candles, of, book
+
+
+def trend_tag(last, ema):
+    """Fiyat EMA'nın %1 üstünde UP, %1 altında DOWN, arada FLAT."""
+    if last > ema * 1.01:
+        return "UP"
+    if last < ema * 0.99:
+        return "DOWN"
+    return "FLAT"
+
+
+def build_altcoin_stats(inst_id, ticker_info, mcap_map, last, of, ema20, book=None):
+    """
+    Günlük altcoin analizi (son fiyat, orderflow ve EMA20 hazır):
+    - Trend (fiyat vs EMA20)
+    - Net delta + whale
+    - 24h % değişim
+    - L2 defter: bant derinliği, alış/satış dengesizliği, duvarlar (varsa)
+    """
     if ema20 is None:
         return None
 
-    # Trend etiketi
-    if last > ema20 * 1.01:
-        trend_tag = "UP"
-    elif last < ema20 * 0.99:
-        trend_tag = "DOWN"
-    else:
-        trend_tag = "FLAT"
+    trend = trend_tag(last, ema20)
 
     base = inst_id.split("-")[0]
     mcap_class = classify_mcap(base, mcap_map)
-    medium_thr, whale_thr, super_thr = whale_thresholds(mcap_class)
     nd_pos, nd_neg = net_delta_thresholds(mcap_class)
 
-    trades = get_trades(inst_id)
-    if not trades:
-        return None
-
-    of = analyze_trades_orderflow(trades, medium_thr, whale_thr, super_thr)
-
     last_ticker_px = ticker_info.get("last")
     sod_px = ticker_info.get("sod")
     pct_change_24h = None
@@ -475,7 +1831,7 @@ def analyze_altcoin_for_daily(inst_id, ticker_info, mcap_map):
         "inst_id": inst_id,
         "last": last,
         "ema20": ema20,
-        "trend_tag": trend_tag,
+        "trend_tag": trend,
         "net_delta": of["net_delta"],
         "buy_whale": of["buy_whale"],
         "sell_whale": of["sell_whale"],
@@ -485,9 +1841,20 @@ def analyze_altcoin_for_daily(inst_id, ticker_info, mcap_map):
         "nd_pos_thr": nd_pos,
         "nd_neg_thr": nd_neg,
         "pct_change_24h": pct_change_24h,
+        "book": book,
     }
 
 
+def analyze_altcoin_for_daily(inst_id, ticker_info, mcap_map):
+    """Tek sembol için günlük altcoin analizi (çekim + EMA20 + istatistik)."""
+    inputs = fetch_altcoin_inputs(inst_id, mcap_map)
+    if not inputs:
+        return None
+    candles, of, book = inputs
+    ema20 = indicator_snapshots([inst_id], "1D", [candles], (20,), macd=None)[0]["ema"][20]
+    return build_altcoin_stats(inst_id, ticker_info, mcap_map, candles.close[-1], of, ema20, book)
+
+
 def pick_daily_candidates(alt_stats_list, max_each=3):
     """
     En güçlü 3 LONG, 3 SHORT ve "buyer var ama hareket yok" 3 coin'i seçer.
@@ -531,11 +1898,342 @@ def pick_daily_candidates(alt_stats_list, max_each=3):
     return long_cands[:max_each], short_cands[:max_each], buyer_accum[:max_each]
 
 
+def _fetch_one(i, total, inst_id, mcap_map):
+    print(f"[{i}/{total}] {inst_id} analiz ediliyor...")
+    try:
+        with TELEMETRY.span("symbol_fetch", inst_id=inst_id):
+            return fetch_altcoin_inputs(inst_id, mcap_map)
+    except Exception as e:
+        print(f"  {inst_id} analiz hatası:", e)
+        return None
+
+
+def scan_altcoins(tickers, mcap_map, workers=SCAN_WORKERS):
+    """
+    Ticker listesindeki altcoinleri analiz eder:
+    1) Mum çekimi + orderflow: workers > 1 ise thread havuzunda paralel (ağ beklemesi üst üste biner).
+       Hız sınırı RATE_LIMITER'dadır: istekler endpoint limitinin izin verdiği kadar hızlı gider.
+    2) EMA20 kalıcı akışlı state'ten; state'i olmayan semboller tek toplu hesapta kurulur.
+    3) Orderflow + istatistik sembol başına.
+    Sonuç listesi her durumda ticker sırasındadır → pick_daily_candidates çıktısı değişmez.
+    RUN_BUDGET doluyorsa çekimi süresinde bitmeyen semboller beklenmez: sıradakiler iptal edilir,
+    uçuştakilerin sonucu atılır, hepsi RUN_BUDGET.skipped["scan"]'e yazılır.
+    """
+    # BTC & ETH'yi altcoin listesinden hariç tutabiliriz, zaten ayrıca analiz ediliyor
+    jobs = [
+        (i, t) for i, t in enumerate(tickers, start=1)
+        if t["inst_id"] not in ("BTC-USDT", "ETH-USDT")
+    ]
+    total = len(tickers)
+    skipped = []
+
+    with TELEMETRY.span("altcoin_fetch", symbols=len(jobs), workers=workers):
+        if workers <= 1:
+            inputs = []
+            for i, t in jobs:
+                inp = None if RUN_BUDGET.expired() else _fetch_one(i, total, t["inst_id"], mcap_map)
+                if RUN_BUDGET.expired():
+                    # Süre dolduktan sonra dönen çekim yarım kalmış olabilir → atlanmış sayılır
+                    skipped.append(t["inst_id"])
+                    inp = None
+                inputs.append(inp)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers)
+            futures = [pool.submit(_fetch_one, i, total, t["inst_id"], mcap_map) for i, t in jobs]
+            done, _ = wait_futures(futures, timeout=RUN_BUDGET.remaining())
+            # Süre dolduysa sıradakiler iptal; uçuştakiler beklenmez (istekleri kalan süreyle sınırlı)
+            pool.shutdown(wait=not RUN_BUDGET.enabled, cancel_futures=True)
+            inputs = [f.result() if f in done else None for f in futures]
+            skipped.extend(t["inst_id"] for (_, t), f in zip(jobs, futures) if f not in done)
+    if skipped:
+        RUN_BUDGET.skip("scan", skipped)
+        TELEMETRY.set("budget_skipped_symbols", len(skipped), stage="scan")
+        print(f"⏱ Süre bütçesi doldu: {len(skipped)}/{len(jobs)} sembol taranamadı.")
+
+    ready = [(t, inp) for (_, t), inp in zip(jobs, inputs) if inp]
+    with TELEMETRY.span("altcoin_indicators", symbols=len(ready)):
+        indicators = indicator_snapshots(
+            [t["inst_id"] for t, _ in ready], "1D", [candles for _, (candles, _, _) in ready], (20,), macd=None
+        )
+
+    # Backtest için günün orderflow özeti saklanır
+    candle_store().put_orderflow([(t["inst_id"], candles.ts[-1], of) for t, (candles, of, _) in ready])
+
+    alt_stats = []
+    with TELEMETRY.span("altcoin_build", symbols=len(ready)):
+        for (t, (candles, of, book)), ind in zip(ready, indicators):
+            inst_id = t["inst_id"]
+            try:
+                s = build_altcoin_stats(inst_id, t, mcap_map, candles.close[-1], of, ind["ema"][20], book)
+            except Exception as e:
+                print(f"  {inst_id} analiz hatası:", e)
+                continue
+            if s:
+                alt_stats.append(s)
+    TELEMETRY.set("scan_symbols", len(jobs), phase="scanned")
+    TELEMETRY.set("scan_symbols", len(ready), phase="fetched")
+    TELEMETRY.set("scan_symbols", len(alt_stats), phase="analyzed")
+    return alt_stats
+
+
+# ------------ WebSocket Orderflow Daemon ------------
+
+class OrderflowDaemon:
+    """
+    OKX public `trades` + `tickers` kanallarını dinler, enstrüman başına kayan
+    pencerelerde (5m/1h/24h) net delta ve whale istatistiği tutar.
+    WS_BOOKS açıksa `books` kanalından enstrüman başına L2 defter (checksum'lı) tutulur;
+    sıra kopar ya da checksum tutmazsa o enstrümanın kanalı yeniden abone edilip snapshot beklenir.
+    Rapor REST taraması yapmadan bellekteki durumdan anında üretilir;
+    sadece EMA/MACD state'leri günde bir mum deposundan tazelenir.
+    """
+
+    def __init__(self, tickers, mcap_map, window=WS_REPORT_WINDOW, record_path=None):
+        self.tickers = {t["inst_id"]: dict(t) for t in tickers}
+        for inst_id in ("BTC-USDT", "ETH-USDT"):
+            self.tickers.setdefault(inst_id, {"inst_id": inst_id, "last": None, "sod": None, "vol_quote": 0.0})
+        self.mcap_map = mcap_map
+        self.window = window
+        self.flows = {inst_id: InstrumentFlow() for inst_id in self.tickers}
+        self.books = {inst_id: L2Book(inst_id) for inst_id in self.tickers} if WS_BOOKS else {}
+        self.resync = set()
+        self.indicator_day = None
+        self.lock = threading.Lock()
+        self.record = open(record_path, "a", encoding="utf-8") if record_path else None
+        self.started = time.monotonic()
+        self.messages = 0
+
+    # --- indikatörler (REST, günde bir) ---
+
+    def refresh_indicators(self):
+        day = now_utc().date()
+        if self.indicator_day == day:
+            return
+        print(f"[{ts()}] Daemon: {len(self.tickers)} sembol için günlük mumlar tazeleniyor...")
+        inst_ids = list(self.tickers)
+        limits = [CANDLE_HISTORY_DAILY if i in ("BTC-USDT", "ETH-USDT") else 60 for i in inst_ids]
+        with ThreadPoolExecutor(max_workers=max(SCAN_WORKERS, 1)) as pool:
+            candles_list = list(pool.map(lambda a: get_candles(a[0], bar="1D", limit=a[1]), zip(inst_ids, limits)))
+        alts = [(i, c) for i, c in zip(inst_ids, candles_list) if i not in ("BTC-USDT", "ETH-USDT")]
+        indicator_snapshots([i for i, _ in alts], "1D", [c for _, c in alts], (20,), macd=None)
+        for inst_id, candles in zip(inst_ids, candles_list):
+            if inst_id in ("BTC-USDT", "ETH-USDT"):
+                indicator_snapshots([inst_id], "1D", [candles], SUMMARY_EMA_PERIODS, macd=(12, 26, 9))
+            if candles and self.tickers[inst_id].get("last") is None:
+                self.tickers[inst_id]["last"] = candles.close[-1]
+        indicator_states().save()
+        self.indicator_day = day
+
+    def _indicators(self, inst_id, ema_periods, macd, last):
+        st = indicator_states().get(inst_id, "1D", ema_periods, macd)
+        if st is None or st.last_ts is None:
+            return None
+        # Kapanmış barlar state'te, bugünkü açık bar = canlı fiyat
+        return st.snapshot(open_close=last)
+
+    # --- WebSocket ---
+
+    def subscribe_args(self):
+        args = []
+        for inst_id in self.tickers:
+            args.append({"channel": "trades", "instId": inst_id})
+            args.append({"channel": "tickers", "instId": inst_id})
+            if inst_id in self.books:
+                args.append({"channel": "books", "instId": inst_id})
+        return args
+
+    def handle_message(self, text):
+        if self.record:
+            self.record.write(json.dumps({"t": round(time.monotonic() - self.started, 3), "msg": text}) + "\n")
+        if text == "pong":
+            return
+        try:
+            msg = json.loads(text)
+        except ValueError:
+            return
+        if msg.get("event") == "error":
+            print(f"  WS hata: code={msg.get('code')} msg={msg.get('msg')}")
+            return
+        arg = msg.get("arg") or {}
+        inst_id = arg.get("instId")
+        data = msg.get("data")
+        if not data or inst_id not in self.tickers:
+            return
+        self.messages += 1
+        channel = arg.get("channel")
+        with self.lock:
+            if channel == "trades":
+                cols = TradeColumns.from_json(data)
+                self.flows[inst_id].add_columns(cols)
+                archive_trades(inst_id, cols)
+            elif channel == "books" and inst_id in self.books:
+                book = self.books[inst_id]
+                for d in data:
+                    if not book.handle(msg.get("action"), d):
+                        self.resync.add(inst_id)
+                        break
+            elif channel == "tickers":
+                d = data[-1]
+                t = self.tickers[inst_id]
+                try:
+                    t["last"] = float(d.get("last"))
+                    t["sod"] = float(d["sodUtc0"]) if d.get("sodUtc0") is not None else t.get("sod")
+                    t["vol_quote"] = float(d.get("volCcy24h") or t.get("vol_quote") or 0.0)
+                except (TypeError, ValueError):
+                    pass
+
+    def run(self, url=OKX_WS_URL, stop=None, on_tick=None):
+        """Bağlan, abone ol, mesajları işle; kopunca backoff ile yeniden bağlan. stop set edilince döner."""
+        stop = stop or threading.Event()
+        attempt = 0
+        while not stop.is_set():
+            ws = WebSocketClient(url)
+            try:
+                ws.connect()
+                args = self.subscribe_args()
+                for i in range(0, len(args), 100):
+                    ws.send_text(json.dumps({"op": "subscribe", "args": args[i:i + 100]}))
+                print(f"[{ts()}] WS bağlandı: {url} ({len(args)} kanal)")
+                attempt = 0
+                idle_since = time.monotonic()
+                while not stop.is_set():
+                    text = ws.recv(timeout=1.0)
+                    if text is None:
+                        if time.monotonic() - idle_since > WS_PING_SEC:
+                            ws.send_text("ping")
+                            idle_since = time.monotonic()
+                    else:
+                        idle_since = time.monotonic()
+                        self.handle_message(text)
+                    if self.resync:
+                        self._resubscribe_books(ws)
+                    if on_tick:
+                        on_tick()
+            except (OSError, ValueError) as e:
+                print(f"  WS bağlantı hatası: {e}")
+                HTTP.backoff(min(attempt, 5))
+                attempt += 1
+            finally:
+                ws.close()
+        if self.record:
+            self.record.close()
+
+    def _resubscribe_books(self, ws):
+        """Tutarsız defterler: unsubscribe + subscribe → OKX yeni bir snapshot gönderir."""
+        with self.lock:
+            args = [{"channel": "books", "instId": inst_id} for inst_id in sorted(self.resync)]
+            self.resync.clear()
+        print(f"  Defter yeniden eşitleniyor: {', '.join(a['instId'] for a in args)}")
+        ws.send_text(json.dumps({"op": "unsubscribe", "args": args}))
+        ws.send_text(json.dumps({"op": "subscribe", "args": args}))
+
+    # --- rapor ---
+
+    def book(self, inst_id):
+        book = self.books.get(inst_id)
+        if book is None:
+            return None
+        with self.lock:
+            return book_metrics(book)
+
+    def orderflow(self, inst_id, now_ms):
+        medium_thr, whale_thr, super_thr = whale_thresholds(classify_mcap(inst_id.split("-")[0], self.mcap_map))
+        with self.lock:
+            return self.flows[inst_id].summary(self.window, now_ms, medium_thr, whale_thr, super_thr)
+
+    def summary(self, inst_id, now_ms):
+        last = self.tickers[inst_id].get("last")
+        ind = self._indicators(inst_id, SUMMARY_EMA_PERIODS, (12, 26, 9), last) if last else None
+        if ind is None:
+            return None
+        of = self.orderflow(inst_id, now_ms)
+        label = f"son {self.window}, {of['trades']} trade (canlı)"
+        return build_daily_summary(inst_id, self.mcap_map, last, ind, of if of["trades"] else None, label)
+
+    def alt_stats(self, now_ms):
+        out = []
+        for inst_id, t in self.tickers.items():
+            if inst_id in ("BTC-USDT", "ETH-USDT") or not t.get("last"):
+                continue
+            ind = self._indicators(inst_id, (20,), None, t["last"])
+            of = self.orderflow(inst_id, now_ms)
+            if ind is None or not of["trades"]:
+                continue
+            s = build_altcoin_stats(inst_id, t, self.mcap_map, t["last"], of, ind["ema"][20], self.book(inst_id))
+            if s:
+                out.append(s)
+        return out
+
+    def report(self):
+        self.refresh_indicators()
+        at_ms = now_ms()
+        btc_info = self.summary("BTC-USDT", at_ms)
+        eth_info = self.summary("ETH-USDT", at_ms)
+        # Sıra: ticker sırası (hacme göre) → tarama moduyla aynı seçim sırası
+        alt_stats = self.alt_stats(at_ms)
+        long_list, short_list, buyer_list = pick_daily_candidates(alt_stats, max_each=3)
+        save_results(btc_info, eth_info, alt_stats, long_list, short_list, buyer_list)
+        return build_daily_report(btc_info, eth_info, long_list, short_list, buyer_list)
+
+
+def run_ws_daemon(duration=None, record_path=None, report_on_exit=False, url=None):
+    """
+    Kalıcı orderflow modu: WS'ten canlı veri toplar, her gün WS_REPORT_TIME_UTC'de
+    raporu bellekteki durumdan üretip Telegram'a gönderir.
+    """
+    print(f"[{ts()}] WS orderflow daemon başlıyor...")
+    tickers = get_spot_usdt_top_tickers(limit=TOP_LIMIT_DAILY)
+    symbols = {"BTC", "ETH"} | {t["inst_id"].split("-")[0] for t in tickers}
+    daemon = OrderflowDaemon(tickers, load_mcap_map(symbols), record_path=record_path)
+    daemon.refresh_indicators()
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    deadline = time.monotonic() + duration if duration else None
+    report_h, report_m = (int(x) for x in WS_REPORT_TIME_UTC.split(":"))
+    now = now_utc()
+    # Rapor saati bugün geçtiyse ilk rapor yarın, geçmediyse bugün
+    sent_day = now.date() if (now.hour, now.minute) >= (report_h, report_m) else now.date() - timedelta(days=1)
+
+    archive_flushed = time.monotonic()
+
+    def on_tick():
+        nonlocal sent_day, archive_flushed
+        if deadline is not None and time.monotonic() >= deadline:
+            stop.set()
+        if time.monotonic() - archive_flushed >= TRADE_ARCHIVE_FLUSH_SEC:
+            archive_flushed = time.monotonic()
+            flush_trade_archive()
+        now = now_utc()
+        if now.date() != sent_day and (now.hour, now.minute) >= (report_h, report_m):
+            sent_day = now.date()
+            telegram(daemon.report())
+            print(f"[{ts()}] ✅ Daemon günlük raporu gönderildi.")
+
+    daemon.run(url or OKX_WS_URL, stop=stop, on_tick=on_tick)
+    flush_trade_archive()
+    print(f"Daemon durdu. İşlenen mesaj: {daemon.messages}")
+    if report_on_exit:
+        telegram(daemon.report())
+
+
 # ------------ Telegram Mesajı (Günlük Rapor) ------------
 
-def build_daily_report(btc_info, eth_info, long_list, short_list, buyer_list):
+def book_txt(book):
+    """Defter satırı: bant içi alış/satış dengesi + varsa duvarlar."""
+    imb = book["imbalance"]
+    txt = f"Defter (±{book['band_pct']:g}%): denge `{imb * 100:+.0f}%`" if imb is not None else "Defter: -"
+    for key, name in (("bid_wall", "alış duvarı"), ("ask_wall", "satış duvarı")):
+        w = book[key]
+        if w:
+            txt += f" | {name} ~`${w['usd']:,.0f}` @ {w['px']:.4f}"
+    return txt
+
+
+def build_daily_report(btc_info, eth_info, long_list, short_list, buyer_list, notes=None):
     lines = []
-    today_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    today_str = now_utc().strftime("%Y-%m-%d")
 
     lines.append(f"*📅 Günlük Piyasa Özeti – 1D (OKX)*")
     lines.append(f"_Tarih (UTC):_ `{today_str}`\n")
@@ -612,6 +2310,8 @@ def build_daily_report(btc_info, eth_info, long_list, short_list, buyer_list):
             lines.append(f"- Fiyat: `{s['last']:.4f}`  | EMA20: `{s['ema20']:.4f}`")
             lines.append(f"- Trend: `{s['trend_tag']}`  | 24h Değişim: `{ch_txt}`")
             lines.append(f"- Net delta: `{nd:.0f} USDT`")
+            if s.get("book"):
+                lines.append(f"- {book_txt(s['book'])}")
             lines.append(f"- {w_txt}\n")
 
     # SHORT adayları
@@ -635,6 +2335,8 @@ def build_daily_report(btc_info, eth_info, long_list, short_list, buyer_list):
             lines.append(f"- Fiyat: `{s['last']:.4f}`  | EMA20: `{s['ema20']:.4f}`")
             lines.append(f"- Trend: `{s['trend_tag']}`  | 24h Değişim: `{ch_txt}`")
             lines.append(f"- Net delta: `{nd:.0f} USDT`")
+            if s.get("book"):
+                lines.append(f"- {book_txt(s['book'])}")
             lines.append(f"- {w_txt}\n")
 
     # Buyer var ama hareket yok
@@ -658,58 +2360,843 @@ def build_daily_report(btc_info, eth_info, long_list, short_list, buyer_list):
             lines.append(f"- Fiyat: `{s['last']:.4f}`  | EMA20: `{s['ema20']:.4f}`")
             lines.append(f"- Trend: `{s['trend_tag']}`  | 24h Değişim: `{ch_txt}`")
             lines.append(f"- Net delta: `{nd:.0f} USDT`")
+            if s.get("book"):
+                lines.append(f"- {book_txt(s['book'])}")
             lines.append(f"- {w_txt}")
             lines.append(f"_Not:_ Whale alımı + pozitif net delta var ama günlük hareket sınırlı. Gün içinde patlama potansiyeli olabilir.\n")
 
+    # Eksik veri uyarıları (ör. zamanında gelmeyen shard'lar)
+    for note in notes or []:
+        lines.append(f"⚠️ _{note}_")
+    if notes:
+        lines.append("")
+
     lines.append(f"_Rapor oluşturma zamanı (UTC):_ `{ts()}`")
 
     return "\n".join(lines)
 
 
+# ------------ Sonuç geçmişi ------------
+
+def save_results(btc_info, eth_info, alt_stats, long_list, short_list, buyer_list):
+    """Günün alt_stats / BTC-ETH özetleri / seçimleri RESULTS_DB'ye (gün başına son çalışma)."""
+    if not RESULTS_DB:
+        return
+    store = ResultsStore(RESULTS_DB)
+    try:
+        store.save_run(
+            now_utc().strftime("%Y-%m-%d"),
+            alt_stats,
+            [btc_info, eth_info],
+            {"long": long_list, "short": short_list, "buyer": buyer_list},
+        )
+    finally:
+        store.close()
+
+
+# ------------ Çoklu zaman dilimi (MTF) taraması ------------
+#
+# Enstrüman başına tek get_candles (MTF_BASE_BAR, depoda artımlı); MTF_BARS'taki diğer dilimler
+# resample.py ile yerelde türetilir (UTC hizalı). İndikatörler her dilimde tüm semboller için
+# tek toplu compute_indicators çağrısıyla hesaplanır.
+
+def mtf_views(inst_id):
+    """{bar: CandleSeries} (açık son bar dahil); taban bar alınamazsa boş dict."""
+    base = get_candles(inst_id, bar=MTF_BASE_BAR, limit=MTF_HISTORY_BARS)
+    if not len(base):
+        return {}
+    return resample_all(base, MTF_BASE_BAR, MTF_BARS)
+
+
+def mtf_signals(inst_ids, views_list, bars=MTF_BARS):
+    """
+    Sembol başına dilim dilim trend (son fiyat vs EMA20, EMA20 vs EMA50) ve momentum (MACD histogramı).
+    Skor: dilim başına trend UP +1 / DOWN −1, momentum ±0.5. Dönüş: satır listesi (skora göre azalan).
+    """
+    rows = [{"inst_id": i, "last": None, "tf": {}, "score": 0.0} for i in inst_ids]
+    for bar in bars:
+        idx = [k for k, views in enumerate(views_list) if len(views.get(bar) or ())]
+        ind = compute_indicators([views_list[k][bar].close for k in idx], ema_periods=(20, 50), macd=(12, 26, 9))
+        for k, r in zip(idx, ind):
+            row = rows[k]
+            last = views_list[k][bar].close[-1]
+            row["last"] = last
+            ema20, ema50, hist = r["ema"][20], r["ema"][50], r["macd_hist"]
+            if ema20 is None:
+                continue
+            trend = trend_tag(last, ema20)
+            if ema50 is not None and trend != "FLAT" and (trend == "UP") != (ema20 > ema50):
+                trend = "FLAT"  # fiyat ve EMA dizilimi çelişiyor
+            momentum = None if hist is None else ("+" if hist > 0 else "-")
+            row["tf"][bar] = {"trend": trend, "momentum": momentum}
+            row["score"] += {"UP": 1.0, "DOWN": -1.0}.get(trend, 0.0)
+            if momentum:
+                row["score"] += 0.5 if momentum == "+" else -0.5
+    rows = [r for r in rows if r["tf"]]
+    rows.sort(key=lambda r: r["score"], reverse=True)
+    return rows
+
+
+def _mtf_line(row, bars):
+    marks = []
+    for bar in bars:
+        tf = row["tf"].get(bar)
+        if tf is None:
+            marks.append(f"{bar} ·")
+            continue
+        arrow = {"UP": "▲", "DOWN": "▼"}.get(tf["trend"], "■")
+        marks.append(f"{bar} {arrow}{tf['momentum'] or ''}")
+    return f"*{row['inst_id']}* `{row['last']:.6g}` | " + "  ".join(marks) + f" | skor `{row['score']:+.1f}`"
+
+
+def build_mtf_report(rows, bars=MTF_BARS, top=MTF_TOP):
+    lines = [f"*🕐 Çoklu Zaman Dilimi Taraması – {'/'.join(bars)} (OKX)*"]
+    lines.append(f"_Tarih (UTC):_ `{now_utc().strftime('%Y-%m-%d %H:%M')}`")
+    lines.append("_▲ UP ▼ DOWN ■ FLAT, +/− MACD histogramı_\n")
+
+    majors = [r for r in rows if r["inst_id"] in ("BTC-USDT", "ETH-USDT")]
+    for r in sorted(majors, key=lambda r: r["inst_id"]):
+        lines.append(_mtf_line(r, bars))
+    if majors:
+        lines.append("")
+
+    alts = [r for r in rows if r["inst_id"] not in ("BTC-USDT", "ETH-USDT")]
+    full = [r for r in alts if len(r["tf"]) == len(bars)]
+    up = [r for r in full if all(tf["trend"] == "UP" for tf in r["tf"].values())][:top]
+    down = [r for r in reversed(full) if all(tf["trend"] == "DOWN" for tf in r["tf"].values())][:top]
+    for title, lst in (("🟢 *Tüm dilimlerde yukarı*", up), ("🔴 *Tüm dilimlerde aşağı*", down)):
+        lines.append(title)
+        lines.extend(_mtf_line(r, bars) for r in lst)
+        if not lst:
+            lines.append("_Uygun sembol yok._")
+        lines.append("")
+    lines.append(f"_{len(rows)} sembol tarandı; dilimler tek {MTF_BASE_BAR} çekiminden türetildi._")
+    return "\n".join(lines)
+
+
+def run_mtf(send=True):
+    """Elenmiş evren + BTC/ETH için MTF taraması; raporu Telegram'a gönderir (send=False: yazdırır)."""
+    print(f"[{ts()}] Çoklu zaman dilimi taraması ({'/'.join(MTF_BARS)}, taban {MTF_BASE_BAR})...")
+    with TELEMETRY.span("tickers", stage=True):
+        tickers, _ = screen_tickers(get_spot_usdt_tickers(), budget=SCAN_BUDGET)
+    inst_ids = ["BTC-USDT", "ETH-USDT"] + [t["inst_id"] for t in tickers]
+    with TELEMETRY.span("mtf_candles", stage=True):
+        with ThreadPoolExecutor(max_workers=max(SCAN_WORKERS, 1)) as pool:
+            views_list = list(pool.map(mtf_views, inst_ids))
+    with TELEMETRY.span("mtf_indicators", stage=True):
+        rows = mtf_signals(inst_ids, views_list)
+    with TELEMETRY.span("report_build", stage=True):
+        msg = build_mtf_report(rows)
+    if send:
+        with TELEMETRY.span("telegram_send", stage=True):
+            telegram(msg)
+    else:
+        print(msg)
+    return msg
+
+
 # ------------ MAIN ------------
 
-def main():
-    print(f"[{ts()}] Günlük analiz botu çalışıyor...")
+def prepare_universe():
+    """1. aşama eleme + taranacak semboller için mcap haritası → (tickers, mcap_map)."""
+    # 1. aşama: tüm USDT spot evreni tek ticker yanıtıyla elenir
+    print("OKX USDT spot evreni çekiliyor...")
+    with RUN_BUDGET.stage("universe"), TELEMETRY.span("tickers", stage=True):
+        universe = get_spot_usdt_tickers()
+        tickers, passed = screen_tickers(universe, budget=SCAN_BUDGET)
+    TELEMETRY.set("scan_symbols", len(universe), phase="universe")
+    TELEMETRY.set("scan_symbols", passed, phase="screened")
+    if not tickers:
+        print("Taranacak sembol bulunamadı, sadece BTC/ETH raporlanacak.")
+    else:
+        print(f"Ön eleme: {len(universe)} USDT çifti, {passed} filtreyi geçti, {len(tickers)} detaylı taramaya alındı.")
 
-    # MCAP haritası
-    print("CoinGecko market cap verisi çekiliyor...")
-    mcap_map = load_mcap_map()
+    # MCAP haritası: sadece taranacak semboller için (cache'ten, gerekirse hedefli yenileme)
+    print("Market cap verisi yükleniyor...")
+    symbols = {"BTC", "ETH"} | {t["inst_id"].split("-")[0] for t in tickers}
+    with RUN_BUDGET.stage("universe"), TELEMETRY.span("mcap_load", stage=True):
+        mcap_map = load_mcap_map(symbols)
     print(f"MCAP haritası yüklendi. Sembol sayısı: {len(mcap_map)}")
+    return tickers, mcap_map
+
 
-    # BTC & ETH günlük özet
+def summarize_majors(mcap_map):
     print("BTC & ETH günlük analiz yapılıyor...")
-    btc_info = get_daily_summary("BTC-USDT", mcap_map)
-    eth_info = get_daily_summary("ETH-USDT", mcap_map)
+    with RUN_BUDGET.stage("majors"), TELEMETRY.span("btc_eth_summary", stage=True):
+        return get_daily_summary("BTC-USDT", mcap_map), get_daily_summary("ETH-USDT", mcap_map)
 
-    # Top USDT spot tickers
-    print("OKX top USDT spot listesi çekiliyor...")
-    tickers = get_spot_usdt_top_tickers(limit=TOP_LIMIT_DAILY)
-    if not tickers:
-        print("Top tickers alınamadı, sadece BTC/ETH raporlanacak.")
+
+def finish_report(btc_info, eth_info, alt_stats, notes=None, send=True):
+    """
+    Seçim + sonuç geçmişi + rapor + Telegram + HTTP istatistikleri. Rapor metnini döndürür.
+    send=False: gün içi tarama; rapor gönderilmez, günün sonuç geçmişi değiştirilmez.
+    """
+    with TELEMETRY.span("pick", stage=True):
+        long_list, short_list, buyer_list = pick_daily_candidates(alt_stats, max_each=3)
+    for name, lst in (("long", long_list), ("short", short_list), ("buyer", buyer_list)):
+        TELEMETRY.set("report_candidates", len(lst), list=name)
+
+    if send:
+        with TELEMETRY.span("results_save", stage=True):
+            save_results(btc_info, eth_info, alt_stats, long_list, short_list, buyer_list)
+
+    with TELEMETRY.span("report_build", stage=True):
+        msg = build_daily_report(btc_info, eth_info, long_list, short_list, buyer_list, notes=notes)
+    if send:
+        with TELEMETRY.span("telegram_send", stage=True):
+            telegram(msg)
+
+    http_stats = HTTP.stats()
+    for host, st in http_stats.items():
+        print(
+            f"HTTP {host}: {st['requests']} istek, {st['connections']} yeni bağlantı, "
+            f"{st['reused']} yeniden kullanım, p50 {st['p50_ms']:.0f} ms, p99 {st['p99_ms']:.0f} ms"
+        )
+    if HTTP_STATS_FILE:
+        with open(HTTP_STATS_FILE, "w", encoding="utf-8") as f:
+            json.dump(http_stats, f, indent=2)
+    return msg
+
+
+def new_budget():
+    """Çalışma başına süre bütçesi (RUN_BUDGET_SEC, RUN_BUDGET_SHARES); 0 → bütçesiz."""
+    budget = RunBudget(RUN_BUDGET_SEC, parse_shares(RUN_BUDGET_SHARES))
+    if budget.enabled:
+        plan = ", ".join(f"{name} %{share * 100:.0f}" for name, share in budget.shares.items())
+        print(f"Süre bütçesi: {RUN_BUDGET_SEC:.0f} sn ({plan})")
+    return budget
+
+
+def budget_notes(budget, scanned):
+    """Süre bütçesi dolan aşamalar için rapor notları."""
+    notes = []
+    stages = budget.stages
+    if stages.get("universe", {}).get("expired"):
+        notes.append("Evren / market cap yüklemesi süre bütçesini aştı, eleme eksik veriyle yapılmış olabilir.")
+    if stages.get("majors", {}).get("expired"):
+        notes.append("BTC & ETH özeti süre bütçesinde tamamlanamadı, orderflow penceresi eksik olabilir.")
+    skipped = budget.skipped.get("scan") or []
+    if skipped:
+        shown = ", ".join(s.split("-")[0] for s in skipped[:20])
+        more = f" ve {len(skipped) - 20} sembol daha" if len(skipped) > 20 else ""
+        notes.append(
+            f"Süre bütçesi ({budget.total:.0f} sn) doldu: {len(skipped)}/{scanned} sembol taranamadı, "
+            f"bu rapora dahil değil: {shown}{more}."
+        )
+    return notes
+
+
+def main(send=True):
+    global RUN_BUDGET
+    print(f"[{ts()}] Günlük analiz botu çalışıyor...")
+    RUN_BUDGET = new_budget()
+
+    tickers, mcap_map = prepare_universe()
+    btc_info, eth_info = summarize_majors(mcap_map)
 
     alt_stats = []
     if tickers:
-        print(f"{len(tickers)} sembol için günlük altcoin taraması başlıyor...")
-        for i, t in enumerate(tickers, start=1):
-            inst_id = t["inst_id"]
-            # BTC & ETH'yi altcoin listesinden hariç tutabiliriz, zaten yukarıda analiz edildi
-            if inst_id in ("BTC-USDT", "ETH-USDT"):
+        print(f"{len(tickers)} sembol için günlük altcoin taraması başlıyor (worker: {SCAN_WORKERS})...")
+        with RUN_BUDGET.stage("scan"), TELEMETRY.span("altcoin_scan", stage=True):
+            alt_stats = scan_altcoins(tickers, mcap_map, workers=SCAN_WORKERS)
+    # Çekim bitti: iptal edilen sembollerin hâlâ uçuşta olan istekleri de burada durur
+    RUN_BUDGET.close()
+    indicator_states().save()
+    flush_trade_archive()
+
+    notes = budget_notes(RUN_BUDGET, len(tickers))
+    for note in notes:
+        print("⚠ " + note)
+    return finish_report(btc_info, eth_info, alt_stats, notes=notes, send=send)
+
+
+# ------------ Parçalı (sharded) tarama ------------
+#
+# Koordinatör: shard-plan → universe.json (elenmiş ticker listesi + mcap haritası)
+# Worker'lar:  shard-worker --shard i → sadece kendi shard'ının sembollerini tarar, part dosyası yazar
+# Koordinatör: shard-merge → BTC/ETH özeti, part'ları bekler/birleştirir, tek rapor üretir
+# Aynı makinede hepsi için: sharded --shards N
+#
+# Shard ataması crc32(inst_id) % N: makineler ve çalışmalar arası aynı (Python hash()'i süreç başına değişir).
+
+def shard_of(inst_id, shards):
+    return zlib.crc32(inst_id.encode("utf-8")) % shards
+
+
+def _shard_paths(run_id, shard=None, shards=None):
+    run_dir = os.path.join(SHARD_DIR, run_id)
+    universe = os.path.join(run_dir, "universe.json")
+    part = os.path.join(run_dir, f"part-{shard:03d}-of-{shards:03d}.json") if shard is not None else None
+    return run_dir, universe, part
+
+
+def _write_json_atomic(path, obj):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _wait_json(path, timeout, poll=1.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        obj = _read_json(path)
+        if obj is not None or time.monotonic() >= deadline:
+            return obj
+        time.sleep(poll)
+
+
+def default_run_id():
+    return now_utc().strftime("%Y-%m-%d")
+
+
+def shard_plan(shards, run_id):
+    """Koordinatör 1. adım: ortak universe.json (tüm worker'lar aynı listeyi ve mcap sınıflarını görür)."""
+    tickers, mcap_map = prepare_universe()
+    _, universe_path, _ = _shard_paths(run_id)
+    _write_json_atomic(
+        universe_path,
+        {
+            "run_id": run_id,
+            "created": now_utc().isoformat(),
+            "shards": shards,
+            "tickers": tickers,
+            "mcap_map": mcap_map,
+        },
+    )
+    sizes = [0] * shards
+    for t in tickers:
+        sizes[shard_of(t["inst_id"], shards)] += 1
+    print(f"Universe yazıldı: {universe_path} ({len(tickers)} sembol, shard boyutları {sizes})")
+    return universe_path
+
+
+def shard_worker(shard, shards, run_id, wait=SHARD_WAIT_SEC):
+    """Worker: kendi shard'ını tarar, sonucu part dosyasına atomik yazar."""
+    global INDICATOR_STATE_FILE, RUN_REPORT_FILE, METRICS_FILE
+    _, universe_path, part_path = _shard_paths(run_id, shard, shards)
+    universe = _wait_json(universe_path, wait)
+    if universe is None:
+        raise SystemExit(f"universe.json {wait:.0f} sn içinde gelmedi: {universe_path}")
+    if universe.get("shards") != shards:
+        raise SystemExit(f"Shard sayısı uyuşmuyor: universe {universe.get('shards')}, worker {shards}")
+
+    # Aynı makinedeki worker'lar birbirinin indikatör state'ini ezmesin: shard başına dosya
+    # (atama deterministik olduğu için her sembol her gün aynı dosyada kalır)
+    suffix = f".shard{shard}of{shards}"
+    if INDICATOR_STATE_FILE:
+        INDICATOR_STATE_FILE += suffix
+    if RUN_REPORT_FILE:
+        RUN_REPORT_FILE += suffix
+    if METRICS_FILE:
+        METRICS_FILE += suffix
+
+    started = now_utc().isoformat()
+    mine = [t for t in universe["tickers"] if shard_of(t["inst_id"], shards) == shard]
+    print(f"[{ts()}] Shard {shard}/{shards}: {len(mine)} sembol taranıyor...")
+    with TELEMETRY.span("altcoin_scan", stage=True):
+        alt_stats = scan_altcoins(mine, universe["mcap_map"], workers=SCAN_WORKERS) if mine else []
+    indicator_states().save()
+    # Shard'lar sembolleri bölüşür → her enstrüman dizinine tek süreç yazar
+    flush_trade_archive()
+
+    _write_json_atomic(
+        part_path,
+        {
+            "run_id": run_id,
+            "shard": shard,
+            "shards": shards,
+            "symbols": [t["inst_id"] for t in mine],
+            "alt_stats": alt_stats,
+            "started": started,
+            "finished": now_utc().isoformat(),
+        },
+    )
+    print(f"Shard {shard}/{shards} bitti: {len(alt_stats)} analiz → {part_path}")
+
+
+def collect_shards(run_id, shards, wait=SHARD_WAIT_SEC, poll=1.0):
+    """Part dosyalarını bekler (en fazla wait sn). Dönüş: ({shard: part}, eksik shard listesi)"""
+    deadline = time.monotonic() + wait
+    parts = {}
+    while True:
+        for i in range(shards):
+            if i in parts:
                 continue
-            print(f"[{i}/{len(tickers)}] {inst_id} analiz ediliyor...")
-            try:
-                s = analyze_altcoin_for_daily(inst_id, t, mcap_map)
-                if s:
-                    alt_stats.append(s)
-            except Exception as e:
-                print(f"  {inst_id} analiz hatası:", e)
-            time.sleep(0.1)
+            part = _read_json(_shard_paths(run_id, i, shards)[2])
+            if part and part.get("run_id") == run_id and part.get("shards") == shards:
+                parts[i] = part
+        if len(parts) == shards or time.monotonic() >= deadline:
+            break
+        time.sleep(poll)
+    return parts, [i for i in range(shards) if i not in parts]
+
 
-    long_list, short_list, buyer_list = pick_daily_candidates(alt_stats, max_each=3)
+def shard_merge(shards, run_id, wait=SHARD_WAIT_SEC):
+    """
+    Koordinatör 2. adım: BTC/ETH özeti (worker'lar çalışırken), sonra part'ları birleştirip
+    tek seçim + rapor. Süresinde gelmeyen shard'lar rapora not olarak düşülür.
+    """
+    _, universe_path, _ = _shard_paths(run_id)
+    universe = _read_json(universe_path)
+    if universe is None:
+        raise SystemExit(f"universe.json yok: {universe_path} (önce shard-plan)")
+    mcap_map = universe["mcap_map"]
+    btc_info, eth_info = summarize_majors(mcap_map)
+
+    with TELEMETRY.span("shard_wait", stage=True):
+        parts, missing = collect_shards(run_id, shards, wait)
+
+    # Tek süreçli taramayla aynı sıra: universe (puan) sırası → pick_daily_candidates eşitlikleri aynı
+    order = {t["inst_id"]: i for i, t in enumerate(universe["tickers"])}
+    alt_stats = sorted(
+        (s for part in parts.values() for s in part["alt_stats"]),
+        key=lambda s: order.get(s["inst_id"], len(order)),
+    )
+    TELEMETRY.set("scan_symbols", len(alt_stats), phase="analyzed")
+    TELEMETRY.set("shards_missing", len(missing))
+
+    notes = []
+    if missing:
+        lost = sum(1 for t in universe["tickers"] if shard_of(t["inst_id"], shards) in missing)
+        notes.append(
+            f"{len(missing)}/{shards} tarama parçası zamanında gelmedi, {lost} sembol bu rapora dahil değil "
+            f"(shard: {', '.join(map(str, missing))})."
+        )
+        print("⚠ " + notes[-1])
+    print(f"{len(parts)}/{shards} shard birleştirildi: {len(alt_stats)} analiz.")
+    finish_report(btc_info, eth_info, alt_stats, notes=notes)
+
+
+def run_sharded_local(shards, run_id, wait=SHARD_WAIT_SEC, proxies=None):
+    """
+    Tek makinede N worker süreci. OKX limitleri IP başınadır: proxy verilmezse her worker
+    RATE_LIMIT_SAFETY / N ile çalışır (toplam bütçe tek süreçle aynı). proxies verilirse
+    (virgülle, worker başına bir çıkış) her worker kendi tam bütçesini kullanır.
+    """
+    shard_plan(shards, run_id)
+    procs = []
+    for i in range(shards):
+        env = dict(os.environ)
+        if proxies:
+            proxy = proxies[i % len(proxies)]
+            env["HTTPS_PROXY"] = env["HTTP_PROXY"] = proxy
+        else:
+            env["RATE_LIMIT_SAFETY"] = str(RATE_LIMIT_SAFETY / shards)
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "shard-worker",
+            "--shard", str(i), "--shards", str(shards), "--run-id", run_id, "--wait", "0",
+        ]
+        procs.append(subprocess.Popen(cmd, env=env))
+    try:
+        shard_merge(shards, run_id, wait)
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                print(f"Süresi dolan worker durduruluyor (pid {p.pid})")
+                p.terminate()
+        for p in procs:
+            p.wait()
+
+
+# ------------ Zamanlayıcı (serve) ------------
 
-    msg = build_daily_report(btc_info, eth_info, long_list, short_list, buyer_list)
-    telegram(msg)
-    print("✅ Günlük rapor Telegram'a gönderildi.")
+def _parse_times(text):
+    out = []
+    for part in text.split(","):
+        part = part.strip()
+        if part:
+            h, m = (int(x) for x in part.split(":"))
+            out.append((h, m))
+    return sorted(out)
+
+
+class ReportScheduler:
+    """
+    Tek süreçte zamanlanmış çalışmalar. Bağlantı havuzları (HTTP), mcap cache'i, mum deposu
+    bağlantısı ve indikatör state'i modül düzeyi tekillerde olduğu için çalışmalar arası
+    bellekte kalır; her çalışma sadece son çalışmadan beri değişeni çeker.
+    - daily:    report_times'taki her saatte tam rapor (+ sonuç geçmişi + Telegram)
+    - intraday: her intraday_min dakikada tarama (varsayılan gönderilmez, state sıcak kalır)
+    """
+
+    def __init__(self, report_times, intraday_min=0, intraday_send=False):
+        self.report_times = report_times
+        self.intraday_min = intraday_min
+        self.intraday_send = intraday_send
+        self.started = time.time()
+        self.stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._manual = []
+        self.running = None
+        self.last = {}  # tür -> {"ok", "started", "duration_s", "error"}
+        self.runs = {}  # (tür, "ok"/"error") -> sayı
+        self.last_telemetry = None
+        now = now_utc()
+        self.next_daily = self._next_daily_after(now)
+        self.next_intraday = self._next_intraday_after(now)
+
+    def _next_daily_after(self, now):
+        if not self.report_times:
+            return None
+        for day in (0, 1):
+            base = (now + timedelta(days=day)).replace(second=0, microsecond=0)
+            for h, m in self.report_times:
+                due = base.replace(hour=h, minute=m)
+                if due > now:
+                    return due
+        return None
+
+    def _next_intraday_after(self, now):
+        if self.intraday_min <= 0:
+            return None
+        step = self.intraday_min * 60
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        elapsed = (now - midnight).total_seconds()
+        return midnight + timedelta(seconds=(int(elapsed // step) + 1) * step)
+
+    def trigger(self, kind="daily"):
+        with self._lock:
+            self._manual.append(kind)
+        self._wake.set()
+
+    def _due(self, now):
+        """Şimdi çalışması gereken iş türü ya da None + bir sonraki uyanma anı."""
+        with self._lock:
+            if self._manual:
+                return self._manual.pop(0), None
+        if self.next_daily is not None and now >= self.next_daily:
+            self.next_daily = self._next_daily_after(now)
+            # Aynı anda düşen gün içi tarama atlanır: tam rapor zaten taradı
+            if self.next_intraday is not None and now >= self.next_intraday:
+                self.next_intraday = self._next_intraday_after(now)
+            return "daily", None
+        if self.next_intraday is not None and now >= self.next_intraday:
+            self.next_intraday = self._next_intraday_after(now)
+            return "intraday", None
+        wake = min(t for t in (self.next_daily, self.next_intraday) if t is not None) if (
+            self.next_daily or self.next_intraday
+        ) else None
+        return None, wake
+
+    def run_job(self, kind):
+        global TELEMETRY
+        send = kind == "daily" or (kind == "intraday" and self.intraday_send)
+        TELEMETRY = new_telemetry(TELEMETRY.profile)
+        HTTP.reset_stats()
+        started = time.time()
+        self.running = {"kind": kind, "started": started}
+        print(f"[{ts()}] Zamanlanmış çalışma başlıyor: {kind}")
+        error = None
+        try:
+            main(send=send)
+        except Exception as e:
+            error = repr(e)
+            traceback.print_exc()
+        finally:
+            write_run_report()
+            duration = time.time() - started
+            with self._lock:
+                self.running = None
+                self.last_telemetry = TELEMETRY
+                self.last[kind] = {
+                    "ok": error is None,
+                    "started": started,
+                    "finished": started + duration,
+                    "duration_s": round(duration, 3),
+                    "error": error,
+                }
+                key = (kind, "ok" if error is None else "error")
+                self.runs[key] = self.runs.get(key, 0) + 1
+        print(f"[{ts()}] Çalışma bitti: {kind} ({duration:.1f} sn{', HATA' if error else ''})")
+
+    def loop(self):
+        while not self.stop.is_set():
+            kind, wake = self._due(now_utc())
+            if kind:
+                self.run_job(kind)
+                continue
+            timeout = 60.0 if wake is None else min(max((wake - now_utc()).total_seconds(), 0.0), 60.0)
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def shutdown(self):
+        self.stop.set()
+        self._wake.set()
+
+    def health(self):
+        """(HTTP kodu, gövde). Son günlük rapor hata verdiyse 503."""
+        with self._lock:
+            last = dict(self.last)
+            running = dict(self.running) if self.running else None
+        ok = last.get("daily", {"ok": True})["ok"]
+        return (200 if ok else 503), {
+            "status": "ok" if ok else "degraded",
+            "uptime_s": round(time.time() - self.started, 1),
+            "running": running,
+            "last": last,
+            "next_daily": self.next_daily.isoformat() if self.next_daily else None,
+            "next_intraday": self.next_intraday.isoformat() if self.next_intraday else None,
+        }
+
+    def metrics(self):
+        with self._lock:
+            last = dict(self.last)
+            runs = dict(self.runs)
+            tel = self.last_telemetry
+            running = self.running is not None
+        p = "okx_bot_serve"
+        lines = [
+            f"# HELP {p}_uptime_seconds Daemon çalışma süresi",
+            f"# TYPE {p}_uptime_seconds gauge",
+            f"{p}_uptime_seconds {time.time() - self.started:.1f}",
+            f"# HELP {p}_running Şu anda çalışma var mı",
+            f"# TYPE {p}_running gauge",
+            f"{p}_running {int(running)}",
+            f"# HELP {p}_runs_total Tamamlanan çalışmalar",
+            f"# TYPE {p}_runs_total counter",
+        ]
+        for (kind, result), n in sorted(runs.items()):
+            lines.append(f'{p}_runs_total{{kind="{kind}",result="{result}"}} {n}')
+        lines += [
+            f"# HELP {p}_last_run_duration_seconds Son çalışmanın süresi",
+            f"# TYPE {p}_last_run_duration_seconds gauge",
+        ]
+        for kind, row in sorted(last.items()):
+            lines.append(f'{p}_last_run_duration_seconds{{kind="{kind}"}} {row["duration_s"]}')
+        lines += [
+            f"# HELP {p}_last_success_timestamp_seconds Son başarılı çalışmanın bitişi",
+            f"# TYPE {p}_last_success_timestamp_seconds gauge",
+        ]
+        for kind, row in sorted(last.items()):
+            if row["ok"]:
+                lines.append(f'{p}_last_success_timestamp_seconds{{kind="{kind}"}} {row["finished"]:.3f}')
+        text = "\n".join(lines) + "\n"
+        # Son çalışmanın aşama/HTTP metrikleri
+        if tel is not None:
+            text += tel.prometheus()
+        return text
+
+
+def _health_handler(scheduler):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, body, ctype="application/json"):
+            data = body.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if path == "/healthz":
+                code, body = scheduler.health()
+                self._send(code, json.dumps(body, default=str))
+            elif path == "/metrics":
+                self._send(200, scheduler.metrics(), "text/plain; version=0.0.4; charset=utf-8")
+            else:
+                self._send(404, '{"error": "not found"}')
+
+        def do_POST(self):
+            parts = urlsplit(self.path)
+            if parts.path != "/run":
+                self._send(404, '{"error": "not found"}')
+                return
+            kind = dict(p.split("=", 1) for p in parts.query.split("&") if "=" in p).get("kind", "daily")
+            if kind not in ("daily", "intraday"):
+                self._send(400, '{"error": "kind: daily | intraday"}')
+                return
+            scheduler.trigger(kind)
+            self._send(202, json.dumps({"queued": kind}))
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def run_serve(host=SERVE_HOST, port=SERVE_PORT, report_times=SERVE_REPORT_TIMES_UTC,
+              intraday_min=SERVE_INTRADAY_MIN, intraday_send=SERVE_INTRADAY_SEND, warmup=True, run_now=False):
+    """
+    Kalıcı zamanlayıcı: cron'la her gün soğuk başlamak yerine tek süreç, sıcak state.
+    GET /healthz, GET /metrics (Prometheus), POST /run?kind=daily|intraday (elle tetikleme).
+    """
+    scheduler = ReportScheduler(_parse_times(report_times), intraday_min, intraday_send)
+    server = ThreadingHTTPServer((host, port), _health_handler(scheduler))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="health-http", daemon=True).start()
+    print(f"[{ts()}] Zamanlayıcı başladı: http://{host}:{server.server_address[1]}/healthz")
+    print(f"  Günlük rapor: {report_times or '-'} UTC, gün içi tarama: {intraday_min or 'kapalı'} dk")
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: scheduler.shutdown())
+    if warmup:
+        # Sıcak başlangıç: mum geçmişi, indikatör state'i, mcap haritası ve bağlantılar ilk rapordan önce hazır
+        scheduler.trigger("intraday" if not run_now else "daily")
+    elif run_now:
+        scheduler.trigger("daily")
+    try:
+        scheduler.loop()
+    finally:
+        server.shutdown()
+        indicator_states().save()
+        print(f"[{ts()}] Zamanlayıcı durdu.")
+    return scheduler
+
+
+def write_run_report():
+    """Span/metrik raporunu (JSON) ve Prometheus dosyasını yazar; hata olsa da çalışma sonunda çağrılır."""
+    stages = TELEMETRY.stage_summary()
+    print(
+        "Aşama süreleri: "
+        + ", ".join(f"{name} {row['total_s']:.2f} sn" for name, row in stages.items() if name in _STAGE_NAMES)
+    )
+    extra = {"http": HTTP.stats()}
+    if RUN_BUDGET.enabled:
+        extra["budget"] = RUN_BUDGET.summary()
+    TELEMETRY.write(RUN_REPORT_FILE, METRICS_FILE, extra=extra)
+
+
+def _utc_ms(text):
+    return int(datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def run_archive_flow(inst_id, hours=24.0, since=None, until=None, mcap_class=None):
+    end_ms = _utc_ms(until) if until else now_ms()
+    start_ms = _utc_ms(since) if since else end_ms - int(hours * 3_600_000)
+    t0 = time.perf_counter()
+    of = archived_orderflow(inst_id, start_ms, end_ms, mcap_class)
+    took_ms = (time.perf_counter() - t0) * 1000
+    if not of["trades"]:
+        print(f"{inst_id}: arşivde bu aralıkta trade yok.")
+        return
+    print(
+        f"{inst_id} ({mcap_nice_label(of['mcap_class'])}): {of['trades']:,} trade, "
+        f"{of['span_sec'] / 3600:.1f} saat, {took_ms:.1f} ms"
+    )
+    print(f"  alış {of['buy_notional']:,.0f}  satış {of['sell_notional']:,.0f}  net delta {of['net_delta']:+,.0f} USDT")
+    for key, name in (("buy_whale", "alış whale"), ("sell_whale", "satış whale")):
+        w = of[key]
+        if w:
+            when = datetime.fromtimestamp(int(w["ts"]) / 1000, tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+            print(f"  en büyük {name}: {w['usd']:,.0f} USDT ({w['tier']}) @ {w['px']:.6g}, {when} UTC")
+
+
+_STAGE_NAMES = (
+    "tickers", "mcap_load", "btc_eth_summary", "altcoin_scan", "mtf_candles", "mtf_indicators", "pick",
+    "results_save", "report_build", "telegram_send",
+)
+
+
+def cli():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="OKX günlük analiz botu")
+    parser.add_argument("--record", default=HTTP_RECORD, help="HTTP yanıtlarını bu snapshot dosyasına/dizinine kaydet")
+    parser.add_argument("--replay", default=HTTP_REPLAY, help="Ağa çıkmadan bu snapshot'tan çalış")
+    parser.add_argument(
+        "--profile", choices=("cpu", "mem", "all"), default=PROFILE_MODE or None,
+        help="Aşama başına cProfile (cpu) ve/veya tracemalloc (mem) sonuçlarını çalışma raporuna ekle",
+    )
+    sub = parser.add_subparsers(dest="cmd")
+    p_ws = sub.add_parser("ws-daemon", help="WebSocket orderflow daemon (kayan pencereler, anlık rapor)")
+    p_ws.add_argument("--duration", type=float, help="Bu kadar saniye sonra dur (test için)")
+    p_ws.add_argument("--ws-record", help="Gelen WS mesajlarını bu JSONL dosyasına kaydet")
+    p_ws.add_argument("--report-on-exit", action="store_true", help="Dururken raporu üret ve gönder")
+    p_ws.add_argument("--url", help="WS adresi (varsayılan OKX_WS_URL)")
+
+    p_srv = sub.add_parser("serve", help="Kalıcı zamanlayıcı: zamanlanmış raporlar + /healthz, /metrics")
+    p_srv.add_argument("--host", default=SERVE_HOST)
+    p_srv.add_argument("--port", type=int, default=SERVE_PORT)
+    p_srv.add_argument("--times", default=SERVE_REPORT_TIMES_UTC, help="Günlük rapor saatleri, UTC (ör. 08:00,20:00)")
+    p_srv.add_argument("--intraday-min", type=int, default=SERVE_INTRADAY_MIN, help="Gün içi tarama aralığı (dk)")
+    p_srv.add_argument("--intraday-send", action="store_true", default=SERVE_INTRADAY_SEND)
+    p_srv.add_argument("--no-warmup", action="store_true", help="Başlangıçta ısınma taraması yapma")
+    p_srv.add_argument("--run-now", action="store_true", help="Başlar başlamaz günlük raporu üret ve gönder")
+
+    p_af = sub.add_parser("archive-flow", help="Trade arşivinden orderflow (API çağrısı yok)")
+    p_af.add_argument("inst_id")
+    p_af.add_argument("--hours", type=float, default=24.0, help="Son N saat (--since verilmezse)")
+    p_af.add_argument("--since", help="Başlangıç, UTC (YYYY-MM-DD ya da YYYY-MM-DDTHH:MM)")
+    p_af.add_argument("--until", help="Bitiş, UTC (varsayılan: şimdi)")
+    p_af.add_argument("--mcap-class", help="Whale eşikleri için sınıf (varsayılan: yerel mcap cache'i)")
+
+    p_mtf = sub.add_parser("mtf", help="Çoklu zaman dilimi taraması (tek taban bar çekimi, yerel yeniden örnekleme)")
+    p_mtf.add_argument("--no-send", action="store_true", help="Raporu Telegram'a göndermeden yazdır")
+
+    for name, help_text in (
+        ("shard-plan", "Koordinatör: elenmiş universe'ü ortak dizine yaz"),
+        ("shard-worker", "Bir shard'ın sembollerini tara, part dosyası yaz"),
+        ("shard-merge", "Koordinatör: part'ları birleştir, raporu üret ve gönder"),
+        ("sharded", "Aynı makinede plan + N worker süreci + birleştirme"),
+    ):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--shards", type=int, required=True)
+        p.add_argument("--run-id", default=None, help="Ortak çalışma adı (varsayılan: UTC tarih)")
+        if name == "shard-worker":
+            p.add_argument("--shard", type=int, required=True)
+        if name != "shard-plan":
+            p.add_argument("--wait", type=float, default=SHARD_WAIT_SEC, help="Eksik dosyalar için bekleme (sn)")
+        if name == "sharded":
+            p.add_argument("--proxies", help="Worker başına çıkış proxy'leri (virgülle); verilirse limit bölünmez")
+    args = parser.parse_args()
+
+    if args.cmd in ("ws-daemon", "serve"):
+        resume_delivery()
+        try:
+            if args.cmd == "ws-daemon":
+                run_ws_daemon(args.duration, args.ws_record, args.report_on_exit, args.url)
+            else:
+                TELEMETRY.profile = args.profile or ""
+                run_serve(
+                    args.host, args.port, args.times, args.intraday_min, args.intraday_send,
+                    warmup=not args.no_warmup, run_now=args.run_now,
+                )
+        finally:
+            close_delivery()
+        return
+
+    if args.cmd == "archive-flow":
+        run_archive_flow(
+            args.inst_id.upper(), args.hours, args.since, args.until, args.mcap_class.upper() if args.mcap_class else None
+        )
+        return
+
+    TELEMETRY.profile = args.profile or ""
+    start_snapshot(record=args.record, replay=args.replay)
+    resume_delivery()
+    try:
+        if args.cmd in ("shard-plan", "shard-worker", "shard-merge", "sharded"):
+            run_id = args.run_id or default_run_id()
+            if args.cmd == "shard-plan":
+                shard_plan(args.shards, run_id)
+            elif args.cmd == "shard-worker":
+                shard_worker(args.shard, args.shards, run_id, args.wait)
+            elif args.cmd == "shard-merge":
+                shard_merge(args.shards, run_id, args.wait)
+            else:
+                proxies = [p for p in (args.proxies or "").split(",") if p]
+                run_sharded_local(args.shards, run_id, args.wait, proxies)
+        elif args.cmd == "mtf":
+            run_mtf(send=not args.no_send)
+        else:
+            main()
+    finally:
+        close_delivery()
+        close_snapshot()
+        write_run_report()
 
 
 if __name__ == "__main__":
-    main()
+    cli()
@@ -0,0 +1,256 @@
+"""
+Array tabanlı L2 emir defteri (OKX `books` kanalı + /market/books snapshot'ı).
+
+Her taraf fiyat anahtarına göre artan sırada tutulur (alışlar -px ile, böylece iki tarafta
+da index 0 en iyi seviye): keys / sz tipli array'ler (array("d")), checksum için OKX'in
+gönderdiği orijinal px/sz string'leri paralel listelerde. Bir güncelleme seviyesi ikili
+arama + yerinde atama / tek memmove'luk ekleme-silme demektir: iş, değişen seviye sayısıyla
+orantılı; dict ya da seviye nesnesi ayrılmaz → yüzlerce defter tek süreçte tutulabilir.
+
+OKX doğrulaması:
+- seqId / prevSeqId: güncellemenin prevSeqId'si son seqId değilse mesaj kaçmıştır
+- checksum: ilk 25 alış/satış seviyesi "bid_px:bid_sz:ask_px:ask_sz:..." (bir taraf
+  bittiyse diğeri tek başına devam eder), orijinal string'lerle CRC32, işaretli int32
+İkisinden biri tutmazsa apply() False döner, defter "hazır değil" işaretlenir; çağıran
+kanalı yeniden abone ederek (ya da REST snapshot'ı ile) defteri baştan kurar.
+"""
+
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+
+CHECKSUM_LEVELS = 25
+MAX_LEVELS = 400  # OKX `books` kanalının derinliği
+
+
+class BookSide:
+    """Defterin bir tarafı. sign=1: satış (artan fiyat), sign=-1: alış (azalan fiyat)."""
+
+    __slots__ = ("sign", "keys", "sz", "px_s", "sz_s")
+
+    def __init__(self, sign):
+        self.sign = sign
+        self.keys = array("d")
+        self.sz = array("d")
+        self.px_s = []
+        self.sz_s = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        del self.keys[:]
+        del self.sz[:]
+        del self.px_s[:]
+        del self.sz_s[:]
+
+    def load(self, levels, max_levels=MAX_LEVELS):
+        """Snapshot seviyeleri ([px, sz, ...] string'leri, en iyiden kötüye)."""
+        self.clear()
+        for lv in levels:
+            self.update(lv[0], lv[1])
+        self.trim(max_levels)
+
+    def update(self, px_s, sz_s):
+        """Tek seviye: sz "0" → seviye silinir. İkili arama + yerinde değişiklik."""
+        key = float(px_s) * self.sign
+        sz = float(sz_s)
+        keys = self.keys
+        i = bisect_left(keys, key)
+        hit = i < len(keys) and keys[i] == key
+        if sz == 0.0:
+            if hit:
+                del keys[i]
+                del self.sz[i]
+                del self.px_s[i]
+                del self.sz_s[i]
+        elif hit:
+            self.sz[i] = sz
+            self.sz_s[i] = sz_s
+        else:
+            keys.insert(i, key)
+            self.sz.insert(i, sz)
+            self.px_s.insert(i, px_s)
+            self.sz_s.insert(i, sz_s)
+
+    def trim(self, max_levels):
+        if len(self.keys) > max_levels:
+            del self.keys[max_levels:]
+            del self.sz[max_levels:]
+            del self.px_s[max_levels:]
+            del self.sz_s[max_levels:]
+
+    def best(self):
+        return (self.keys[0] * self.sign, self.sz[0]) if self.keys else (None, None)
+
+    def band_end(self, bound_px):
+        """bound_px'e kadar (dahil) olan seviye sayısı: satışta px <= bound, alışta px >= bound."""
+        return bisect_right(self.keys, bound_px * self.sign)
+
+    def notional(self, i):
+        return self.keys[i] * self.sign * self.sz[i]
+
+
+class L2Book:
+    """Bir enstrümanın L2 defteri + sıra/checksum doğrulaması."""
+
+    __slots__ = ("inst_id", "bids", "asks", "seq_id", "ts", "ready", "max_levels", "updates", "resyncs")
+
+    def __init__(self, inst_id, max_levels=MAX_LEVELS):
+        self.inst_id = inst_id
+        self.bids = BookSide(-1)
+        self.asks = BookSide(1)
+        self.seq_id = None
+        self.ts = None
+        self.ready = False
+        self.max_levels = max_levels
+        self.updates = 0
+        self.resyncs = 0
+
+    # ------------ Besleme ------------
+
+    def load_snapshot(self, data):
+        """REST /market/books ya da WS action=snapshot verisi (tek eleman). checksum varsa doğrulanır."""
+        self.bids.load(data.get("bids") or [], self.max_levels)
+        self.asks.load(data.get("asks") or [], self.max_levels)
+        self.seq_id = _int_or_none(data.get("seqId"))
+        self.ts = _int_or_none(data.get("ts"))
+        self.ready = self._checksum_ok(data)
+        return self.ready
+
+    def apply_update(self, data):
+        """
+        WS action=update. Sıra kopuksa ya da checksum tutmazsa False döner ve defter
+        yeniden snapshot gelene kadar hazır değildir.
+        """
+        if not self.ready:
+            return False
+        prev = _int_or_none(data.get("prevSeqId"))
+        if prev is not None and self.seq_id is not None and prev != self.seq_id:
+            return self._invalidate()
+        for px_s, sz_s, *_ in data.get("bids") or ():
+            self.bids.update(px_s, sz_s)
+        for px_s, sz_s, *_ in data.get("asks") or ():
+            self.asks.update(px_s, sz_s)
+        self.bids.trim(self.max_levels)
+        self.asks.trim(self.max_levels)
+        self.seq_id = _int_or_none(data.get("seqId"))
+        self.ts = _int_or_none(data.get("ts"))
+        self.updates += 1
+        if not self._checksum_ok(data):
+            return self._invalidate()
+        return True
+
+    def handle(self, action, data):
+        """WS mesajı: action "snapshot" ya da "update". Dönüş: defter tutarlı mı."""
+        if action == "snapshot":
+            return self.load_snapshot(data)
+        return self.apply_update(data)
+
+    def _invalidate(self):
+        self.ready = False
+        self.resyncs += 1
+        return False
+
+    def _checksum_ok(self, data):
+        expected = _int_or_none(data.get("checksum"))
+        return expected is None or expected == self.checksum()
+
+    def checksum(self):
+        b, a = self.bids, self.asks
+        parts = []
+        for i in range(CHECKSUM_LEVELS):
+            if i < len(b):
+                parts.append(b.px_s[i])
+                parts.append(b.sz_s[i])
+            if i < len(a):
+                parts.append(a.px_s[i])
+                parts.append(a.sz_s[i])
+        crc = zlib.crc32(":".join(parts).encode("ascii"))
+        return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+    # ------------ Metrikler ------------
+
+    def mid(self):
+        bid, _ = self.bids.best()
+        ask, _ = self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2.0
+
+    def depth_within(self, pct):
+        """Orta fiyatın ±pct%'i içindeki (alış USDT, satış USDT) derinliği."""
+        mid = self.mid()
+        if mid is None:
+            return 0.0, 0.0
+        out = []
+        for side, bound in ((self.bids, mid * (1 - pct / 100.0)), (self.asks, mid * (1 + pct / 100.0))):
+            total = 0.0
+            for i in range(side.band_end(bound)):
+                total += side.notional(i)
+            out.append(total)
+        return out[0], out[1]
+
+    def imbalance(self, pct):
+        """(alış - satış) / (alış + satış), ±pct% bandında. -1 (sadece satış) .. +1 (sadece alış)."""
+        bid_usd, ask_usd = self.depth_within(pct)
+        total = bid_usd + ask_usd
+        return (bid_usd - ask_usd) / total if total > 0 else None
+
+    def wall(self, side_name, pct, factor):
+        """
+        Banttaki en büyük seviye, bant medyanının `factor` katından büyükse duvar:
+        {"px", "usd", "dist_pct", "x"} ya da None.
+        """
+        mid = self.mid()
+        if mid is None:
+            return None
+        if side_name == "bid":
+            side, bound = self.bids, mid * (1 - pct / 100.0)
+        else:
+            side, bound = self.asks, mid * (1 + pct / 100.0)
+        n = side.band_end(bound)
+        if n < 3:
+            return None
+        notionals = sorted(side.notional(i) for i in range(n))
+        median = notionals[n // 2] if n % 2 else (notionals[n // 2 - 1] + notionals[n // 2]) / 2.0
+        best_i = max(range(n), key=side.notional)
+        usd = side.notional(best_i)
+        if median <= 0 or usd < factor * median:
+            return None
+        px = side.keys[best_i] * side.sign
+        return {"px": px, "usd": usd, "dist_pct": abs(px - mid) / mid * 100.0, "x": usd / median}
+
+    def metrics(self, pct, wall_factor):
+        """Altcoin istatistiğine eklenen özet (build_altcoin_stats'in `book` alanı)."""
+        if not self.ready or not len(self.bids) or not len(self.asks):
+            return None
+        bid_usd, ask_usd = self.depth_within(pct)
+        total = bid_usd + ask_usd
+        bid_px, _ = self.bids.best()
+        ask_px, _ = self.asks.best()
+        mid = (bid_px + ask_px) / 2.0
+        return {
+            "band_pct": pct,
+            "bid_depth_usd": bid_usd,
+            "ask_depth_usd": ask_usd,
+            "imbalance": (bid_usd - ask_usd) / total if total > 0 else None,
+            "spread_bps": (ask_px - bid_px) / mid * 10_000 if mid > 0 else None,
+            "bid_wall": self.wall("bid", pct, wall_factor),
+            "ask_wall": self.wall("ask", pct, wall_factor),
+            "levels": (len(self.bids), len(self.asks)),
+        }
+
+
+def book_from_rest(inst_id, data, max_levels=MAX_LEVELS):
+    """/market/books yanıtının data[0]'ından defter (REST snapshot'ında seqId/checksum yoktur)."""
+    book = L2Book(inst_id, max_levels)
+    book.load_snapshot(data)
+    return book
+
+
+def _int_or_none(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,301 @@
+"""
+Kolon bazlı (struct-of-arrays) trade temsili ve vektörel orderflow çekirdeği.
+
+OKX trade JSON'ları bir kez TradeColumns'a çevrilir (px, sz, side, ts, trade_id
+tipli array'ler). orderflow_kernel() alış/satış notional, net delta, S/M/X tier
+kovalaması ve taraf başına en büyük whale'i birkaç array işlemiyle hesaplar.
+NumPy yoksa aynı sonucu veren saf Python döngüsüne düşülür.
+"""
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy opsiyonel
+    np = None
+
+SIDE_BUY = 1
+SIDE_SELL = -1
+TIER_NAMES = (None, "S", "M", "X")
+
+
+class TradeColumns:
+    """Trade'lerin tipli kolonları. Sıra korunur (OKX: yeniden eskiye)."""
+
+    __slots__ = ("px", "sz", "side", "ts", "trade_id")
+
+    def __init__(self, px=None, sz=None, side=None, ts=None, trade_id=None):
+        self.px = px if px is not None else array("d")
+        self.sz = sz if sz is not None else array("d")
+        self.side = side if side is not None else array("b")
+        self.ts = ts if ts is not None else array("q")
+        self.trade_id = trade_id if trade_id is not None else array("q")
+
+    def __len__(self):
+        return len(self.px)
+
+    def view(self, start=None, stop=None):
+        """[start:stop] aralığı, kopyasız (kolonlar memoryview; np.frombuffer ile doğrudan okunur)."""
+        return TradeColumns(*(memoryview(getattr(self, name))[start:stop] for name in self.__slots__))
+
+    @classmethod
+    def from_json(cls, trades):
+        """OKX trade dict listesi → TradeColumns. Bozuk satırlar atlanır."""
+        cols = cls()
+        for t in trades:
+            try:
+                px = float(t.get("px"))
+                sz = float(t.get("sz"))
+            except Exception:
+                continue
+            side = str(t.get("side", "")).lower()
+            try:
+                ts_ms = int(t.get("ts"))
+            except (TypeError, ValueError):
+                ts_ms = -1
+            try:
+                tid = int(t.get("tradeId"))
+            except (TypeError, ValueError):
+                tid = -1
+            cols.px.append(px)
+            cols.sz.append(sz)
+            cols.side.append(SIDE_BUY if side == "buy" else SIDE_SELL if side == "sell" else 0)
+            cols.ts.append(ts_ms)
+            cols.trade_id.append(tid)
+        return cols
+
+    def ts_range(self):
+        """(en eski, en yeni) ts; ts'i olmayan trade'ler (-1) hariç."""
+        if np is not None and len(self.ts):
+            ts = _np_col(self.ts, np.int64)
+            ts = ts[ts >= 0]
+            return (int(ts.min()), int(ts.max())) if len(ts) else (None, None)
+        valid = [t for t in self.ts if t >= 0]
+        return (min(valid), max(valid)) if valid else (None, None)
+
+
+def _np_col(col, dtype):
+    """array / memoryview kolonu → kopyasız ndarray. Zaten ndarray ise (ör. mmap'li arşivin
+    strided view'ı) olduğu gibi kullanılır."""
+    return col if isinstance(col, np.ndarray) else np.frombuffer(col, dtype=dtype)
+
+
+def _whale(cols, i, tier_idx):
+    side = cols.side[i]
+    ts_ms = cols.ts[i]
+    px = float(cols.px[i])
+    sz = float(cols.sz[i])
+    return {
+        "px": px,
+        "sz": sz,
+        "usd": px * abs(sz),
+        "side": "buy" if side == SIDE_BUY else "sell",
+        "tier": TIER_NAMES[tier_idx],
+        "ts": str(int(ts_ms)) if ts_ms >= 0 else None,
+    }
+
+
+def _tier_index(notional, medium_thr, whale_thr, super_thr):
+    if notional >= super_thr:
+        return 3
+    if notional >= whale_thr:
+        return 2
+    if notional >= medium_thr:
+        return 1
+    return 0
+
+
+def _kernel_py(cols, medium_thr, whale_thr, super_thr):
+    buy_notional = 0.0
+    sell_notional = 0.0
+    best = {SIDE_BUY: (None, -1.0, 0), SIDE_SELL: (None, -1.0, 0)}
+    for i in range(len(cols)):
+        side = cols.side[i]
+        if side == 0:
+            continue
+        notional = cols.px[i] * abs(cols.sz[i])
+        if side == SIDE_BUY:
+            buy_notional += notional
+        else:
+            sell_notional += notional
+        tier = _tier_index(notional, medium_thr, whale_thr, super_thr)
+        if tier and notional > best[side][1]:
+            best[side] = (i, notional, tier)
+    return buy_notional, sell_notional, best[SIDE_BUY], best[SIDE_SELL]
+
+
+def _kernel_np(cols, medium_thr, whale_thr, super_thr):
+    px = _np_col(cols.px, np.float64)
+    sz = _np_col(cols.sz, np.float64)
+    side = _np_col(cols.side, np.int8)
+
+    notional = px * np.abs(sz)
+    buy = side == SIDE_BUY
+    sell = side == SIDE_SELL
+    # 0: whale değil, 1: S, 2: M, 3: X
+    tiers = np.searchsorted(np.array([medium_thr, whale_thr, super_thr], dtype=np.float64), notional, side="right")
+
+    out = []
+    for mask in (buy, sell):
+        cand = np.where(mask & (tiers > 0), notional, -1.0)
+        i = int(cand.argmax())  # ilk en büyük → döngüdeki "kesin büyükse değiştir" ile aynı
+        out.append((i, float(cand[i]), int(tiers[i])) if cand[i] >= 0 else (None, -1.0, 0))
+    return float(notional[buy].sum()), float(notional[sell].sum()), out[0], out[1]
+
+
+def orderflow_kernel(cols, medium_thr, whale_thr, super_thr):
+    """
+    TradeColumns → analyze_trades_orderflow ile aynı sözlük:
+    buy/sell notional, net delta, taraf başına en büyük S/M/X whale.
+    """
+    if not len(cols):
+        buy_n = sell_n = 0.0
+        best_buy = best_sell = (None, -1.0, 0)
+    elif np is not None:
+        buy_n, sell_n, best_buy, best_sell = _kernel_np(cols, medium_thr, whale_thr, super_thr)
+    else:
+        buy_n, sell_n, best_buy, best_sell = _kernel_py(cols, medium_thr, whale_thr, super_thr)
+
+    w_buy = _whale(cols, best_buy[0], best_buy[2]) if best_buy[0] is not None else None
+    w_sell = _whale(cols, best_sell[0], best_sell[2]) if best_sell[0] is not None else None
+    return {
+        "buy_notional": buy_n,
+        "sell_notional": sell_n,
+        "net_delta": buy_n - sell_n,
+        "buy_whale": w_buy,
+        "sell_whale": w_sell,
+        "has_buy_whale": w_buy is not None,
+        "has_sell_whale": w_sell is not None,
+    }
+
+
+# ------------ Kayan pencereler (ring buffer) ------------
+
+# Pencere adı -> (pencere uzunluğu ms, kova genişliği ms). Bellek: pencere/kova kadar kova.
+ROLLING_WINDOWS = {
+    "5m": (5 * 60_000, 5_000),
+    "1h": (60 * 60_000, 30_000),
+    "24h": (24 * 60 * 60_000, 10 * 60_000),
+}
+
+
+class RollingWindow:
+    """
+    Sabit uzunlukta kayan orderflow penceresi. Zaman, sabit sayıda kovaya bölünür;
+    her kova alış/satış notional'ı, trade sayısını ve taraf başına en büyük trade'i tutar.
+    Eski kovalar üzerine yazılır → bellek trade sayısından bağımsız.
+    """
+
+    __slots__ = (
+        "span_ms", "bucket_ms", "n", "bucket_id", "count", "buy", "sell",
+        "wb_usd", "wb_px", "wb_sz", "wb_ts", "ws_usd", "ws_px", "ws_sz", "ws_ts",
+    )
+
+    def __init__(self, span_ms, bucket_ms):
+        self.span_ms = span_ms
+        self.bucket_ms = bucket_ms
+        self.n = max(1, span_ms // bucket_ms)
+        self.bucket_id = array("q", [-1]) * self.n
+        self.count = array("q", [0]) * self.n
+        for name in ("buy", "sell", "wb_usd", "wb_px", "wb_sz", "ws_usd", "ws_px", "ws_sz"):
+            setattr(self, name, array("d", [0.0]) * self.n)
+        self.wb_ts = array("q", [0]) * self.n
+        self.ws_ts = array("q", [0]) * self.n
+
+    def _slot(self, ts_ms):
+        bid = ts_ms // self.bucket_ms
+        i = bid % self.n
+        if self.bucket_id[i] != bid:
+            if self.bucket_id[i] > bid:
+                return None  # pencereden eski trade
+            self.bucket_id[i] = bid
+            self.count[i] = 0
+            self.buy[i] = self.sell[i] = 0.0
+            self.wb_usd[i] = self.ws_usd[i] = 0.0
+        return i
+
+    def add(self, ts_ms, px, sz, side):
+        i = self._slot(ts_ms)
+        if i is None:
+            return
+        usd = px * abs(sz)
+        self.count[i] += 1
+        if side == SIDE_BUY:
+            self.buy[i] += usd
+            if usd > self.wb_usd[i]:
+                self.wb_usd[i], self.wb_px[i], self.wb_sz[i], self.wb_ts[i] = usd, px, sz, ts_ms
+        elif side == SIDE_SELL:
+            self.sell[i] += usd
+            if usd > self.ws_usd[i]:
+                self.ws_usd[i], self.ws_px[i], self.ws_sz[i], self.ws_ts[i] = usd, px, sz, ts_ms
+
+    def summary(self, now_ms, medium_thr, whale_thr, super_thr):
+        """Pencere [now - span, now] için orderflow_kernel ile aynı sözlük + trades / span_sec."""
+        first_bid = (now_ms - self.span_ms) // self.bucket_ms + 1
+        last_bid = now_ms // self.bucket_ms
+        buy_n = sell_n = 0.0
+        trades = 0
+        oldest = None
+        best_b = best_s = -1
+        for i in range(self.n):
+            bid = self.bucket_id[i]
+            if bid < first_bid or bid > last_bid:
+                continue
+            trades += self.count[i]
+            buy_n += self.buy[i]
+            sell_n += self.sell[i]
+            oldest = bid if oldest is None else min(oldest, bid)
+            if self.wb_usd[i] >= medium_thr and (best_b < 0 or self.wb_usd[i] > self.wb_usd[best_b]):
+                best_b = i
+            if self.ws_usd[i] >= medium_thr and (best_s < 0 or self.ws_usd[i] > self.ws_usd[best_s]):
+                best_s = i
+
+        def whale(usd, px, sz, ts_ms, side):
+            return {
+                "px": px,
+                "sz": sz,
+                "usd": usd,
+                "side": side,
+                "tier": TIER_NAMES[_tier_index(usd, medium_thr, whale_thr, super_thr)],
+                "ts": str(ts_ms),
+            }
+
+        w_buy = whale(self.wb_usd[best_b], self.wb_px[best_b], self.wb_sz[best_b], self.wb_ts[best_b], "buy") if best_b >= 0 else None
+        w_sell = whale(self.ws_usd[best_s], self.ws_px[best_s], self.ws_sz[best_s], self.ws_ts[best_s], "sell") if best_s >= 0 else None
+        return {
+            "buy_notional": buy_n,
+            "sell_notional": sell_n,
+            "net_delta": buy_n - sell_n,
+            "buy_whale": w_buy,
+            "sell_whale": w_sell,
+            "has_buy_whale": w_buy is not None,
+            "has_sell_whale": w_sell is not None,
+            "trades": trades,
+            "span_sec": 0.0 if oldest is None else (now_ms - oldest * self.bucket_ms) / 1000.0,
+        }
+
+
+class InstrumentFlow:
+    """Bir enstrüman için ROLLING_WINDOWS'taki tüm pencereler."""
+
+    __slots__ = ("windows", "last_trade_id")
+
+    def __init__(self, windows=None):
+        spec = ROLLING_WINDOWS if windows is None else windows
+        self.windows = {name: RollingWindow(span, bucket) for name, (span, bucket) in spec.items()}
+        self.last_trade_id = -1
+
+    def add_columns(self, cols):
+        # Yeniden bağlanmada tekrar gelen trade'ler (önceki mesajlardaki id'ler) sayılmaz
+        prev = self.last_trade_id
+        for i in range(len(cols)):
+            tid = cols.trade_id[i]
+            if 0 <= tid <= prev:
+                continue
+            if tid > self.last_trade_id:
+                self.last_trade_id = tid
+            for w in self.windows.values():
+                w.add(cols.ts[i], cols.px[i], cols.sz[i], cols.side[i])
+
+    def summary(self, window, now_ms, medium_thr, whale_thr, super_thr):
+        return self.windows[window].summary(now_ms, medium_thr, whale_thr, super_thr)
@@ -0,0 +1,716 @@
+"""
+Yerel stand-in sunucular: canlı OKX olmadan botu çalıştırmak ve ölçmek için.
+
+HTTP stand-in (OKX REST + CoinGecko + Telegram Bot API yerine):
+    python replay_server.py http --symbols 300 --port 8080 --latency-ms 40 --jitter-ms 20 --rate-429 0.01
+    OKX_BASE=http://127.0.0.1:8080 COINGECKO_BASE=http://127.0.0.1:8080/api/v3 \
+        TELEGRAM_API_BASE=http://127.0.0.1:8080 python main.py
+
+Yanıtlar OKX/CoinGecko biçiminde, sembol adından türetilen sabit tohumla üretilir
+(aynı sembol her seferinde aynı mumları/trade'leri alır). --fixtures DIR verilirse
+DIR/<endpoint>.json (ör. market_tickers.json, coins_markets.json) kaydedilmiş yanıt
+olarak aynen döndürülür. Gecikme, jitter, 429, OKX hata kodu ve geç yanıt (stall) oranları
+ayarlanabilir.
+
+WebSocket replay (OKX public WS yerine):
+    python replay_server.py ws --file kayit.jsonl --port 8765 [--speed 10] [--loop]
+    OKX_WS_URL=ws://127.0.0.1:8765/ws/v5/public python main.py ws-daemon --duration 60
+
+Sentetik L2 defter akışı (`books` kanalı, seqId + checksum'lı; --corrupt-every ile bozuk checksum):
+    python replay_server.py book-feed --out books.jsonl --symbols 200 --updates 600 --corrupt-every 250
+    python replay_server.py ws --file books.jsonl --speed 0
+
+Kayıt dosyası `main.py ws-daemon --ws-record` çıktısıdır: her satır {"t": saniye, "msg": ham metin}.
+Sunucu sadece istemcinin abone olduğu (kanal, instId) mesajlarını gönderir; --retime ile
+trade/ticker zaman damgaları "şimdi"ye kaydırılır ki kayan pencereler dolsun.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import socketserver
+import threading
+import time
+import sys
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from delivery import unclosed_marker
+from orderbook import L2Book
+from wsclient import (
+    OP_CLOSE,
+    OP_PING,
+    OP_PONG,
+    OP_TEXT,
+    WebSocketClosed,
+    accept_key,
+    encode_frame,
+    read_frame,
+)
+
+
+def load_ws_recording(path):
+    """JSONL kaydı → [(t, mesaj metni), ...]"""
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            rows.append((float(rec.get("t", 0.0)), rec["msg"]))
+    return rows
+
+
+class BookMirror:
+    """
+    Sunucu tarafında `books` kanalının güncel hali. Bağlantı başına tutulur: istemci bir
+    defteri yeniden abone olduğunda (checksum hatası sonrası) gerçek OKX gibi o anki
+    durumun snapshot'ı gönderilir. Mesajların checksum'larına bakılmaz.
+    """
+
+    def __init__(self):
+        self.books = {}
+        self.seq = {}
+        self._lock = threading.Lock()
+
+    def apply(self, text):
+        if '"books"' not in text:
+            return
+        msg = json.loads(text)
+        arg = msg.get("arg") or {}
+        if arg.get("channel") != "books":
+            return
+        inst_id = arg.get("instId")
+        with self._lock:
+            book = self.books.get(inst_id)
+            if book is None:
+                book = self.books[inst_id] = L2Book(inst_id)
+            for d in msg.get("data") or []:
+                if msg.get("action") == "snapshot":
+                    book.bids.clear()
+                    book.asks.clear()
+                for px_s, sz_s, *_ in d.get("bids") or ():
+                    book.bids.update(px_s, sz_s)
+                for px_s, sz_s, *_ in d.get("asks") or ():
+                    book.asks.update(px_s, sz_s)
+                self.seq[inst_id] = d.get("seqId")
+
+    def snapshot(self, inst_id):
+        with self._lock:
+            book = self.books.get(inst_id)
+            if book is None:
+                return None
+            data = {
+                "bids": [[p, z, "0", "1"] for p, z in zip(book.bids.px_s, book.bids.sz_s)],
+                "asks": [[p, z, "0", "1"] for p, z in zip(book.asks.px_s, book.asks.sz_s)],
+                "ts": str(int(time.time() * 1000)),
+                "checksum": book.checksum(),
+                "prevSeqId": -1,
+                "seqId": self.seq.get(inst_id),
+            }
+        return json.dumps({"arg": {"channel": "books", "instId": inst_id}, "action": "snapshot", "data": [data]})
+
+
+def _retime(text, now_ms):
+    try:
+        msg = json.loads(text)
+    except ValueError:
+        return text
+    for d in msg.get("data") or []:
+        if isinstance(d, dict) and "ts" in d:
+            d["ts"] = str(now_ms)
+    return json.dumps(msg)
+
+
+class WsReplayHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        srv = self.server
+        # --- HTTP upgrade ---
+        headers = {}
+        self.rfile.readline()
+        while True:
+            line = self.rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key")
+        if not key:
+            self.wfile.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            return
+        self.wfile.write(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n"
+            ).encode()
+        )
+
+        send_lock = threading.RLock()
+        subscribed = set()
+        mirror = BookMirror()
+        started = threading.Event()
+        closed = threading.Event()
+
+        def send(text, opcode=OP_TEXT):
+            with send_lock:
+                self.wfile.write(encode_frame(text, opcode, mask=False))
+                self.wfile.flush()
+
+        def replay():
+            started.wait()
+            while not closed.is_set():
+                t0 = time.monotonic()
+                base = srv.messages[0][0] if srv.messages else 0.0
+                for t, text in srv.messages:
+                    if closed.is_set():
+                        return
+                    if srv.speed > 0:
+                        wait = (t - base) / srv.speed - (time.monotonic() - t0)
+                        if wait > 0:
+                            time.sleep(wait)
+                    # Ayna güncellemesi + gönderim tek kilit altında: yeniden abonelik snapshot'ı
+                    # iki mesajın arasına girip sırayı bozmasın
+                    with send_lock:
+                        mirror.apply(text)
+                        if not self._wanted(text, subscribed):
+                            continue
+                        if srv.retime:
+                            text = _retime(text, int(time.time() * 1000))
+                        try:
+                            send(text)
+                        except OSError:
+                            closed.set()
+                            return
+                if not srv.loop:
+                    return
+
+        threading.Thread(target=replay, daemon=True).start()
+        try:
+            while True:
+                _, opcode, payload = read_frame(self.rfile)
+                if opcode == OP_CLOSE:
+                    send(b"", OP_CLOSE)
+                    break
+                if opcode == OP_PING:
+                    send(payload, OP_PONG)
+                    continue
+                if opcode != OP_TEXT:
+                    continue
+                text = payload.decode("utf-8")
+                if text == "ping":
+                    send("pong")
+                    continue
+                req = json.loads(text)
+                if req.get("op") == "subscribe":
+                    for arg in req.get("args", []):
+                        with send_lock:
+                            subscribed.add((arg.get("channel"), arg.get("instId")))
+                            send(json.dumps({"event": "subscribe", "arg": arg}))
+                            # Defter yeniden abone olunduysa güncel durum snapshot olarak gider
+                            snap = mirror.snapshot(arg.get("instId")) if arg.get("channel") == "books" else None
+                            if snap:
+                                send(snap)
+                    started.set()
+                elif req.get("op") == "unsubscribe":
+                    for arg in req.get("args", []):
+                        subscribed.discard((arg.get("channel"), arg.get("instId")))
+                        send(json.dumps({"event": "unsubscribe", "arg": arg}))
+        except (WebSocketClosed, OSError, ValueError):
+            pass
+        finally:
+            closed.set()
+            started.set()
+
+    @staticmethod
+    def _wanted(text, subscribed):
+        try:
+            arg = json.loads(text).get("arg") or {}
+        except ValueError:
+            return False
+        return (arg.get("channel"), arg.get("instId")) in subscribed
+
+
+class WsReplayServer(socketserver.ThreadingTCPServer):
+    """Kaydedilmiş WS mesajlarını abone olan her istemciye yeniden oynatır."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, messages, host="127.0.0.1", port=0, speed=1.0, loop=False, retime=True):
+        super().__init__((host, port), WsReplayHandler)
+        self.messages = messages
+        self.speed = speed
+        self.loop = loop
+        self.retime = retime
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"ws://{host}:{port}/ws/v5/public"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+# ------------ HTTP stand-in ------------
+
+DAY_MS = 86_400_000
+BAR_MS = {
+    "1m": 60_000, "5m": 300_000, "15m": 900_000, "1H": 3_600_000, "4H": 14_400_000,
+    "1D": DAY_MS, "1W": 7 * DAY_MS,
+}
+
+
+class SyntheticMarket:
+    """
+    Deterministik sentetik piyasa: sembol adından tohumlanan fiyat yürüyüşü, mumlar ve trade'ler.
+    Günlük ve gün içi mumlar aynı 1 dakikalık yola bağlı değildir; her bar boyu kendi serisidir.
+    """
+
+    def __init__(self, n_symbols=80, seed=0, now_ms=None, history_bars=1000):
+        self.seed = seed
+        self.now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        self.history_bars = history_bars
+        self.symbols = ["BTC", "ETH"] + [f"ALT{i:03d}" for i in range(n_symbols)]
+        self._candle_cache = {}
+        self._lock = threading.Lock()
+
+    def _rng(self, *parts):
+        return random.Random(zlib.crc32(":".join(str(p) for p in (self.seed,) + parts).encode()))
+
+    def base_price(self, sym):
+        return 0.01 + self._rng(sym, "px").random() * 1000
+
+    def tickers(self):
+        rows = []
+        n = len(self.symbols)
+        for rank, sym in enumerate(self.symbols):
+            candles = self.candles(f"{sym}-USDT", "1D")
+            last = float(candles[0][4])
+            sod = float(candles[0][1])
+            rows.append(
+                {
+                    "instType": "SPOT",
+                    "instId": f"{sym}-USDT",
+                    "last": f"{last:.6g}",
+                    "open24h": f"{sod:.6g}",
+                    "sodUtc0": f"{sod:.6g}",
+                    "high24h": f"{float(candles[0][2]):.6g}",
+                    "low24h": f"{float(candles[0][3]):.6g}",
+                    "volCcy24h": f"{(n - rank) * 1_000_000 * (1 + self._rng(sym, 'vol').random()):.2f}",
+                    "vol24h": "1000",
+                    "ts": str(self.now_ms),
+                }
+            )
+        return rows
+
+    def candles(self, inst_id, bar):
+        """Yeniden eskiye tüm geçmiş (OKX sırası). Son bar açık (confirm=0)."""
+        key = (inst_id, bar)
+        with self._lock:
+            if key in self._candle_cache:
+                return self._candle_cache[key]
+        step = BAR_MS.get(bar, DAY_MS)
+        sym = inst_id.split("-")[0]
+        r = self._rng(inst_id, bar)
+        px = self.base_price(sym)
+        first = (self.now_ms // step - self.history_bars) * step
+        rows = []
+        for i in range(self.history_bars + 1):
+            o = px
+            px = max(1e-6, px * (1 + r.gauss(0.0005, 0.03)))
+            h = max(o, px) * (1 + r.random() * 0.01)
+            lo = min(o, px) * (1 - r.random() * 0.01)
+            vol = r.uniform(1_000, 100_000)
+            confirm = "0" if i == self.history_bars else "1"
+            rows.append(
+                [str(first + i * step), f"{o:.8g}", f"{h:.8g}", f"{lo:.8g}", f"{px:.8g}",
+                 f"{vol:.2f}", f"{vol * px:.2f}", f"{vol * px:.2f}", confirm]
+            )
+        rows.reverse()
+        with self._lock:
+            self._candle_cache[key] = rows
+        return rows
+
+    def candle_page(self, inst_id, bar, after=None, before=None, limit=100):
+        rows = self.candles(inst_id, bar)
+        if after is not None:
+            rows = [r for r in rows if int(r[0]) < int(after)]
+        if before is not None:
+            rows = [r for r in rows if int(r[0]) > int(before)]
+        return rows[:limit]
+
+    def trades(self, inst_id, after=None, limit=100):
+        """Trade id'leri yeniden eskiye azalır; saniyede ~1 trade."""
+        newest = 10_000_000
+        start = newest if after is None else int(after) - 1
+        sym = inst_id.split("-")[0]
+        px = float(self.candles(inst_id, "1D")[0][4])
+        notional_scale = 10 ** self._rng(sym, "size").uniform(2, 5)
+        out = []
+        r = self._rng(inst_id, "trades", start)  # sayfa başına tek tohum (aynı sayfa hep aynı)
+        for tid in range(start, max(start - limit, 0), -1):
+            out.append(
+                {
+                    "instId": inst_id,
+                    "tradeId": str(tid),
+                    "px": f"{px * (1 + r.uniform(-0.001, 0.001)):.8g}",
+                    "sz": f"{r.paretovariate(1.5) * notional_scale / px:.8g}",
+                    "side": "buy" if r.random() < 0.5 else "sell",
+                    "ts": str(self.now_ms - (newest - tid) * 1000),
+                }
+            )
+        return out
+
+    def taker_volume(self, ccy, period="5m", begin=None, end=None):
+        """rubik taker hacmi: [ts, sellVol, buyVol] yeniden eskiye, hacim ccy cinsinden; son periyot açık."""
+        step = BAR_MS.get(period, 300_000)
+        px = self.base_price(ccy)
+        scale = 10 ** self._rng(ccy, "size").uniform(2, 5) * step / 1000 / px  # trade akışıyla aynı mertebe
+        newest = self.now_ms // step * step
+        lo = max(int(begin) if begin else newest - 99 * step, newest - 1439 * step)
+        hi = min(int(end) if end else newest, newest)
+        out = []
+        for t in range(hi // step * step, lo - 1, -step):
+            r = self._rng(ccy, "taker", period, t)
+            bias = r.uniform(-0.2, 0.2)
+            out.append([str(t), f"{scale * (1 - bias):.4f}", f"{scale * (1 + bias):.4f}"])
+        return out
+
+    def _book_grid(self, inst_id):
+        """(orta fiyat, tick, ondalık): seviyeler tick ızgarasında, string'leri sabit biçimli."""
+        px = float(self.candles(inst_id, "1D")[0][4])
+        exp = math.floor(math.log10(px)) - 4
+        return px, 10.0 ** exp, max(0, -exp)
+
+    def _book_level(self, r, k, tick, dec, wall=False):
+        sz = r.uniform(1, 100) * (r.uniform(15, 30) if wall else 1.0)
+        return [f"{k * tick:.{dec}f}", f"{sz:.4f}", "0", str(r.randint(1, 9))]
+
+    def books(self, inst_id, depth=20):
+        """REST /market/books: sembollerin bir kısmında bantta tek büyük seviye (duvar) olur."""
+        r = self._rng(inst_id, "book")
+        px, tick, dec = self._book_grid(inst_id)
+        mid_k = round(px / tick)
+        wall_bid = r.randrange(depth) if r.random() < 0.3 else -1
+        wall_ask = r.randrange(depth) if r.random() < 0.3 else -1
+        bids = [self._book_level(r, mid_k - 1 - i, tick, dec, i == wall_bid) for i in range(depth)]
+        asks = [self._book_level(r, mid_k + 1 + i, tick, dec, i == wall_ask) for i in range(depth)]
+        return [{"bids": bids, "asks": asks, "ts": str(self.now_ms)}]
+
+    def book_feed(self, inst_id, updates=200, depth=400, step_sec=0.1, corrupt_every=0):
+        """
+        WS `books` kanalı: snapshot + artımlı güncellemeler, OKX gibi seqId/prevSeqId ve
+        checksum'lı. corrupt_every > 0: her N. güncellemenin checksum'ı bozulur (kaçan mesaj
+        benzetimi; istemci yeniden eşitlemeli). Dönüş: [(t, mesaj metni), ...]
+        """
+        r = self._rng(inst_id, "book-feed")
+        px, tick, dec = self._book_grid(inst_id)
+        mid_k = round(px / tick)
+        arg = {"channel": "books", "instId": inst_id}
+        book = L2Book(inst_id, max_levels=depth)
+        snap = {
+            "bids": [self._book_level(r, mid_k - 1 - i, tick, dec) for i in range(depth)],
+            "asks": [self._book_level(r, mid_k + 1 + i, tick, dec) for i in range(depth)],
+            "ts": str(self.now_ms),
+            "prevSeqId": -1,
+            "seqId": 1,
+        }
+        book.load_snapshot(snap)
+        snap["checksum"] = book.checksum()
+        out = [(0.0, json.dumps({"arg": arg, "action": "snapshot", "data": [snap]}))]
+        seq = 1
+        for n in range(1, updates + 1):
+            d = {"bids": [], "asks": [], "ts": str(self.now_ms + int(n * step_sec * 1000)), "prevSeqId": seq}
+            for side_name, side, sign in (("bids", book.bids, -1), ("asks", book.asks, 1)):
+                for _ in range(r.randint(0, 4)):
+                    roll = r.random()
+                    if roll < 0.5 and len(side):
+                        i = r.randrange(min(len(side), 30))
+                        d[side_name].append([side.px_s[i], f"{r.uniform(1, 100):.4f}", "0", "1"])
+                    elif roll < 0.75 and len(side) > depth - 20:
+                        i = r.randrange(min(len(side), 30))
+                        d[side_name].append([side.px_s[i], "0", "0", "0"])
+                    else:
+                        k = mid_k + sign * r.randint(1, 60)
+                        d[side_name].append(self._book_level(r, k, tick, dec))
+            # Güncelleme iki tarafı kesiştirmesin: en iyi seviyelerin öbür yanına düşeni atla
+            best_ask = book.asks.best()[0]
+            best_bid = book.bids.best()[0]
+            d["bids"] = [lv for lv in d["bids"] if best_ask is None or float(lv[0]) < best_ask]
+            d["asks"] = [lv for lv in d["asks"] if best_bid is None or float(lv[0]) > best_bid]
+            for side_name, side in (("bids", book.bids), ("asks", book.asks)):
+                for lv in d[side_name]:
+                    side.update(lv[0], lv[1])
+                side.trim(depth)
+            seq += 1
+            d["seqId"] = seq
+            d["checksum"] = book.checksum() + (1 if corrupt_every and n % corrupt_every == 0 else 0)
+            out.append((n * step_sec, json.dumps({"arg": arg, "action": "update", "data": [d]})))
+        return out
+
+    def coins_markets(self, page=1, per_page=250, ids=None):
+        if ids:
+            wanted = set(ids.split(","))
+            syms = [s for s in self.symbols if f"coin-{s.lower()}" in wanted]
+        else:
+            syms = self.symbols[(page - 1) * per_page: page * per_page]
+        rows = []
+        for sym in syms:
+            mc = 10 ** self._rng(sym, "mcap").uniform(7, 12)
+            rows.append({"id": f"coin-{sym.lower()}", "symbol": sym.lower(), "market_cap": round(mc)})
+        return rows
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # başlık ve gövde ayrı yazılıyor; Nagle + delayed ACK ~40 ms ekler
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        raw = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _faults(self, path):
+        """Gecikme + enjekte edilen hata. Hata yanıtı gönderildiyse True."""
+        srv = self.server
+        delay = srv.latency_ms + (srv.rng_uniform(-srv.jitter_ms, srv.jitter_ms) if srv.jitter_ms else 0)
+        if srv.stall_rate and path.startswith("/api/v5/") and srv.rng_uniform(0, 1) < srv.stall_rate:
+            # Uzun kuyruk: yanıt sonunda gelir ama çok geç (hedge / süre bütçesi testleri)
+            srv.count(path, "stall")
+            delay += srv.stall_ms
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if srv.rate_429 and srv.rng_uniform(0, 1) < srv.rate_429:
+            srv.count(path, "429")
+            self._send(429, {"code": "50011", "msg": "Too Many Requests"}, {"Retry-After": "1"})
+            return True
+        if srv.error_rate and path.startswith("/api/v5/") and srv.rng_uniform(0, 1) < srv.error_rate:
+            srv.count(path, "error")
+            self._send(200, {"code": srv.error_code, "msg": "injected error", "data": []})
+            return True
+        return False
+
+    def do_GET(self):
+        srv = self.server
+        parts = urlsplit(self.path)
+        path = parts.path
+        q = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        srv.count(path)
+        if self._faults(path):
+            return
+
+        fixture = srv.fixture(path)
+        if fixture is not None:
+            self._send(200, fixture)
+            return
+
+        m = srv.market
+        limit = int(q.get("limit", 100))
+        if path == "/api/v5/market/tickers":
+            self._send(200, {"code": "0", "msg": "", "data": m.tickers()})
+        elif path in ("/api/v5/market/candles", "/api/v5/market/history-candles"):
+            cap = 300 if path.endswith("/candles") else 100
+            data = m.candle_page(q["instId"], q.get("bar", "1m"), q.get("after"), q.get("before"), min(limit, cap))
+            self._send(200, {"code": "0", "msg": "", "data": data})
+        elif path in ("/api/v5/market/trades", "/api/v5/market/history-trades"):
+            cap = 100 if "history" in path else 500
+            data = m.trades(q["instId"], q.get("after"), min(limit, cap))
+            self._send(200, {"code": "0", "msg": "", "data": data})
+        elif path == "/api/v5/rubik/stat/taker-volume":
+            data = m.taker_volume(q["ccy"], q.get("period", "5m"), q.get("begin"), q.get("end"))
+            self._send(200, {"code": "0", "msg": "", "data": data})
+        elif path == "/api/v5/market/books":
+            self._send(200, {"code": "0", "msg": "", "data": m.books(q["instId"], int(q.get("sz", 20)))})
+        elif path.endswith("/coins/markets"):
+            self._send(200, m.coins_markets(int(q.get("page", 1)), int(q.get("per_page", 250)), q.get("ids")))
+        else:
+            self._send(404, {"code": "50000", "msg": f"unknown path {path}"})
+
+    def do_POST(self):
+        srv = self.server
+        path = urlsplit(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8", "replace")
+        srv.count(path)
+        if self._faults(path):
+            return
+        if path.endswith("/sendMessage"):
+            fault = srv.next_telegram_fault()
+            if fault == 429:
+                self._send(429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                                 "parameters": {"retry_after": 1}})
+                return
+            if fault:
+                self._send(fault, {"ok": False, "error_code": fault, "description": f"injected {fault}"})
+                return
+            fields = parse_qs(body)
+            text = (fields.get("text") or [""])[0]
+            if len(text.encode("utf-16-le")) // 2 > 4096:
+                self._send(400, {"ok": False, "error_code": 400, "description": "Bad Request: message is too long"})
+                return
+            if (fields.get("parse_mode") or [""])[0] == "Markdown" and unclosed_marker(text):
+                self._send(400, {"ok": False, "error_code": 400,
+                                 "description": "Bad Request: can't parse entities: unclosed entity"})
+                return
+            srv.sent_messages.append({"chat_id": (fields.get("chat_id") or [""])[0], "text": text})
+            self._send(200, {"ok": True, "result": {"message_id": len(srv.sent_messages)}})
+        else:
+            self._send(404, {"ok": False})
+
+
+class StandInServer(ThreadingHTTPServer):
+    """OKX REST + CoinGecko + Telegram stand-in'i. count/sent_messages ile ne istendiği izlenebilir."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, market, host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0,
+                 rate_429=0.0, error_rate=0.0, error_code="50013", fixtures_dir=None, seed=0,
+                 stall_rate=0.0, stall_ms=5000.0):
+        super().__init__((host, port), StandInHandler)
+        self.market = market
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+        self.fixtures_dir = fixtures_dir
+        self.counts = {}
+        self.sent_messages = []
+        self.telegram_faults = []  # Sıradaki sendMessage çağrılarına verilecek hata kodları (ör. [429, 500])
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Süresi dolan / hedge'de kaybeden istemciler bağlantıyı erken kapatır
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+    def rng_uniform(self, a, b):
+        with self._lock:
+            return self._rng.uniform(a, b)
+
+    def next_telegram_fault(self):
+        with self._lock:
+            return self.telegram_faults.pop(0) if self.telegram_faults else None
+
+    def count(self, path, kind="ok"):
+        with self._lock:
+            self.counts[(path, kind)] = self.counts.get((path, kind), 0) + 1
+
+    def total_requests(self):
+        with self._lock:
+            return sum(v for (_, kind), v in self.counts.items() if kind == "ok")
+
+    def fixture(self, path):
+        if not self.fixtures_dir:
+            return None
+        name = path.strip("/").replace("api/v5/", "").replace("api/v3/", "").replace("/", "_") + ".json"
+        fpath = os.path.join(self.fixtures_dir, name)
+        if not os.path.exists(fpath):
+            return None
+        with open(fpath, encoding="utf-8") as f:
+            return json.load(f)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """main.py'yi bu sunucuya yönlendiren ortam değişkenleri."""
+        return {
+            "OKX_BASE": self.base_url,
+            "COINGECKO_BASE": f"{self.base_url}/api/v3",
+            "TELEGRAM_API_BASE": self.base_url,
+        }
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="Yerel OKX stand-in sunucuları")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_http = sub.add_parser("http", help="OKX REST + CoinGecko + Telegram stand-in")
+    p_http.add_argument("--host", default="127.0.0.1")
+    p_http.add_argument("--port", type=int, default=8080)
+    p_http.add_argument("--symbols", type=int, default=80, help="BTC/ETH dışındaki USDT sembol sayısı")
+    p_http.add_argument("--seed", type=int, default=0)
+    p_http.add_argument("--latency-ms", type=float, default=0.0)
+    p_http.add_argument("--jitter-ms", type=float, default=0.0)
+    p_http.add_argument("--rate-429", type=float, default=0.0, help="HTTP 429 oranı (0-1)")
+    p_http.add_argument("--error-rate", type=float, default=0.0, help="OKX code != 0 oranı (0-1)")
+    p_http.add_argument("--error-code", default="50013")
+    p_http.add_argument("--fixtures", help="Kaydedilmiş yanıtlar dizini (<endpoint>.json)")
+    p_http.add_argument("--stall-rate", type=float, default=0.0, help="Geç yanıtlanan OKX isteği oranı (0-1)")
+    p_http.add_argument("--stall-ms", type=float, default=5000.0, help="Geç yanıtın ek gecikmesi")
+
+    p_bf = sub.add_parser("book-feed", help="Sentetik `books` kanalı kaydı yaz (ws ile oynatmak için)")
+    p_bf.add_argument("--out", required=True, help="JSONL çıktı (ws-daemon --ws-record biçimi)")
+    p_bf.add_argument("--symbols", type=int, default=20)
+    p_bf.add_argument("--seed", type=int, default=0)
+    p_bf.add_argument("--updates", type=int, default=600, help="Sembol başına güncelleme")
+    p_bf.add_argument("--step-sec", type=float, default=0.1)
+    p_bf.add_argument("--corrupt-every", type=int, default=0, help="Her N. güncellemenin checksum'ını boz")
+
+    p_ws = sub.add_parser("ws", help="Kaydedilmiş WS mesajlarını yeniden oynat")
+    p_ws.add_argument("--file", required=True)
+    p_ws.add_argument("--host", default="127.0.0.1")
+    p_ws.add_argument("--port", type=int, default=8765)
+    p_ws.add_argument("--speed", type=float, default=1.0, help="Oynatma hızı çarpanı (0 = beklemeden)")
+    p_ws.add_argument("--loop", action="store_true", help="Kayıt bitince baştan başla")
+    p_ws.add_argument("--no-retime", action="store_true", help="Zaman damgalarını olduğu gibi bırak")
+    args = parser.parse_args()
+
+    if args.cmd == "http":
+        srv = StandInServer(
+            SyntheticMarket(args.symbols, args.seed), args.host, args.port, args.latency_ms, args.jitter_ms,
+            args.rate_429, args.error_rate, args.error_code, args.fixtures, args.seed,
+            args.stall_rate, args.stall_ms,
+        )
+        print(f"HTTP stand-in: {srv.base_url} ({len(srv.market.symbols)} sembol)")
+        for k, v in srv.env().items():
+            print(f"  {k}={v}")
+        srv.serve_forever()
+    elif args.cmd == "book-feed":
+        market = SyntheticMarket(args.symbols, args.seed)
+        rows = []
+        for sym in market.symbols:
+            rows += market.book_feed(f"{sym}-USDT", args.updates, step_sec=args.step_sec,
+                                     corrupt_every=args.corrupt_every)
+        rows.sort(key=lambda row: row[0])
+        with open(args.out, "w", encoding="utf-8") as f:
+            for t, text in rows:
+                f.write(json.dumps({"t": t, "msg": text}) + "\n")
+        print(f"{args.out}: {len(rows)} mesaj, {len(market.symbols)} defter")
+    elif args.cmd == "ws":
+        srv = WsReplayServer(
+            load_ws_recording(args.file), args.host, args.port, args.speed, args.loop, not args.no_retime
+        )
+        print(f"WS replay: {srv.url} ({len(srv.messages)} mesaj)")
+        srv.serve_forever()
+
+
+if __name__ == "__main__":
+    cli()
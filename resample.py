@@ -0,0 +1,131 @@
+"""
+İnce bardan (ör. 1H) kaba barlara (4H / 1D / 1W) yerel OHLCV yeniden örnekleme.
+
+Her enstrüman için sadece en ince bar çekilir (mum deposunda artımlı), diğer zaman
+dilimleri buradan türetilir → zaman dilimi başına ayrı get_candles çağrısı yok.
+
+Hizalama UTC: 4H kovaları 00/04/08/.. UTC, 1D 00:00 UTC, 1W pazartesi 00:00 UTC
+(OKX'in 4H / 1Dutc / 1Wutc barları gibi). Kova: open = ilk barın open'ı, close = son barın
+close'u, high/low = max/min, hacimler toplam. Kova kapanmış sayılır (confirm=1) eğer
+sonrasında başka kova varsa ya da son kaynak barı kapanmış ve kovanın son dilimiyse.
+Geçmişin başındaki eksik kova (ilk kaynak barı kova başında değilse) atılır: open'ı yanlış olurdu.
+
+NumPy varsa kova sınırları ve toplamlar reduceat ile tek geçişte; yoksa aynı sonucu veren
+saf Python döngüsü.
+
+    h1 = get_candles("ARB-USDT", "1H", 6000)
+    views = resample_all(h1, "1H", ("4H", "1D", "1W"))   # {"4H": CandleSeries, ...}
+"""
+
+from array import array
+
+from series import COLUMNS, CandleSeries
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy opsiyonel
+    np = None
+
+HOUR_MS = 3_600_000
+DAY_MS = 86_400_000
+BAR_MS = {
+    "1m": 60_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1H": HOUR_MS, "2H": 2 * HOUR_MS, "4H": 4 * HOUR_MS, "6H": 6 * HOUR_MS, "12H": 12 * HOUR_MS,
+    "1D": DAY_MS, "1W": 7 * DAY_MS,
+}
+# 1970-01-01 perşembe; haftalar pazartesi başlasın diye kova sınırı 4 gün kaydırılır
+_OFFSET_MS = {"1W": 4 * DAY_MS}
+
+
+def bucket_start(ts_ms, bar):
+    width = BAR_MS[bar]
+    off = _OFFSET_MS.get(bar, 0)
+    return (ts_ms - off) // width * width + off
+
+
+def resample(series, src_bar, dst_bar):
+    """CandleSeries (src_bar, en eski başta) → dst_bar CandleSeries. src_bar, dst_bar'ı tam bölmeli."""
+    src_ms, dst_ms = BAR_MS[src_bar], BAR_MS[dst_bar]
+    if dst_ms % src_ms:
+        raise ValueError(f"{dst_bar} {src_bar}'ın katı değil")
+    if dst_ms == src_ms or not len(series):
+        return series
+    if np is not None:
+        return _resample_np(series, src_ms, dst_bar)
+    return _resample_py(series, src_ms, dst_bar)
+
+
+def resample_all(series, src_bar, dst_bars):
+    """{dst_bar: CandleSeries}; src_bar'ın kendisi de istenebilir (olduğu gibi döner)."""
+    return {bar: resample(series, src_bar, bar) for bar in dst_bars}
+
+
+def _resample_np(series, src_ms, dst_bar):
+    width = BAR_MS[dst_bar]
+    off = _OFFSET_MS.get(dst_bar, 0)
+    ts = np.frombuffer(series.ts, dtype=np.int64)
+    buckets = (ts - off) // width * width + off
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    if ts[0] != buckets[0]:
+        starts = starts[1:]  # baştaki eksik kova
+        if not len(starts):
+            return CandleSeries()
+    lo = int(starts[0])
+    ends = np.r_[starts[1:], len(ts)] - 1  # kova başına son kaynak bar
+
+    def col(name, dtype):
+        return np.frombuffer(getattr(series, name), dtype=dtype)[lo:]
+
+    rel = starts - lo
+    out_ts = buckets[starts]
+    o = col("open", np.float64)[rel]
+    h = np.maximum.reduceat(col("high", np.float64), rel)
+    low = np.minimum.reduceat(col("low", np.float64), rel)
+    c = np.frombuffer(series.close, dtype=np.float64)[ends]
+    vol = np.add.reduceat(col("vol", np.float64), rel)
+    vol_q = np.add.reduceat(col("vol_quote", np.float64), rel)
+    last_confirm = np.frombuffer(series.confirm, dtype=np.int8)[ends]
+    last_end = ts[ends] + src_ms
+    confirm = np.ones(len(starts), dtype=np.int8)
+    confirm[-1] = 1 if (last_confirm[-1] and last_end[-1] == out_ts[-1] + width) else 0
+    return CandleSeries(*(
+        _to_array(code, v) for code, v in zip("qddddddb", (out_ts, o, h, low, c, vol, vol_q, confirm))
+    ))
+
+
+def _to_array(code, values):
+    a = array(code)
+    a.frombytes(np.ascontiguousarray(values).tobytes())
+    return a
+
+
+def _resample_py(series, src_ms, dst_bar):
+    width = BAR_MS[dst_bar]
+    cols = {name: getattr(series, name) for name in COLUMNS}
+    rows = []
+    cur = None
+    first = bucket_start(cols["ts"][0], dst_bar)
+    partial = first if cols["ts"][0] != first else None  # baştaki eksik kova
+    for i in range(len(series)):
+        t = cols["ts"][i]
+        b = bucket_start(t, dst_bar)
+        if b == partial:
+            continue
+        if cur is None or b != cur[0]:
+            if cur is not None:
+                rows.append(cur)
+            cur = [b, cols["open"][i], cols["high"][i], cols["low"][i], cols["close"][i],
+                   cols["vol"][i], cols["vol_quote"][i], 1, t]
+            continue
+        cur[2] = max(cur[2], cols["high"][i])
+        cur[3] = min(cur[3], cols["low"][i])
+        cur[4] = cols["close"][i]
+        cur[5] += cols["vol"][i]
+        cur[6] += cols["vol_quote"][i]
+        cur[8] = t
+    if cur is None:
+        return CandleSeries()
+    last_i = len(series) - 1
+    cur[7] = 1 if (cols["confirm"][last_i] and cur[8] + src_ms == cur[0] + width) else 0
+    rows.append(cur)
+    return CandleSeries.from_rows([r[:8] for r in rows])
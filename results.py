@@ -0,0 +1,246 @@
+"""
+Çalışma sonuçlarının yerel geçmişi (SQLite): altcoin istatistikleri, BTC/ETH özetleri
+ve günün seçimleri. Her çalışma (tarih, inst_id) anahtarıyla eklenir; aynı gün tekrar
+çalışılırsa o günün satırları son çalışmayla değiştirilir.
+
+İndeksler: alt_stats / summaries için (date, inst_id) birincil anahtar + (inst_id, date),
+picks için (date, list, rank) + (inst_id, date). Günler arası sorular API'ye gitmeden,
+milisaniyeler içinde yanıtlanır:
+
+    python results.py streak --days 3              # son 3 tarama günü net delta > 0
+    python results.py streak --days 3 --negative
+    python results.py freq --list buyer            # en sık "birikim adayı" olanlar
+    python results.py history ARB-USDT --since 2025-01-01
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+
+LISTS = ("long", "short", "buyer")
+
+_SUMMARY_COLUMNS = ("last", "trend", "momentum", "direction", "net_delta", "mcap_class", "delta_txt", "whale_txt")
+
+
+def _whale(w, field):
+    return w[field] if w else None
+
+
+class ResultsStore:
+    def __init__(self, path):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            if path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS alt_stats (
+                    date TEXT NOT NULL,
+                    inst_id TEXT NOT NULL,
+                    last REAL, ema20 REAL, trend_tag TEXT, net_delta REAL,
+                    buy_whale_usd REAL, buy_whale_tier TEXT, sell_whale_usd REAL, sell_whale_tier TEXT,
+                    mcap_class TEXT, nd_pos_thr REAL, nd_neg_thr REAL, pct_change_24h REAL,
+                    PRIMARY KEY (date, inst_id)
+                ) WITHOUT ROWID
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS alt_stats_inst ON alt_stats (inst_id, date)")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS summaries (
+                    date TEXT NOT NULL,
+                    inst_id TEXT NOT NULL,
+                    last REAL, trend TEXT, momentum TEXT, direction TEXT, net_delta REAL,
+                    mcap_class TEXT, delta_txt TEXT, whale_txt TEXT,
+                    PRIMARY KEY (date, inst_id)
+                ) WITHOUT ROWID
+                """
+            )
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS picks (
+                    date TEXT NOT NULL,
+                    list TEXT NOT NULL,
+                    rank INTEGER NOT NULL,
+                    inst_id TEXT NOT NULL,
+                    PRIMARY KEY (date, list, rank)
+                ) WITHOUT ROWID
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS picks_inst ON picks (inst_id, date)")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # ------------ Yazma ------------
+
+    def save_run(self, date, alt_stats, summaries, picks):
+        """
+        Bir çalışmanın sonuçları. Aynı tarih için önceki satırlar silinir (gün içinde tekrar
+        çalışma son durumu yazar). picks: {"long": [stats, ...], "short": [...], "buyer": [...]}
+        """
+        alt_rows = [
+            (
+                date, s["inst_id"], s["last"], s["ema20"], s["trend_tag"], s["net_delta"],
+                _whale(s["buy_whale"], "usd"), _whale(s["buy_whale"], "tier"),
+                _whale(s["sell_whale"], "usd"), _whale(s["sell_whale"], "tier"),
+                s["mcap_class"], s["nd_pos_thr"], s["nd_neg_thr"], s["pct_change_24h"],
+            )
+            for s in alt_stats
+        ]
+        summary_rows = [(date, s["inst_id"]) + tuple(s.get(c) for c in _SUMMARY_COLUMNS) for s in summaries if s]
+        pick_rows = [
+            (date, name, rank, s["inst_id"])
+            for name in LISTS
+            for rank, s in enumerate(picks.get(name) or [], start=1)
+        ]
+        with self._lock, self._db:
+            for table in ("alt_stats", "summaries", "picks"):
+                self._db.execute(f"DELETE FROM {table} WHERE date = ?", (date,))
+            self._db.executemany(f"INSERT INTO alt_stats VALUES ({','.join('?' * 14)})", alt_rows)
+            self._db.executemany(f"INSERT INTO summaries VALUES ({','.join('?' * 10)})", summary_rows)
+            self._db.executemany("INSERT INTO picks VALUES (?, ?, ?, ?)", pick_rows)
+
+    # ------------ Sorgular ------------
+
+    def _query(self, sql, args=()):
+        with self._lock:
+            return [dict(r) for r in self._db.execute(sql, args).fetchall()]
+
+    def dates(self, until=None, limit=None):
+        """Tarama yapılmış günler, yeniden eskiye."""
+        sql = "SELECT DISTINCT date FROM alt_stats"
+        args = []
+        if until:
+            sql += " WHERE date <= ?"
+            args.append(until)
+        sql += " ORDER BY date DESC"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(limit)
+        return [r["date"] for r in self._query(sql, args)]
+
+    def net_delta_streak(self, days=3, until=None, negative=False):
+        """
+        Son `days` tarama gününün hepsinde net delta > 0 (negative=True: < 0) olan semboller.
+        Dönüş: [{"inst_id", "days", "total_delta", "min_abs_delta"}], toplam deltaya göre sıralı.
+        Son günlerden biri eksikse (o gün taranmamışsa) seri bozulmuş sayılır.
+        """
+        window = self.dates(until, days)
+        if len(window) < days:
+            return []
+        cond = "MAX(net_delta) < 0" if negative else "MIN(net_delta) > 0"
+        return self._query(
+            f"""
+            SELECT inst_id, COUNT(*) AS days, SUM(net_delta) AS total_delta,
+                   MIN(ABS(net_delta)) AS min_abs_delta
+            FROM alt_stats
+            WHERE date BETWEEN ? AND ?
+            GROUP BY inst_id
+            HAVING COUNT(*) = ? AND {cond}
+            ORDER BY ABS(SUM(net_delta)) DESC
+            """,
+            (window[-1], window[0], days),
+        )
+
+    def pick_frequency(self, list_name=None, since=None, inst_id=None, limit=20):
+        """
+        Sembol başına seçim sayısı: [{"inst_id", "list", "picks", "first", "last"}].
+        list_name verilmezse tüm listeler ayrı ayrı sayılır; inst_id verilirse sadece o sembol.
+        """
+        where = []
+        args = []
+        if list_name:
+            where.append("list = ?")
+            args.append(list_name)
+        if since:
+            where.append("date >= ?")
+            args.append(since)
+        if inst_id:
+            where.append("inst_id = ?")
+            args.append(inst_id)
+        sql = (
+            "SELECT inst_id, list, COUNT(*) AS picks, MIN(date) AS first, MAX(date) AS last FROM picks"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " GROUP BY inst_id, list ORDER BY picks DESC, last DESC LIMIT ?"
+        )
+        return self._query(sql, args + [limit])
+
+    def history(self, inst_id, since=None):
+        """Bir sembolün günlük alt_stats satırları + o gün hangi listelere girdiği, eskiden yeniye."""
+        rows = self._query(
+            "SELECT * FROM alt_stats WHERE inst_id = ? AND date >= ? ORDER BY date",
+            (inst_id, since or ""),
+        )
+        picked = {}
+        for r in self._query(
+            "SELECT date, list FROM picks WHERE inst_id = ? AND date >= ?", (inst_id, since or "")
+        ):
+            picked.setdefault(r["date"], []).append(r["list"])
+        for r in rows:
+            r["picks"] = picked.get(r["date"], [])
+        return rows
+
+    def day(self, date):
+        """Bir günün tüm çıktısı: {"alt_stats", "summaries", "picks"}."""
+        picks = {name: [] for name in LISTS}
+        for r in self._query("SELECT list, inst_id FROM picks WHERE date = ? ORDER BY list, rank", (date,)):
+            picks[r["list"]].append(r["inst_id"])
+        return {
+            "alt_stats": self._query("SELECT * FROM alt_stats WHERE date = ? ORDER BY inst_id", (date,)),
+            "summaries": self._query("SELECT * FROM summaries WHERE date = ? ORDER BY inst_id", (date,)),
+            "picks": picks,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sonuç geçmişi sorguları (API çağrısı yok)")
+    default_db = os.getenv("RESULTS_DB", os.path.join(os.getenv("DATA_DIR", "data"), "results.sqlite"))
+    parser.add_argument("--db", default=default_db)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("streak", help="Art arda N tarama günü pozitif (negatif) net delta")
+    p.add_argument("--days", type=int, default=3)
+    p.add_argument("--until", help="YYYY-MM-DD (varsayılan: son tarama günü)")
+    p.add_argument("--negative", action="store_true")
+
+    p = sub.add_parser("freq", help="Sembol başına seçim sayısı")
+    p.add_argument("--list", choices=LISTS)
+    p.add_argument("--since")
+    p.add_argument("--inst")
+    p.add_argument("--limit", type=int, default=20)
+
+    p = sub.add_parser("history", help="Bir sembolün günlük geçmişi")
+    p.add_argument("inst_id")
+    p.add_argument("--since")
+
+    args = parser.parse_args()
+    store = ResultsStore(args.db)
+
+    if args.cmd == "streak":
+        rows = store.net_delta_streak(args.days, args.until, args.negative)
+        sign = "negatif" if args.negative else "pozitif"
+        print(f"Son {args.days} tarama günü net delta {sign}: {len(rows)} sembol")
+        for r in rows:
+            print(f"  {r['inst_id']:<16} toplam {r['total_delta']:>14,.0f} USDT  en küçük |delta| {r['min_abs_delta']:,.0f}")
+    elif args.cmd == "freq":
+        for r in store.pick_frequency(args.list, args.since, args.inst, args.limit):
+            print(f"  {r['inst_id']:<16} {r['list']:<6} {r['picks']:>4} kez  ({r['first']} → {r['last']})")
+    else:
+        for r in store.history(args.inst_id.upper(), args.since):
+            picks = ",".join(r["picks"]) or "-"
+            print(
+                f"  {r['date']}  fiyat {r['last']:.6g}  trend {r['trend_tag']:<4} "
+                f"net delta {r['net_delta']:>12,.0f}  seçim: {picks}"
+            )
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Kolon bazlı (struct-of-arrays) mum serisi.
+
+Mumlar bar başına dict yerine tipli array'lerde tutulur: ts (int64), open/high/low/close/
+vol/vol_quote (float64), confirm (int8). Bar başına ~57 bayt; dict listesinde bar başına
+~500 bayt ve 7 nesne. view() / dilimleme kopyalamaz: kolonlar aynı belleğe bakan
+memoryview'lardır, np.frombuffer ile doğrudan NumPy'a geçer.
+
+Not: bir view yaşadığı sürece alttaki array büyütülemez (BufferError); seriler
+oluşturulduktan sonra eklenmez, her get_candles çağrısı yeni seri döndürür.
+"""
+
+from array import array
+
+COLUMNS = ("ts", "open", "high", "low", "close", "vol", "vol_quote", "confirm")
+_TYPECODES = ("q", "d", "d", "d", "d", "d", "d", "b")
+
+
+class CandleSeries:
+    """Mumların tipli kolonları, en eski başta (CandleStore satır sırasıyla aynı kolonlar)."""
+
+    __slots__ = COLUMNS
+
+    def __init__(self, *columns):
+        if columns:
+            for name, col in zip(COLUMNS, columns):
+                setattr(self, name, col)
+        else:
+            for name, code in zip(COLUMNS, _TYPECODES):
+                setattr(self, name, array(code))
+
+    @classmethod
+    def from_rows(cls, rows):
+        """(ts, open, high, low, close, vol, vol_quote, confirm) satırları → seri."""
+        if not rows:
+            return cls()
+        return cls(*(array(code, col) for code, col in zip(_TYPECODES, zip(*rows))))
+
+    def __len__(self):
+        return len(self.ts)
+
+    def view(self, start=None, stop=None):
+        """[start:stop] aralığı, kopyasız (kolonlar memoryview)."""
+        return CandleSeries(*(memoryview(getattr(self, name))[start:stop] for name in COLUMNS))
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("CandleSeries sadece adımsız dilimlenir; tek bar için kolonları kullanın (s.close[-1])")
+        return self.view(key.start, key.stop)
+
+    def tail(self, n):
+        """Son n bar (view)."""
+        return self.view(max(len(self) - n, 0), None)
+
+    def closed(self):
+        """Sadece kapanmış barlar (açık son bar varsa hariç, view)."""
+        if len(self) and not self.confirm[-1]:
+            return self.view(None, len(self) - 1)
+        return self
+
+    @property
+    def open_bar(self):
+        """Açık son barın (ts, close)'u ya da None."""
+        if len(self) and not self.confirm[-1]:
+            return self.ts[-1], self.close[-1]
+        return None
+
+    def nbytes(self):
+        return sum(len(getattr(self, name)) * memoryview(getattr(self, name)).itemsize for name in COLUMNS)
@@ -0,0 +1,147 @@
+"""
+Çalışma başına tek dosyalık, sıkıştırılmış ve indeksli HTTP snapshot'ı.
+
+Kayıt modunda her istek (path + sıralı parametreler) ve yanıtı dosyaya eklenir;
+replay modunda main() ağa hiç çıkmadan aynı yanıtları bu dosyadan alır.
+
+Dosya düzeni:
+    MAGIC
+    kayıt*   : <I key_len><H status><I body_len> key(utf-8) zlib(body)
+    indeks   : zlib(JSON {"meta": {...}, "keys": {key: [offset, ...]}})
+    footer   : <Q indeks_offset><I indeks_len> MAGIC_END
+
+Okuyucu footer'dan indeksi alır, dosyayı mmap'ler; her arama bir dict erişimi +
+tek dilim okumadır. Footer yoksa (yarıda kalmış kayıt) indeks kayıtlar taranarak kurulur.
+Aynı anahtar birden çok kez kaydedildiyse replay onları sırayla verir.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from urllib.parse import urlencode, urlsplit
+
+MAGIC = b"OKXSNAP1"
+MAGIC_END = b"OKXSNAPE"
+_REC = struct.Struct("<IHI")
+_FOOTER = struct.Struct("<QI8s")
+
+
+def request_key(method, url, params=None):
+    """Host'tan bağımsız anahtar: METHOD path?sıralı_parametreler"""
+    path = urlsplit(url).path
+    items = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    return f"{method.upper()} {path}?{urlencode(items)}"
+
+
+class SnapshotResponse:
+    """Replay'de requests.Response yerine geçen küçük nesne (status_code, content, json())."""
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class SnapshotWriter:
+    def __init__(self, path, meta=None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.meta = dict(meta or {})
+        self._f = open(path, "wb")
+        self._f.write(MAGIC)
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, status, body):
+        kb = key.encode("utf-8")
+        comp = zlib.compress(body, 6)
+        with self._lock:
+            offset = self._f.tell()
+            self._f.write(_REC.pack(len(kb), status, len(comp)))
+            self._f.write(kb)
+            self._f.write(comp)
+            self._keys.setdefault(key, []).append(offset)
+
+    def close(self):
+        with self._lock:
+            if self._f is None:
+                return
+            self.meta["records"] = sum(len(v) for v in self._keys.values())
+            index = zlib.compress(json.dumps({"meta": self.meta, "keys": self._keys}).encode("utf-8"), 6)
+            offset = self._f.tell()
+            self._f.write(index)
+            self._f.write(_FOOTER.pack(offset, len(index), MAGIC_END))
+            self._f.close()
+            self._f = None
+
+
+class SnapshotReader:
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"snapshot dosyası değil: {path}")
+        self.meta, self.keys = self._load_index()
+        self._cursor = {}
+        self._lock = threading.Lock()
+
+    def _load_index(self):
+        mm = self._mm
+        if len(mm) >= len(MAGIC) + _FOOTER.size:
+            offset, length, end = _FOOTER.unpack(mm[-_FOOTER.size:])
+            if end == MAGIC_END:
+                raw = json.loads(zlib.decompress(mm[offset:offset + length]))
+                return raw.get("meta", {}), raw["keys"]
+        # Footer yok: kayıtları baştan tarayıp indeksi kur
+        keys = {}
+        pos = len(MAGIC)
+        while pos + _REC.size <= len(mm):
+            key_len, _, body_len = _REC.unpack(mm[pos:pos + _REC.size])
+            end = pos + _REC.size + key_len + body_len
+            if end > len(mm):
+                break
+            key = mm[pos + _REC.size:pos + _REC.size + key_len].decode("utf-8")
+            keys.setdefault(key, []).append(pos)
+            pos = end
+        return {"incomplete": True}, keys
+
+    def _read(self, offset):
+        key_len, status, body_len = _REC.unpack(self._mm[offset:offset + _REC.size])
+        start = offset + _REC.size + key_len
+        return status, zlib.decompress(self._mm[start:start + body_len])
+
+    def get(self, key):
+        """Anahtarın sıradaki kaydı → SnapshotResponse, yoksa None."""
+        offsets = self.keys.get(key)
+        if not offsets:
+            return None
+        with self._lock:
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = i + 1
+        status, body = self._read(offsets[min(i, len(offsets) - 1)])
+        return SnapshotResponse(status, body)
+
+    def close(self):
+        self._mm.close()
+        self._f.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    for p in sys.argv[1:]:
+        r = SnapshotReader(p)
+        n = sum(len(v) for v in r.keys.values())
+        print(f"{p}: {n} kayıt, {len(r.keys)} anahtar, meta={r.meta}")
+        r.close()
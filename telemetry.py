@@ -0,0 +1,315 @@
+"""
+Çalışma başına hafif ölçüm: aşama span'leri, sayaçlar, histogramlar.
+
+    TELEMETRY = Telemetry()
+    with TELEMETRY.span("mcap_load", stage=True):
+        ...
+    TELEMETRY.inc("http_requests_total", endpoint="/api/v5/market/candles", status="200")
+    TELEMETRY.observe("http_request_duration_seconds", 0.031, endpoint="/api/v5/market/candles")
+
+Çıktılar: report() → JSON çalışma raporu, prometheus() → Prometheus text formatı
+(node_exporter textfile collector'ın okuyabileceği biçim).
+
+Profil modu ("cpu", "mem" ya da "all") sadece stage=True span'lerde çalışır:
+- cpu: cProfile, aşama başına kümülatif süreye göre en sıcak fonksiyonlar.
+  cProfile yalnızca span'i açan thread'i görür; paralel taramanın worker'ları
+  da görünsün isterseniz SCAN_WORKERS=1 ile çalıştırın.
+- mem: tracemalloc, aşama başına tepe bellek ve en çok ayıran satırlar.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Çağrı süreleri için histogram kovaları (sn)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROFILE_TOP = 15
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key, extra=None):
+    items = list(key) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, b in enumerate(self.buckets):
+            if value <= b:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        out = []
+        total = 0
+        for c in self.counts:
+            total += c
+            out.append(total)
+        return out
+
+
+class Telemetry:
+    def __init__(self, prefix="okx_bot", profile=None):
+        self.prefix = prefix
+        self.profile = profile or ""
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.profiles = {}
+        self.help = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # ------------ Span ------------
+
+    @contextmanager
+    def span(self, name, stage=False, **attrs):
+        """
+        Süre ölçülen blok. İç içe span'ler parent adını taşır (thread başına yığın).
+        stage=True: aşama düzeyi; profil modu açıksa bu blok profillenir.
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        parent = stack[-1] if stack else None
+        stack.append(name)
+
+        prof = None
+        mem = stage and self.profile in ("mem", "all")
+        if stage and self.profile in ("cpu", "all"):
+            prof = cProfile.Profile()
+            prof.enable()
+        if mem:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            mem_before = tracemalloc.get_traced_memory()[0]
+            snap_before = tracemalloc.take_snapshot()
+
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            entry = {
+                "name": name,
+                "parent": parent,
+                "start_s": round(start - self._t0, 6),
+                "duration_s": round(duration, 6),
+                "thread": threading.current_thread().name,
+            }
+            if attrs:
+                entry["attrs"] = attrs
+            if error:
+                entry["error"] = error
+            if stage:
+                entry["stage"] = True
+            profile = {}
+            if prof is not None:
+                prof.disable()
+                profile["hot"] = _hot_functions(prof)
+            if mem:
+                _, peak = tracemalloc.get_traced_memory()
+                profile["peak_bytes"] = peak
+                profile["peak_over_start_bytes"] = max(peak - mem_before, 0)
+                profile["top_alloc"] = _top_allocations(snap_before)
+            with self._lock:
+                self.spans.append(entry)
+                if profile:
+                    self.profiles[name] = profile
+
+    # ------------ Metrikler ------------
+
+    def describe(self, name, text):
+        """Prometheus çıktısındaki # HELP satırı."""
+        self.help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, _labels_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = Histogram()
+            h.observe(value)
+
+    # ------------ Çıktılar ------------
+
+    def stage_summary(self):
+        """Span adı → {count, total_s, max_s} (ör. 600 symbol_fetch span'i tek satırda)."""
+        out = {}
+        with self._lock:
+            spans = list(self.spans)
+        for s in spans:
+            row = out.setdefault(s["name"], {"count": 0, "total_s": 0.0, "max_s": 0.0, "errors": 0})
+            row["count"] += 1
+            row["total_s"] += s["duration_s"]
+            row["max_s"] = max(row["max_s"], s["duration_s"])
+            row["errors"] += 1 if "error" in s else 0
+        for row in out.values():
+            row["total_s"] = round(row["total_s"], 6)
+        return out
+
+    def report(self, extra=None):
+        with self._lock:
+            spans = list(self.spans)
+            counters = [
+                {"name": n, "labels": dict(k), "value": v} for (n, k), v in sorted(self.counters.items())
+            ]
+            gauges = [{"name": n, "labels": dict(k), "value": v} for (n, k), v in sorted(self.gauges.items())]
+            histograms = [
+                {
+                    "name": n,
+                    "labels": dict(k),
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "buckets": dict(zip([str(b) for b in h.buckets], h.cumulative())),
+                }
+                for (n, k), h in sorted(self.histograms.items())
+            ]
+            profiles = dict(self.profiles)
+        out = {
+            "started": self.started,
+            "duration_s": round(time.perf_counter() - self._t0, 6),
+            "stages": [s for s in spans if s.get("stage")],
+            "span_summary": self.stage_summary(),
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms,
+            "spans": spans,
+        }
+        if profiles:
+            out["profile"] = profiles
+        if extra:
+            out.update(extra)
+        return out
+
+    def prometheus(self):
+        p = self.prefix
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+
+        header("run_start_timestamp_seconds", "gauge", "Çalışmanın başlangıç zamanı")
+        lines.append(f"{p}_run_start_timestamp_seconds {self.started:.3f}")
+        header("run_duration_seconds", "gauge", "Çalışmanın toplam süresi")
+        lines.append(f"{p}_run_duration_seconds {time.perf_counter() - self._t0:.6f}")
+
+        summary = self.stage_summary()
+        # Çalışma içinde yalnızca artarlar → counter (çalışma başına sıfırlanmayı Prometheus reset sayar)
+        header("span_duration_seconds_total", "counter", "Span adına göre toplam süre")
+        for name, row in sorted(summary.items()):
+            lines.append(f'{p}_span_duration_seconds_total{{span="{_escape(name)}"}} {row["total_s"]:.6f}')
+        header("span_count", "counter", "Span adına göre çalıştırma sayısı")
+        for name, row in sorted(summary.items()):
+            lines.append(f'{p}_span_count{{span="{_escape(name)}"}} {row["count"]}')
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted(self.histograms.items())
+
+        seen = set()
+        for (name, key), value in counters:
+            if name not in seen:
+                header(name, "counter", self.help.get(name, name))
+                seen.add(name)
+            lines.append(f"{p}_{name}{_fmt_labels(key)} {value}")
+        for (name, key), value in gauges:
+            if name not in seen:
+                header(name, "gauge", self.help.get(name, name))
+                seen.add(name)
+            lines.append(f"{p}_{name}{_fmt_labels(key)} {value}")
+        for (name, key), h in histograms:
+            if name not in seen:
+                header(name, "histogram", self.help.get(name, name))
+                seen.add(name)
+            for b, c in zip(h.buckets, h.cumulative()):
+                lines.append(f"{p}_{name}_bucket{_fmt_labels(key, [('le', b)])} {c}")
+            lines.append(f"{p}_{name}_bucket{_fmt_labels(key, [('le', '+Inf')])} {h.count}")
+            lines.append(f"{p}_{name}_sum{_fmt_labels(key)} {h.sum:.6f}")
+            lines.append(f"{p}_{name}_count{_fmt_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path=None, prom_path=None, extra=None):
+        """Atomik yazım (tmp + replace): textfile collector yarım dosya okumasın."""
+        for path, text in (
+            (json_path, lambda: json.dumps(self.report(extra), indent=2, default=str)),
+            (prom_path, self.prometheus),
+        ):
+            if not path:
+                continue
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text())
+            os.replace(tmp, path)
+
+
+def _hot_functions(prof, limit=PROFILE_TOP):
+    stats = pstats.Stats(prof, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append(
+            {
+                "function": f"{os.path.basename(filename)}:{line}({func})",
+                "calls": nc,
+                "tottime_s": round(tt, 6),
+                "cumtime_s": round(ct, 6),
+            }
+        )
+    rows.sort(key=lambda r: r["cumtime_s"], reverse=True)
+    return rows[:limit]
+
+
+def _top_allocations(before, limit=10):
+    """Aşama boyunca en çok büyüyen ayırma satırları (aşama sonunda hâlâ tutulan bellek)."""
+    diff = tracemalloc.take_snapshot().compare_to(before, "lineno")
+    return [
+        {"where": f"{os.path.basename(st.traceback[0].filename)}:{st.traceback[0].lineno}", "bytes": st.size_diff}
+        for st in diff[:limit]
+        if st.size_diff > 0
+    ]
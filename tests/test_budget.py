@@ -0,0 +1,185 @@
+import threading
+import time
+
+import pytest
+
+import main
+from budget import LatencyWindow, RunBudget, parse_shares
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+SHARES = {"universe": 0.1, "majors": 0.2, "scan": 0.6}
+
+
+def _budget(total=100):
+    clock = FakeClock()
+    return RunBudget(total, SHARES, clock=clock), clock
+
+
+def test_parse_shares():
+    assert parse_shares("universe=0.1, majors=0.2,scan=0.6") == SHARES
+    assert list(parse_shares("scan=0.5,universe=0.1")) == ["scan", "universe"]
+    assert parse_shares("") == {}
+    with pytest.raises(ValueError):
+        parse_shares("a=0.7,b=0.4")
+
+
+def test_checkpoints_are_cumulative():
+    budget, _ = _budget()
+    assert budget.checkpoint("universe") == pytest.approx(1010.0)
+    assert budget.checkpoint("majors") == pytest.approx(1030.0)
+    assert budget.checkpoint("scan") == pytest.approx(1090.0)
+    # Pay tanımlı değilse aşama çalışmanın sonuna kadar sürebilir (kalan %10 rapor payı)
+    assert budget.checkpoint("report") == 1100.0
+
+
+def test_fast_stage_leaves_time_to_next():
+    budget, clock = _budget()
+    with budget.stage("universe"):
+        clock.now += 2
+    with budget.stage("majors"):
+        # Sabit kontrol noktası: universe'ün artan 8 sn'si de majors'a kalır
+        assert budget.remaining() == pytest.approx(28.0)
+        clock.now += 30
+        assert budget.expired()
+        assert budget.clamp(10) == 0.0
+    assert budget.stages["universe"]["expired"] is False
+    assert budget.stages["majors"] == {"used_sec": 30, "budget_sec": pytest.approx(30.0), "expired": True}
+    # Aşama dışında çalışmanın kalanı geçerli
+    assert budget.remaining() == pytest.approx(68.0)
+    assert budget.clamp(10) == 10
+
+
+def test_stage_reopened_accumulates():
+    budget, clock = _budget()
+    for used in (3, 4):
+        with budget.stage("universe"):
+            clock.now += used
+    assert budget.stages["universe"]["used_sec"] == 7
+    assert budget.stages["universe"]["expired"] is False
+
+
+def test_close_stops_new_requests():
+    budget, clock = _budget()
+    with budget.stage("scan"):
+        clock.now += 5
+    assert not budget.expired()
+    # Tarama bitti: geride kalan worker'ların istekleri de (aşama dışında) hemen durur
+    budget.close()
+    assert budget.expired()
+    assert budget.clamp(10) == 0.0
+
+
+def test_disabled_budget():
+    budget = RunBudget(0, SHARES, clock=FakeClock())
+    with budget.stage("scan"):
+        assert budget.remaining() is None
+        assert not budget.expired()
+        assert budget.clamp(7) == 7
+    assert budget.stages == {}
+
+
+def test_budget_notes_for_expired_stages_and_skipped_symbols():
+    budget, clock = _budget()
+    assert main.budget_notes(budget, 10) == []
+    with budget.stage("universe"):
+        clock.now += 11
+    with budget.stage("majors"):
+        clock.now += 25
+    budget.skip("scan", [f"C{i:02d}-USDT" for i in range(23)])
+    notes = main.budget_notes(budget, 50)
+    assert len(notes) == 3
+    assert notes[0].startswith("Evren / market cap")
+    assert notes[1].startswith("BTC & ETH özeti")
+    assert "Süre bütçesi (100 sn) doldu: 23/50 sembol taranamadı" in notes[2]
+    # İlk 20 sembol adıyla, gerisi sayıyla
+    assert "C00, C01" in notes[2] and "C19 ve 3 sembol daha." in notes[2]
+    assert "C20" not in notes[2]
+
+
+def test_expired_budget_skips_requests(monkeypatch):
+    budget, clock = _budget()
+    monkeypatch.setattr(main, "RUN_BUDGET", budget)
+    monkeypatch.setattr(main.HTTP, "_attempt", lambda *a, **k: pytest.fail("süre dolduktan sonra istek yapıldı"))
+    clock.now += 100
+    assert main.HTTP.request("GET", "https://x/api/v5/x", limiter_key="/api/v5/x") is None
+
+
+# ------------ Hedge kopyasında 429 / 50011 ------------
+
+class _Resp:
+    def __init__(self, status, body=None, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+        self.content = b""
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class _Hedge(LatencyWindow):
+    def hedge_after(self, endpoint):
+        return 0.02
+
+
+def _hedged_http(monkeypatch, primary, hedge, primary_delay=0.3):
+    """Asıl deneme primary_delay sn sonra, hedge kopyası hemen yanıtlar. Cezalar kaydedilir."""
+    penalties = []
+    penalized = threading.Event()
+    limiter = main.RateLimiter({"/api/v5/x": (10, 2.0)})
+
+    def penalize(key, seconds=None):
+        penalties.append((key, seconds))
+        penalized.set()
+
+    monkeypatch.setattr(limiter, "penalize", penalize)
+    monkeypatch.setattr(main, "RATE_LIMITER", limiter)
+    monkeypatch.setattr(main, "RUN_BUDGET", RunBudget(0))
+    monkeypatch.setattr(main.HTTP, "hedge", _Hedge())
+    monkeypatch.setattr(main.HTTP, "backoff", lambda attempt: None)
+    calls = []
+    lock = threading.Lock()
+
+    def attempt(*args, **kwargs):
+        with lock:
+            n = len(calls)
+            calls.append(n)
+        if n == 0:
+            time.sleep(primary_delay)
+            return primary, None
+        return hedge, None
+
+    monkeypatch.setattr(main.HTTP, "_attempt", attempt)
+    return penalties, penalized, calls
+
+
+def test_hedge_copy_429_penalizes_even_when_primary_wins(monkeypatch):
+    penalties, _, calls = _hedged_http(monkeypatch, _Resp(200), _Resp(429, headers={"Retry-After": "4"}))
+    r = main.HTTP.request("GET", "https://x/api/v5/x", limiter_key="/api/v5/x")
+    assert r.status_code == 200 and len(calls) == 2
+    assert penalties == [("/api/v5/x", 4.0)]
+
+
+def test_discarded_primary_429_still_penalizes(monkeypatch):
+    penalties, penalized, _ = _hedged_http(monkeypatch, _Resp(429), _Resp(200), primary_delay=0.1)
+    r = main.HTTP.request("GET", "https://x/api/v5/x", limiter_key="/api/v5/x")
+    assert r.status_code == 200
+    # Asıl deneme yanıt döndükten sonra biter; cezası yine de bucket'a işlenir
+    assert penalized.wait(2.0)
+    assert penalties == [("/api/v5/x", None)]
+
+
+def test_hedge_copy_okx_50011_penalizes(monkeypatch):
+    ok = _Resp(200, {"code": "0", "data": [1]})
+    penalties, _, _ = _hedged_http(monkeypatch, ok, _Resp(200, {"code": "50011"}))
+    # Kopyadaki 50011 kazanan sayılmaz: asıl denemenin yanıtı beklenir
+    assert main.jget_okx("/api/v5/x") == [1]
+    assert penalties == [("/api/v5/x", None)]
@@ -0,0 +1,120 @@
+import pytest
+
+import main
+
+DAY = 86_400_000
+T0 = 1_700_006_400_000  # UTC gün başı
+
+
+class FakeOkx:
+    """
+    /market/candles ve /market/history-candles taklidi (OKX sırası: en yeni başta).
+    Son mum açık (confirm=0); her çağrı kaydedilir.
+    """
+
+    def __init__(self, n, listed=0):
+        self.ts = [T0 + (listed + i) * DAY for i in range(n)]
+        self.close = {ts: 100.0 + i for i, ts in enumerate(self.ts)}
+        self.calls = []
+
+    def add_day(self, close=None):
+        ts = self.ts[-1] + DAY
+        self.ts.append(ts)
+        self.close[ts] = close if close is not None else self.close[self.ts[-2]] + 1
+
+    def row(self, ts):
+        c = self.close[ts]
+        confirm = "0" if ts == self.ts[-1] else "1"
+        return [str(ts), str(c), str(c + 1), str(c - 1), str(c), "10", "1000", "1000", confirm]
+
+    def __call__(self, path, params=None, retries=3, timeout=10):
+        self.calls.append((path, dict(params)))
+        rows = sorted(self.ts, reverse=True)
+        if "before" in params:
+            rows = [t for t in rows if t > int(params["before"])]
+        if "after" in params:
+            rows = [t for t in rows if t < int(params["after"])]
+        return [self.row(t) for t in rows[: int(params["limit"])]]
+
+
+@pytest.fixture
+def okx(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "_candle_store", main.CandleStore(str(tmp_path / "candles.db")))
+    fake = FakeOkx(10)
+    monkeypatch.setattr(main, "jget_okx", fake)
+    return fake
+
+
+def test_first_fetch_then_only_new_bars(okx):
+    s = main.get_candles("BTC-USDT", limit=5)
+    assert list(s.ts) == okx.ts[-5:]
+    assert s.confirm[-1] == 0
+    okx.calls.clear()
+
+    okx.add_day()
+    okx.add_day()
+    s = main.get_candles("BTC-USDT", limit=5)
+    assert list(s.ts) == okx.ts[-5:]
+    # Yalnızca son kapanmış mumdan (eski açık mum dahil) sonrası istenir; geçmiş dolu, backfill yok
+    assert okx.calls == [
+        ("/api/v5/market/candles", {"instId": "BTC-USDT", "bar": "1D", "limit": 300, "before": okx.ts[-4]}),
+    ]
+
+
+def test_open_candle_is_replaced(okx):
+    main.get_candles("BTC-USDT", limit=5)
+    open_ts = okx.ts[-1]
+    okx.close[open_ts] = 555.0  # açık mum gün içinde değişti
+    s = main.get_candles("BTC-USDT", limit=5)
+    assert s.ts[-1] == open_ts and s.close[-1] == 555.0 and s.confirm[-1] == 0
+
+    okx.add_day()  # önceki açık mum kapandı
+    s = main.get_candles("BTC-USDT", limit=5)
+    assert list(s.ts[-2:]) == okx.ts[-2:]
+    assert list(s.confirm[-2:]) == [1, 0]
+    count, _, last_closed = main.candle_store().bounds("BTC-USDT", "1D")
+    assert count == len(okx.ts) and last_closed == open_ts
+
+
+def test_backfill_until_history_done(okx):
+    s = main.get_candles("NEW-USDT", limit=50)
+    # 10 günlük coin: ilk sayfa + history-candles boş dönünce geçmiş bitti işaretlenir
+    assert len(s) == 10
+    assert main.candle_store().history_done("NEW-USDT", "1D")
+    history = [p for path, p in okx.calls if path == "/api/v5/market/history-candles"]
+    assert history == [{"instId": "NEW-USDT", "bar": "1D", "after": okx.ts[0], "limit": 100}]
+
+    # Sonraki çalışmalarda limit'e ulaşılmasa da geriye sayfalanmaz
+    okx.calls.clear()
+    okx.add_day()
+    assert len(main.get_candles("NEW-USDT", limit=50)) == 11
+    assert [path for path, _ in okx.calls] == ["/api/v5/market/candles"]
+
+
+def test_backfill_failure_retries_next_run(okx, monkeypatch):
+    main.get_candles("BTC-USDT", limit=3)
+    monkeypatch.setattr(main, "jget_okx", lambda path, params=None, **kw: None if "history" in path else okx(path, params))
+    main.get_candles("BTC-USDT", limit=50)
+    # Geçici hata geçmişi bitmiş saymaz
+    assert not main.candle_store().history_done("BTC-USDT", "1D")
+
+
+def _flow(net, span):
+    return {
+        "buy_notional": net, "sell_notional": 0.0, "net_delta": net,
+        "buy_whale": None, "sell_whale": None, "trades": 10, "span_sec": span,
+    }
+
+
+def test_orderflow_daily_keeps_longer_span(tmp_path):
+    store = main.CandleStore(str(tmp_path / "candles.db"))
+    store.put_orderflow([("BTC-USDT", T0, _flow(1.0, 86_400))])
+    # Gün içi kısa tarama günlük özetin üzerine yazmaz
+    store.put_orderflow([("BTC-USDT", T0, _flow(2.0, 900)), ("ETH-USDT", T0, _flow(3.0, 900))])
+    assert sorted(store.all_orderflow()) == [
+        ("BTC-USDT", T0, 1.0, 0.0, 0.0, 86_400),
+        ("ETH-USDT", T0, 3.0, 0.0, 0.0, 900),
+    ]
+    # Aynı ya da daha uzun süreyi kapsayan yeni özet günceller
+    store.put_orderflow([("BTC-USDT", T0, _flow(4.0, 86_400)), ("ETH-USDT", T0, _flow(5.0, 3_600))])
+    assert sorted(r[2] for r in store.all_orderflow()) == [4.0, 5.0]
@@ -0,0 +1,63 @@
+import re
+
+from delivery import _units, split_message, unclosed_marker
+
+
+def _words(text):
+    """İşaretler ve boşluklar atılmış kelime dizisi (bölmede eklenen işaretlerden bağımsız)."""
+    return re.sub(r"[`*_\s]+", " ", text).split()
+
+
+def test_short_message_is_not_split():
+    assert split_message("*kısa* mesaj", 4096) == ["*kısa* mesaj"]
+
+
+def test_limit_counts_utf16_units():
+    text = "\n".join("🟢 satır " + str(i) for i in range(200))
+    chunks = split_message(text, 300)
+    assert len(chunks) > 1
+    assert all(_units(c) <= 300 for c in chunks)
+    assert "\n".join(chunks) == text  # işaret yok: satır sınırlarından aynen bölünür
+
+
+def test_boundary_exactly_at_limit():
+    text = "a" * 100
+    assert split_message(text, 100) == [text]
+    assert len(split_message(text + "\nb", 100)) == 2
+
+
+def test_every_chunk_balanced_and_content_kept():
+    text = "*Başlık*\n*" + "\n".join(f"kalın satır {i}" for i in range(120)) + "*\n_son_"
+    chunks = split_message(text, 200)
+    assert len(chunks) > 1
+    assert all(unclosed_marker(c) is None for c in chunks)
+    assert all(_units(c) <= 200 for c in chunks)
+    assert _words("\n".join(chunks)) == _words(text)
+
+
+def test_code_block_reopened_on_its_own_line():
+    rows = [f"ALT{i:03d}  {i * 1.5:8.2f}" for i in range(100)]
+    text = "Tablo:\n```\n" + "\n".join(rows) + "\n```"
+    chunks = split_message(text, 250)
+    assert len(chunks) > 2
+    for chunk in chunks[1:]:
+        # Dil etiketi sanılıp ilk kelime yutulmasın
+        assert chunk.startswith("```\n")
+    for chunk in chunks[:-1]:
+        assert chunk.endswith("\n```")
+    assert all(unclosed_marker(c) is None for c in chunks)
+    assert _words("\n".join(chunks)) == _words(text)
+    body = "\n".join(chunks)
+    assert all(row in body for row in rows)  # hiçbir satır bölünmedi / kelime kaybolmadı
+
+
+def test_long_line_is_cut_at_space():
+    words = " ".join(f"kelime{i}" for i in range(300))
+    chunks = split_message(words, 200)
+    assert all(_units(c) <= 200 for c in chunks)
+    assert " ".join(chunks) == words
+
+
+def test_escaped_marker_is_not_an_entity():
+    assert unclosed_marker(r"snake\_case") is None
+    assert unclosed_marker("snake_case") == "_"
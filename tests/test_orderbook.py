@@ -0,0 +1,67 @@
+import zlib
+
+from orderbook import L2Book, book_from_rest
+
+
+def _crc(text):
+    crc = zlib.crc32(text.encode("ascii"))
+    return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+
+# OKX API dokümanındaki checksum örneği (ilk 25 seviye, bid:ask sırasıyla dönüşümlü)
+DOC_BIDS = [["3366.1", "7", "0", "3"], ["3366", "6", "3", "4"]]
+DOC_ASKS = [["3366.8", "9", "10", "3"], ["3368", "8", "3", "4"]]
+
+
+def test_checksum_matches_documented_example():
+    book = book_from_rest("BTC-USDT", {"bids": DOC_BIDS, "asks": DOC_ASKS})
+    assert book.checksum() == _crc("3366.1:7:3366.8:9:3366:6:3368:8")
+
+
+def test_checksum_uneven_sides_continue_with_longer_side():
+    # Dokümandaki ikinci örnek: alış tarafı kısa, satışlar tek başına devam eder
+    book = book_from_rest("BTC-USDT", {"bids": DOC_BIDS[:1], "asks": DOC_ASKS})
+    assert book.checksum() == _crc("3366.1:7:3366.8:9:3368:8")
+
+
+def test_checksum_keeps_original_strings():
+    # "3366.10" float'a çevrilip yeniden yazılmaz; OKX checksum'ı gönderilen string'le hesaplar
+    book = book_from_rest("X-USDT", {"bids": [["3366.10", "7.0"]], "asks": [["3366.8", "9"]]})
+    assert book.checksum() == _crc("3366.10:7.0:3366.8:9")
+
+
+def test_checksum_uses_only_top_25_levels():
+    bids = [[f"{100 - i}", "1"] for i in range(30)]
+    asks = [[f"{101 + i}", "1"] for i in range(30)]
+    book = book_from_rest("X-USDT", {"bids": bids, "asks": asks})
+    expected = ":".join(f"{100 - i}:1:{101 + i}:1" for i in range(25))
+    assert book.checksum() == _crc(expected)
+
+
+def test_snapshot_and_update_validate_checksum_and_sequence():
+    book = L2Book("BTC-USDT")
+    snap = {"bids": DOC_BIDS, "asks": DOC_ASKS, "seqId": 10,
+            "checksum": _crc("3366.1:7:3366.8:9:3366:6:3368:8")}
+    assert book.handle("snapshot", snap)
+
+    # 3366 silinir, 3365 eklenir; 3368 güncellenir
+    update = {"bids": [["3366", "0", "0", "0"], ["3365", "2", "0", "1"]], "asks": [["3368", "5", "0", "1"]],
+              "prevSeqId": 10, "seqId": 11, "checksum": _crc("3366.1:7:3366.8:9:3365:2:3368:5")}
+    assert book.handle("update", update)
+    assert book.bids.best() == (3366.1, 7.0)
+    assert list(book.bids.px_s) == ["3366.1", "3365"]
+
+    # Sıra kopuk: defter hazır değil, yeni snapshot gelene kadar güncelleme kabul edilmez
+    gap = {"bids": [], "asks": [], "prevSeqId": 99, "seqId": 100}
+    assert not book.handle("update", gap)
+    assert not book.ready and book.resyncs == 1
+    assert not book.handle("update", {"bids": [], "asks": [], "prevSeqId": 100, "seqId": 101})
+
+
+def test_bad_checksum_invalidates_book():
+    book = L2Book("BTC-USDT")
+    assert book.handle("snapshot", {"bids": DOC_BIDS, "asks": DOC_ASKS, "seqId": 1,
+                                    "checksum": _crc("3366.1:7:3366.8:9:3366:6:3368:8")})
+    assert not book.handle("update", {"bids": [["3366", "1"]], "asks": [], "prevSeqId": 1, "seqId": 2,
+                                      "checksum": 12345})
+    assert not book.ready
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+import orderflow
+from orderflow import TradeColumns, orderflow_kernel
+
+pytest.importorskip("numpy")
+
+THRESHOLDS = (10_000.0, 50_000.0, 250_000.0)
+
+
+def _page(n, seed):
+    """Rastgele trade sayfası; her eşiğe tam denk gelen birer alış ve satış trade'i dahil."""
+    rnd = random.Random(seed)
+    trades = []
+    for i in range(n):
+        trades.append({
+            "px": f"{rnd.uniform(0.5, 2.0):.6f}",
+            "sz": f"{rnd.lognormvariate(8, 2):.4f}",
+            "side": rnd.choice(["buy", "sell", "buy", "sell", "?"]),
+            "ts": str(1_700_000_000_000 - i * 100),
+            "tradeId": str(10_000_000 - i),
+        })
+    # px=1 → notional tam eşik; searchsorted(side="right") eşiği üst tier'a koymalı (>=)
+    for j, thr in enumerate(THRESHOLDS):
+        for side in ("buy", "sell"):
+            trades.insert(rnd.randrange(len(trades)), {
+                "px": "1", "sz": repr(thr), "side": side, "ts": str(1_699_999_000_000 + j), "tradeId": str(j),
+            })
+    return TradeColumns.from_json(trades)
+
+
+def _both(cols, monkeypatch, thresholds=THRESHOLDS):
+    vec = orderflow._kernel_np(cols, *thresholds)
+    with monkeypatch.context() as m:
+        m.setattr(orderflow, "np", None)
+        loop = orderflow._kernel_py(cols, *thresholds)
+        loop_full = orderflow_kernel(cols, *thresholds)
+    return vec, loop, orderflow_kernel(cols, *thresholds), loop_full
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_numpy_and_python_kernels_agree(monkeypatch, seed):
+    cols = _page(1000, seed)
+    vec, loop, vec_full, loop_full = _both(cols, monkeypatch)
+    assert vec[0] == pytest.approx(loop[0], rel=1e-12)
+    assert vec[1] == pytest.approx(loop[1], rel=1e-12)
+    assert vec_full["net_delta"] == pytest.approx(loop_full["net_delta"], rel=1e-9, abs=1e-6)
+    # Taraf başına en büyük whale: aynı indeks, aynı notional, aynı tier
+    assert vec[2] == loop[2] and vec[3] == loop[3]
+    assert vec_full["buy_whale"] == loop_full["buy_whale"]
+    assert vec_full["sell_whale"] == loop_full["sell_whale"]
+
+
+@pytest.mark.parametrize("thr_index, tier", [(0, "S"), (1, "M"), (2, "X")])
+def test_notional_exactly_at_threshold(monkeypatch, thr_index, tier):
+    # Eşikteki trade kendi tier'ına girer; eşiğin hemen altı bir alt tier'da kalır
+    thr = THRESHOLDS[thr_index]
+    below = (thr - 0.01) if thr_index else None
+    sz = [thr] + ([below] if below else [])
+    cols = TradeColumns.from_json(
+        [{"px": "1", "sz": repr(s), "side": "buy", "ts": "1", "tradeId": str(i)} for i, s in enumerate(sz)]
+    )
+    vec, loop, vec_full, loop_full = _both(cols, monkeypatch)
+    assert vec[2] == loop[2] == (0, thr, thr_index + 1)
+    assert vec_full["buy_whale"]["tier"] == loop_full["buy_whale"]["tier"] == tier
+    assert vec[3] == loop[3] == (None, -1.0, 0)
+
+
+def test_whale_counts_per_tier_agree(monkeypatch):
+    # Her trade tek başına çekirdekten geçirilir: iki yolun S/M/X sayımları aynı olmalı
+    cols = _page(400, 7)
+
+    def counts():
+        out = {}
+        for i in range(len(cols)):
+            r = orderflow_kernel(cols.view(i, i + 1), *THRESHOLDS)
+            for w in (r["buy_whale"], r["sell_whale"]):
+                if w:
+                    out[(w["side"], w["tier"])] = out.get((w["side"], w["tier"]), 0) + 1
+        return out
+
+    vec = counts()
+    with monkeypatch.context() as m:
+        m.setattr(orderflow, "np", None)
+        loop = counts()
+    assert vec == loop
+    assert all(vec.get((side, tier)) for side in ("buy", "sell") for tier in ("S", "M", "X"))
+
+
+def test_ties_keep_first_occurrence(monkeypatch):
+    cols = TradeColumns.from_json(
+        [{"px": "2", "sz": "30000", "side": "sell", "ts": str(10 - i), "tradeId": str(i)} for i in range(3)]
+    )
+    vec, loop, _, _ = _both(cols, monkeypatch)
+    assert vec[3] == loop[3] == (0, 60_000.0, 2)
@@ -0,0 +1,121 @@
+import main
+from budget import LatencyWindow
+from main import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    """Elle ilerletilen saat; sleep() beklemeyi kaydedip saati ileri alır."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _bucket(capacity=4, per=2.0):
+    clock = FakeClock()
+    return TokenBucket(capacity, per, clock=clock, sleep=clock.sleep), clock
+
+
+def test_burst_up_to_capacity_then_empty():
+    bucket, _ = _bucket()
+    assert [bucket.try_acquire() for _ in range(5)] == [True, True, True, True, False]
+
+
+def test_refill_at_rate():
+    # 4 token / 2 sn → 0.5 sn'de bir token
+    bucket, clock = _bucket()
+    for _ in range(4):
+        bucket.try_acquire()
+    clock.now += 0.49
+    assert not bucket.try_acquire()
+    clock.now += 0.01
+    assert bucket.try_acquire()
+    # Uzun bekleme kapasiteyi aşmaz
+    clock.now += 60
+    assert [bucket.try_acquire() for _ in range(5)] == [True, True, True, True, False]
+
+
+def test_acquire_waits_for_its_own_slot():
+    bucket, clock = _bucket()
+    waits = [bucket.acquire() for _ in range(6)]
+    assert waits[:4] == [0.0] * 4
+    # Borçlu token'lar sırayla bekler: 5. istek 0.5 sn, 6. istek (saat ilerlediği için) yine 0.5 sn
+    assert waits[4:] == [0.5, 0.5]
+    assert clock.slept == [0.5, 0.5]
+
+
+def test_penalize_blocks_until_deadline():
+    bucket, clock = _bucket()
+    bucket.penalize(3.0)
+    assert not bucket.try_acquire()
+    # Token'lar dolsa da (1 sn = 2 token) ceza bitene kadar istek yok
+    clock.now += 1.0
+    assert not bucket.try_acquire()
+    assert bucket.acquire() == 2.0
+    assert clock.now == 103.0
+
+
+def test_limiter_buckets_per_key_with_safety():
+    clock = FakeClock()
+    limiter = RateLimiter({"/a": (10, 2.0)}, default=(2, 1.0), safety=0.5, clock=clock, sleep=clock.sleep)
+    assert limiter.bucket("/a").capacity == 5.0
+    assert limiter.bucket("/b").capacity == 1.0
+    assert limiter.bucket("/a") is limiter.bucket("/a")
+    # Varsayılan ceza süresi endpoint'in limit penceresi
+    limiter.penalize("/a")
+    assert limiter.acquire("/a") == 2.0
+    assert limiter.try_acquire("/b")
+
+
+class _Resp:
+    def __init__(self, status, body=None, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+        self.content = b""
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+def _fake_http(monkeypatch, responses):
+    """HttpClient'ın tek denemesini sırayla verilen yanıtlarla değiştirir; cezaları kaydeder."""
+    penalties = []
+    clock = FakeClock()
+    limiter = RateLimiter({"/api/v5/x": (10, 2.0)}, clock=clock, sleep=clock.sleep)
+    monkeypatch.setattr(limiter, "penalize", lambda key, seconds=None: penalties.append((key, seconds)))
+    monkeypatch.setattr(main, "RATE_LIMITER", limiter)
+    it = iter(responses)
+    monkeypatch.setattr(main.HTTP, "hedge", LatencyWindow(pct=0))  # hedge kapalı: tek deneme
+    monkeypatch.setattr(main.HTTP, "_attempt", lambda *a, **k: (next(it), None))
+    monkeypatch.setattr(main.HTTP, "backoff", lambda attempt: None)
+    return penalties
+
+
+def test_http_429_penalizes_with_retry_after(monkeypatch):
+    penalties = _fake_http(monkeypatch, [_Resp(429, headers={"Retry-After": "7"}), _Resp(200)])
+    r = main.HTTP.request("GET", "https://x/api/v5/x", limiter_key="/api/v5/x")
+    assert r.status_code == 200
+    assert penalties == [("/api/v5/x", 7.0)]
+
+
+def test_okx_50011_penalizes_and_shares_retry_budget(monkeypatch):
+    busy = {"code": "50011", "msg": "Too Many Requests"}
+    penalties = _fake_http(monkeypatch, [_Resp(200, busy)] * 3)
+    assert main.jget_okx("/api/v5/x", retries=3) is None
+    # 3 deneme = 3 ceza; iç içe retry yok (fazladan yanıt istenseydi StopIteration olurdu)
+    assert penalties == [("/api/v5/x", None)] * 3
+
+
+def test_okx_50011_then_success(monkeypatch):
+    ok = {"code": "0", "data": [{"a": 1}]}
+    penalties = _fake_http(monkeypatch, [_Resp(200, {"code": "50011"}), _Resp(200, ok)])
+    assert main.jget_okx("/api/v5/x") == [{"a": 1}]
+    assert penalties == [("/api/v5/x", None)]
@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import resample
+from resample import HOUR_MS, bucket_start
+from series import COLUMNS, CandleSeries
+
+
+def _ms(text):
+    return int(datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _hourly(start, n, open_last=False):
+    """start'tan itibaren n adet 1H bar; i. barın open'ı i, close'u i + 0.5, hacmi 1."""
+    t0 = _ms(start)
+    rows = [
+        (t0 + i * HOUR_MS, float(i), i + 1.0, i - 1.0, i + 0.5, 1.0, 10.0, 0 if open_last and i == n - 1 else 1)
+        for i in range(n)
+    ]
+    return CandleSeries.from_rows(rows)
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(resample, "np", None)
+    elif resample.np is None:
+        pytest.skip("NumPy yok")
+    return request.param
+
+
+def _rows(series):
+    return list(zip(*(list(getattr(series, name)) for name in COLUMNS)))
+
+
+def test_bucket_alignment_is_utc():
+    assert bucket_start(_ms("2025-03-05T07:30"), "4H") == _ms("2025-03-05T04:00")
+    assert bucket_start(_ms("2025-03-05T23:59"), "1D") == _ms("2025-03-05T00:00")
+    # 2025-03-05 çarşamba → hafta pazartesi 00:00 UTC başlar
+    monday = bucket_start(_ms("2025-03-05T12:00"), "1W")
+    assert monday == _ms("2025-03-03T00:00")
+    assert datetime.fromtimestamp(monday / 1000, tz=timezone.utc).weekday() == 0
+    assert bucket_start(_ms("2025-03-03T00:00"), "1W") == monday
+
+
+def test_4h_ohlcv_aggregation(engine):
+    out = resample.resample(_hourly("2025-03-05T00:00", 8), "1H", "4H")
+    assert _rows(out) == [
+        (_ms("2025-03-05T00:00"), 0.0, 4.0, -1.0, 3.5, 4.0, 40.0, 1),
+        (_ms("2025-03-05T04:00"), 4.0, 8.0, 3.0, 7.5, 4.0, 40.0, 1),
+    ]
+
+
+def test_partial_leading_bucket_is_dropped(engine):
+    # 02:00'de başlayan geçmiş: 00:00 kovasının open'ı bilinmiyor
+    out = resample.resample(_hourly("2025-03-05T02:00", 10), "1H", "4H")
+    assert list(out.ts) == [_ms("2025-03-05T04:00"), _ms("2025-03-05T08:00")]
+    assert out.open[0] == 2.0  # 04:00 barı (i = 2)
+
+
+def test_only_partial_bucket_gives_empty_series(engine):
+    out = resample.resample(_hourly("2025-03-05T02:00", 2), "1H", "4H")
+    assert len(out) == 0
+
+
+def test_last_bucket_confirm(engine):
+    # Tam kova, son kaynak bar kapalı → kapanmış
+    assert resample.resample(_hourly("2025-03-05T00:00", 8), "1H", "4H").confirm[-1] == 1
+    # Eksik kova (10:00 henüz gelmedi) → açık
+    partial = resample.resample(_hourly("2025-03-05T00:00", 10), "1H", "4H")
+    assert list(partial.confirm) == [1, 1, 0]
+    assert partial.close[-1] == 9.5
+    # Kova dolu ama son 1H bar açık → açık
+    assert resample.resample(_hourly("2025-03-05T00:00", 8, open_last=True), "1H", "4H").confirm[-1] == 0
+
+
+def test_weekly_from_hourly(engine):
+    # Çarşamba başlar: ilk (eksik) hafta atılır, sonraki pazartesiden 1 tam hafta + açık hafta
+    series = _hourly("2025-03-05T00:00", 24 * 14)
+    out = resample.resample(series, "1H", "1W")
+    assert list(out.ts) == [_ms("2025-03-10T00:00"), _ms("2025-03-17T00:00")]
+    assert list(out.confirm) == [1, 0]
+    assert out.vol[0] == 24 * 7
+
+
+def test_same_bar_and_invalid_ratio():
+    series = _hourly("2025-03-05T00:00", 3)
+    assert resample.resample(series, "1H", "1H") is series
+    with pytest.raises(ValueError):
+        resample.resample(series, "4H", "6H")
+
+
+def test_numpy_and_python_paths_agree(monkeypatch):
+    if resample.np is None:
+        pytest.skip("NumPy yok")
+    series = _hourly("2025-03-05T05:00", 24 * 20 + 7, open_last=True)
+    bars = ("4H", "1D", "1W")
+    fast = {bar: _rows(s) for bar, s in resample.resample_all(series, "1H", bars).items()}
+    monkeypatch.setattr(resample, "np", None)
+    slow = {bar: _rows(s) for bar, s in resample.resample_all(series, "1H", bars).items()}
+    assert fast == slow
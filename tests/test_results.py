@@ -0,0 +1,85 @@
+import pytest
+
+from results import ResultsStore
+
+
+def _stat(inst_id, net_delta, buy_whale=None):
+    return {
+        "inst_id": inst_id, "last": 1.0, "ema20": 1.0, "trend_tag": "UP", "net_delta": net_delta,
+        "buy_whale": buy_whale, "sell_whale": None, "mcap_class": "small",
+        "nd_pos_thr": 1.0, "nd_neg_thr": -1.0, "pct_change_24h": 0.0,
+    }
+
+
+# Gün → {sembol: net delta}; BBB 03'te negatif, DDD 02'de taranmadı
+DAYS = {
+    "2025-01-01": {"AAA": 10.0, "BBB": 5.0, "CCC": -3.0, "DDD": 1.0},
+    "2025-01-02": {"AAA": 20.0, "BBB": 5.0, "CCC": -4.0},
+    "2025-01-03": {"AAA": 30.0, "BBB": -1.0, "CCC": -5.0, "DDD": 2.0},
+    "2025-01-04": {"AAA": 40.0, "BBB": 1.0, "CCC": -6.0, "DDD": 3.0},
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = ResultsStore(str(tmp_path / "results.sqlite"))
+    for date, deltas in DAYS.items():
+        stats = {inst: _stat(inst, d) for inst, d in deltas.items()}
+        picks = {
+            "long": [stats["AAA"]],
+            "short": [stats["CCC"]],
+            "buyer": [stats[i] for i in ("BBB", "AAA") if i in stats],
+        }
+        summaries = [{"inst_id": "BTC-USDT", "last": 50_000.0, "trend": "UP", "net_delta": 1.0}, None]
+        s.save_run(date, list(stats.values()), summaries, picks)
+    yield s
+    s.close()
+
+
+def test_dates_newest_first(store):
+    assert store.dates() == sorted(DAYS, reverse=True)
+    assert store.dates(until="2025-01-02", limit=1) == ["2025-01-02"]
+
+
+def test_positive_streak(store):
+    rows = store.net_delta_streak(days=2)
+    assert [r["inst_id"] for r in rows] == ["AAA", "DDD"]
+    assert rows[0] == {"inst_id": "AAA", "days": 2, "total_delta": 70.0, "min_abs_delta": 30.0}
+    # DDD 02'de eksik: 3 günlük seride yok; BBB 03'te negatif
+    assert [r["inst_id"] for r in store.net_delta_streak(days=3)] == ["AAA"]
+
+
+def test_negative_streak_and_until(store):
+    assert [r["inst_id"] for r in store.net_delta_streak(days=4, negative=True)] == ["CCC"]
+    rows = store.net_delta_streak(days=2, until="2025-01-02")
+    assert [r["inst_id"] for r in rows] == ["AAA", "BBB"]
+    # Yeterli tarama günü yoksa seri yok
+    assert store.net_delta_streak(days=5) == []
+
+
+def test_pick_frequency(store):
+    rows = store.pick_frequency("buyer")
+    assert sorted((r["inst_id"], r["picks"]) for r in rows) == [("AAA", 4), ("BBB", 4)]
+    assert rows[0]["first"] == "2025-01-01" and rows[0]["last"] == "2025-01-04"
+    assert {(r["inst_id"], r["list"]) for r in store.pick_frequency(inst_id="AAA")} == {("AAA", "long"), ("AAA", "buyer")}
+    assert store.pick_frequency("short", since="2025-01-03")[0]["picks"] == 2
+
+
+def test_rerun_same_day_replaces_rows(store):
+    store.save_run("2025-01-04", [_stat("EEE", 9.0, {"usd": 123.0, "tier": "M"})], [], {"long": [_stat("EEE", 9.0)]})
+    day = store.day("2025-01-04")
+    assert [r["inst_id"] for r in day["alt_stats"]] == ["EEE"]
+    assert day["alt_stats"][0]["buy_whale_usd"] == 123.0 and day["alt_stats"][0]["buy_whale_tier"] == "M"
+    assert day["summaries"] == []
+    assert day["picks"] == {"long": ["EEE"], "short": [], "buyer": []}
+
+
+def test_summaries_and_history(store):
+    day = store.day("2025-01-02")
+    assert [(r["inst_id"], r["last"], r["trend"], r["momentum"]) for r in day["summaries"]] == [
+        ("BTC-USDT", 50_000.0, "UP", None)
+    ]
+    assert day["picks"]["buyer"] == ["BBB", "AAA"]
+    hist = store.history("DDD", since="2025-01-02")
+    assert [(r["date"], r["net_delta"], r["picks"]) for r in hist] == [("2025-01-03", 2.0, []), ("2025-01-04", 3.0, [])]
+    assert all(sorted(r["picks"]) == ["buyer", "long"] for r in store.history("AAA"))
@@ -0,0 +1,106 @@
+import json
+import zlib
+
+import pytest
+
+import main
+
+SHARDS = 3
+RUN_ID = "2025-01-01"
+TICKERS = [{"inst_id": f"C{i:02d}-USDT", "score": 100 - i} for i in range(30)]
+
+
+def test_shard_of_is_crc32_partition():
+    counts = [0] * SHARDS
+    for t in TICKERS:
+        s = main.shard_of(t["inst_id"], SHARDS)
+        assert s == zlib.crc32(t["inst_id"].encode("utf-8")) % SHARDS
+        counts[s] += 1
+    assert sum(counts) == len(TICKERS) and all(counts)
+    # Süreçten ve çalışmadan bağımsız (hash() gibi tuzlanmaz)
+    assert main.shard_of("BTC-USDT", 4) == 3
+
+
+class _States:
+    def save(self):
+        pass
+
+
+@pytest.fixture
+def shard_env(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "SHARD_DIR", str(tmp_path / "shards"))
+    for name in ("INDICATOR_STATE_FILE", "RUN_REPORT_FILE", "METRICS_FILE"):
+        monkeypatch.setattr(main, name, "")
+    monkeypatch.setattr(main, "indicator_states", lambda: _States())
+    monkeypatch.setattr(main, "flush_trade_archive", lambda: None)
+    # Tarama: her sembol için sahte istatistik; hangi sembollerin tarandığı kaydedilir
+    scanned = []
+
+    def scan(tickers, mcap_map, workers=1):
+        scanned.append([t["inst_id"] for t in tickers])
+        return [{"inst_id": t["inst_id"], "score": t["score"]} for t in tickers]
+
+    monkeypatch.setattr(main, "scan_altcoins", scan)
+    monkeypatch.setattr(main, "summarize_majors", lambda mcap_map: ("btc", "eth"))
+    reports = []
+    monkeypatch.setattr(
+        main, "finish_report", lambda btc, eth, alt_stats, notes=(): reports.append((alt_stats, list(notes)))
+    )
+    _, universe_path, _ = main._shard_paths(RUN_ID)
+    main._write_json_atomic(universe_path, {"run_id": RUN_ID, "shards": SHARDS, "tickers": TICKERS, "mcap_map": {}})
+    return scanned, reports
+
+
+def test_workers_split_and_merge_in_universe_order(shard_env):
+    scanned, reports = shard_env
+    for shard in range(SHARDS):
+        main.shard_worker(shard, SHARDS, RUN_ID, wait=0)
+    # Her sembol tam bir worker'da taranır
+    assert sorted(sum(scanned, [])) == sorted(t["inst_id"] for t in TICKERS)
+    for shard, names in enumerate(scanned):
+        assert all(main.shard_of(n, SHARDS) == shard for n in names)
+
+    main.shard_merge(SHARDS, RUN_ID, wait=0)
+    (alt_stats, notes), = reports
+    assert [s["inst_id"] for s in alt_stats] == [t["inst_id"] for t in TICKERS]
+    assert notes == []
+
+
+def test_merge_tolerates_missing_and_broken_parts(shard_env):
+    _, reports = shard_env
+    main.shard_worker(0, SHARDS, RUN_ID, wait=0)
+    # Shard 1 hiç yazmadı, shard 2'nin dosyası yarım kaldı (bozuk JSON)
+    broken = main._shard_paths(RUN_ID, 2, SHARDS)[2]
+    with open(broken, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"run_id": RUN_ID})[:-3])
+
+    main.shard_merge(SHARDS, RUN_ID, wait=0)
+    (alt_stats, notes), = reports
+    expected = [t["inst_id"] for t in TICKERS if main.shard_of(t["inst_id"], SHARDS) == 0]
+    assert [s["inst_id"] for s in alt_stats] == expected
+    lost = len(TICKERS) - len(expected)
+    assert len(notes) == 1
+    assert f"2/{SHARDS} tarama parçası zamanında gelmedi, {lost} sembol" in notes[0]
+    assert "(shard: 1, 2)" in notes[0]
+
+
+def test_merge_ignores_parts_from_another_run(shard_env):
+    _, reports = shard_env
+    for shard in range(SHARDS):
+        main.shard_worker(shard, SHARDS, RUN_ID, wait=0)
+    # Önceki günün part'ı aynı yola kopyalanmış gibi: run_id tutmuyorsa alınmaz
+    path = main._shard_paths(RUN_ID, 1, SHARDS)[2]
+    with open(path, encoding="utf-8") as f:
+        part = json.load(f)
+    part["run_id"] = "2024-12-31"
+    main._write_json_atomic(path, part)
+
+    main.shard_merge(SHARDS, RUN_ID, wait=0)
+    (alt_stats, notes), = reports
+    assert all(main.shard_of(s["inst_id"], SHARDS) != 1 for s in alt_stats)
+    assert "(shard: 1)" in notes[0]
+
+
+def test_worker_rejects_shard_count_mismatch(shard_env):
+    with pytest.raises(SystemExit):
+        main.shard_worker(0, SHARDS + 1, RUN_ID, wait=0)
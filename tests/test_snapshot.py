@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from snapshot import MAGIC, SnapshotReader, SnapshotWriter, request_key
+
+
+def _record(path, rows, meta=None):
+    w = SnapshotWriter(str(path), meta=meta)
+    for key, status, body in rows:
+        w.record(key, status, body)
+    w.close()
+
+
+ROWS = [
+    (request_key("GET", "https://www.okx.com/api/v5/market/tickers", {"instType": "SPOT"}), 200, b'{"code":"0"}'),
+    (request_key("GET", "https://x/api/v5/market/candles", {"instId": "ARB-USDT", "bar": "1D"}), 200, b"[1]"),
+    (request_key("GET", "https://x/api/v5/market/candles", {"bar": "1D", "instId": "ARB-USDT"}), 200, b"[2]"),
+    (request_key("GET", "https://x/api/v5/market/books", {"instId": "ARB-USDT"}), 503, b"x" * 5000),
+]
+
+
+def test_request_key_ignores_host_and_param_order():
+    a = request_key("get", "https://www.okx.com/api/v5/market/candles", {"bar": "1D", "instId": "A"})
+    b = request_key("GET", "http://127.0.0.1:8080/api/v5/market/candles", {"instId": "A", "bar": "1D"})
+    assert a == b == "GET /api/v5/market/candles?bar=1D&instId=A"
+
+
+def test_round_trip_with_repeated_keys(tmp_path):
+    path = tmp_path / "run.snap"
+    _record(path, ROWS, meta={"started": 1})
+    r = SnapshotReader(str(path))
+    try:
+        assert r.meta["started"] == 1 and r.meta["records"] == 4
+        assert r.get(ROWS[0][0]).json() == {"code": "0"}
+        # Aynı anahtar: kayıt sırasıyla, bitince son yanıt tekrarlanır
+        assert [r.get(ROWS[1][0]).content for _ in range(3)] == [b"[1]", b"[2]", b"[2]"]
+        books = r.get(ROWS[3][0])
+        assert books.status_code == 503 and books.content == b"x" * 5000
+        assert r.get("GET /api/v5/yok?") is None
+    finally:
+        r.close()
+
+
+def test_truncated_file_rebuilds_index_from_records(tmp_path):
+    path = tmp_path / "run.snap"
+    _record(path, ROWS)
+    r = SnapshotReader(str(path))
+    last = r.keys[ROWS[3][0]][0]
+    r.close()
+    # Çökme: footer/indeks yazılmadı ve son kayıt yarıda kaldı
+    with open(path, "r+b") as f:
+        f.truncate(last + 10)
+
+    r = SnapshotReader(str(path))
+    try:
+        assert r.meta == {"incomplete": True}
+        assert r.get(ROWS[0][0]).content == b'{"code":"0"}'
+        assert [r.get(ROWS[1][0]).content for _ in range(2)] == [b"[1]", b"[2]"]
+        assert r.get(ROWS[3][0]) is None
+    finally:
+        r.close()
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "not.snap"
+    path.write_bytes(b"NOTASNAP" + MAGIC)
+    with pytest.raises(ValueError):
+        SnapshotReader(str(path))
@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import main
+from orderflow import TradeColumns
+
+NOW = datetime(2025, 1, 2, tzinfo=timezone.utc)
+NOW_MS = int(NOW.timestamp() * 1000)
+HOUR = 3_600_000
+THRESHOLDS = (10_000.0, 50_000.0, 250_000.0)
+
+
+def _page(*trades):
+    """(saat önce, px, sz, side) → TradeColumns, yeniden eskiye."""
+    return TradeColumns.from_json(
+        [{"px": str(px), "sz": str(sz), "side": side, "ts": str(NOW_MS - int(h * HOUR)), "tradeId": str(1000 - i)}
+         for i, (h, px, sz, side) in enumerate(trades)]
+    )
+
+
+# Son sayfa sadece 1 saati kapsar; 20 saat önceki büyük satış ancak sayfalanınca görülür
+PAGES = [
+    _page((0.1, 2.0, 10, "buy"), (0.5, 2.0, 6_000, "buy")),
+    _page((5, 2.0, 10, "sell"), (20, 2.0, 100_000, "sell")),
+    _page((23.99, 2.0, 10, "buy")),
+]
+
+
+@pytest.fixture
+def market(monkeypatch):
+    monkeypatch.setattr(main, "_frozen_now", NOW)
+    calls = {}
+
+    def iter_trade_pages(inst_id, since_ms=None, max_trades=None, max_pages=None):
+        calls["pages"] = (since_ms, max_pages)
+        yield from PAGES[:max_pages]
+
+    monkeypatch.setattr(main, "iter_trade_pages", iter_trade_pages)
+    monkeypatch.setattr(main, "get_trades", lambda inst_id: PAGES[0])
+    rows = [(NOW_MS - 24 * HOUR + h * HOUR, 1.0, 2.0) for h in range(24)]  # (ts, sell, buy)
+    monkeypatch.setattr(main, "get_taker_volume", lambda ccy, period, begin_ms=None: calls.setdefault("taker", rows))
+    return calls
+
+
+def test_whales_are_paged_over_the_taker_window(market):
+    of = main.taker_orderflow("ALT-USDT", *THRESHOLDS, window_min=1440, max_pages=5)
+    assert market["pages"] == (NOW_MS - 24 * HOUR, 5)
+    assert of["source"] == "taker" and of["complete"]
+    # Net delta taker hacminden, en yeni trade fiyatıyla: 24 × (2 - 1) × 2.0
+    assert of["net_delta"] == pytest.approx(48.0)
+    assert of["sell_whale"]["usd"] == 200_000.0 and of["sell_whale"]["tier"] == "M"
+    assert of["buy_whale"]["usd"] == 12_000.0
+    assert of["whale_complete"] and of["whale_span_sec"] == pytest.approx(23.99 * 3600)
+
+
+def test_page_budget_limits_whale_coverage(market):
+    of = main.taker_orderflow("ALT-USDT", *THRESHOLDS, window_min=1440, max_pages=1)
+    assert of["sell_whale"] is None
+    assert not of["whale_complete"] and of["whale_span_sec"] == pytest.approx(0.5 * 3600)
+    label = main.orderflow_label(of, 60)
+    assert label == "taker hacmi, son 24 saat; whale'ler son ~30 dk"
+
+
+def test_zero_pages_uses_latest_page_only(market):
+    of = main.taker_orderflow("ALT-USDT", *THRESHOLDS, window_min=1440, max_pages=0)
+    assert "pages" not in market
+    assert of["buy_whale"]["usd"] == 12_000.0 and not of["whale_complete"]
+
+
+def test_without_taker_data_falls_back_to_paged_trades(market, monkeypatch):
+    monkeypatch.setattr(main, "get_taker_volume", lambda *a, **k: None)
+    of = main.taker_orderflow("ALT-USDT", *THRESHOLDS, window_min=1440, max_pages=5)
+    assert of["source"] == "trades" and of["window_min"] == 1440 and of["complete"]
+    assert of["net_delta"] == pytest.approx(2.0 * (10 + 6_000 + 10) - 2.0 * (10 + 100_000))
+    of = main.taker_orderflow("ALT-USDT", *THRESHOLDS, window_min=1440, max_pages=1)
+    assert not of["complete"]
+    # Trade kaynağında span_sec en eski ile en yeni trade arası (stream_orderflow ile aynı)
+    assert main.orderflow_label(of, 60) == "son ~24 dk, 2 trade — sayfa limiti"
@@ -0,0 +1,23 @@
+from telemetry import Telemetry
+
+
+def _types(text):
+    return dict(line.split()[2:4] for line in text.splitlines() if line.startswith("# TYPE"))
+
+
+def test_prometheus_types():
+    t = Telemetry(prefix="t")
+    with t.span("scan", stage=True):
+        pass
+    with t.span("scan", stage=True):
+        pass
+    t.inc("http_requests_total", endpoint="/x", status="200")
+    text = t.prometheus()
+    types = _types(text)
+    assert types["t_span_duration_seconds_total"] == "counter"
+    assert types["t_span_count"] == "counter"
+    assert types["t_http_requests_total"] == "counter"
+    assert types["t_run_duration_seconds"] == "gauge"
+    assert 't_span_count{span="scan"} 2' in text.splitlines()
+    # Her metrik için tek TYPE satırı
+    assert sum(line.startswith("# TYPE") for line in text.splitlines()) == len(types)
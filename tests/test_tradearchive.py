@@ -0,0 +1,149 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from orderflow import TradeColumns  # noqa: E402
+from tradearchive import DAY_MS, INDEX_DTYPE, RECORD_DTYPE, DayFile, TradeArchive  # noqa: E402
+
+T0 = 1_735_689_600_000  # 2025-01-01 00:00 UTC
+
+
+def _rec(ids, ts=None):
+    ids = list(ids)
+    rec = np.zeros(len(ids), dtype=RECORD_DTYPE)
+    rec["trade_id"] = ids
+    rec["ts"] = ts if ts is not None else [T0 + i * 1000 for i in ids]
+    rec["px"] = [100.0 + i for i in ids]
+    rec["sz"] = 1.5
+    rec["side"] = [1 if i % 2 else -1 for i in ids]
+    return rec
+
+
+def _day(tmp_path):
+    return DayFile(str(tmp_path / "ARB-USDT" / "2025-01-01.trades"))
+
+
+def test_append_dedupes_sorts_and_reopens(tmp_path):
+    df = _day(tmp_path)
+    assert df.append(_rec([5, 3, 4, 3])) == 3
+    assert df.append(_rec([4, 6, 1])) == 2  # 4 zaten yazılı
+    assert len(df.index) == 2
+
+    again = _day(tmp_path)
+    assert again.count == 5
+    rec = again.records()
+    assert list(rec["trade_id"]) == [3, 4, 5, 1, 6]  # blok içi ts sıralı, bloklar ekleme sırasıyla
+    assert list(again.index["min_ts"]) == [T0 + 3000, T0 + 1000]
+    assert again.append(_rec([1, 5])) == 0
+
+
+def test_uncommitted_data_tail_is_truncated(tmp_path):
+    df = _day(tmp_path)
+    df.append(_rec([1, 2, 3]))
+    # Çökme: veri yazıldı, indeks satırı yazılamadı
+    with open(df.data_path, "ab") as f:
+        f.write(_rec([4, 5]).tobytes())
+    again = _day(tmp_path)
+    assert again.count == 3
+    assert os.path.getsize(df.data_path) == 3 * RECORD_DTYPE.itemsize
+    assert again.append(_rec([4, 5])) == 2
+
+
+def test_half_written_index_row_is_dropped(tmp_path):
+    df = _day(tmp_path)
+    df.append(_rec([1, 2]))
+    df.append(_rec([3, 4]))
+    size = os.path.getsize(df.index_path)
+    with open(df.index_path, "r+b") as f:
+        f.truncate(size - INDEX_DTYPE.itemsize // 2)  # son satır yarım (np.fromfile tam satırları okur)
+    again = _day(tmp_path)
+    assert len(again.index) == 1 and again.count == 2
+    assert os.path.getsize(df.data_path) == 2 * RECORD_DTYPE.itemsize
+
+
+def test_index_beyond_data_is_cut_back(tmp_path):
+    df = _day(tmp_path)
+    df.append(_rec([1, 2]))
+    df.append(_rec([3, 4]))
+    with open(df.data_path, "r+b") as f:
+        f.truncate(3 * RECORD_DTYPE.itemsize)  # ikinci bloğun verisi eksik
+    again = _day(tmp_path)
+    assert again.count == 2 and len(again.index) == 1
+    assert list(again.records()["trade_id"]) == [1, 2]
+
+
+def test_inconsistent_blocks_are_rewritten_sorted(tmp_path):
+    df = _day(tmp_path)
+    df.append(_rec([5, 6]))
+    df.append(_rec([1, 2]))
+    index = np.fromfile(df.index_path, dtype=INDEX_DTYPE)
+    index[1]["min_ts"] = 0  # indeksle tutmayan blok sınırı
+    index.tofile(df.index_path)
+    again = _day(tmp_path)
+    assert len(again.index) == 1
+    assert list(again.records()["trade_id"]) == [1, 2, 5, 6]
+
+
+def test_slices_cut_each_block_to_the_window(tmp_path):
+    df = _day(tmp_path)
+    df.append(_rec(range(0, 10)))
+    df.append(_rec(range(10, 20)))
+    got = [list(s["trade_id"]) for s in df.slices(T0 + 5000, T0 + 13000)]
+    assert got == [[5, 6, 7, 8, 9], [10, 11, 12]]
+    assert list(df.slices(T0 + 30_000, T0 + 40_000)) == []
+    assert df.compact() == 2
+    assert [list(s["trade_id"]) for s in df.slices(T0 + 5000, T0 + 13000)] == [list(range(5, 13))]
+
+
+def test_archive_splits_days_and_round_trips_columns(tmp_path):
+    archive = TradeArchive(str(tmp_path), flush_records=1_000_000)
+    ids = list(range(100))
+    ts = [T0 + DAY_MS - 50_000 + i * 1000 for i in ids]  # gece yarısını geçer
+    trades = [
+        {"tradeId": str(i), "px": "100", "sz": "2", "side": "buy" if i % 2 else "sell", "ts": str(t)}
+        for i, t in zip(ids, ts)
+    ]
+    archive.append("ARB-USDT", TradeColumns.from_json(trades))
+    assert archive.days("ARB-USDT") == []  # flush'a kadar bellekte
+    assert archive.flush() == 100
+    assert archive.days("ARB-USDT") == ["2025-01-01", "2025-01-02"]
+
+    window = list(archive.columns("ARB-USDT", T0 + DAY_MS - 10_000, T0 + DAY_MS + 10_000))
+    got = np.concatenate([np.asarray(c.trade_id) for c in window])
+    assert list(got) == list(range(40, 60))
+    assert sum(r["trades"] for r in archive.stats("ARB-USDT")) == 100
+
+
+def test_flush_evicts_days_outside_keep_window(tmp_path):
+    archive = TradeArchive(str(tmp_path), keep_days=2)
+    archive.append("ARB-USDT", _rec([1, 2]))
+    archive.append("OP-USDT", _rec([1], ts=[T0 + DAY_MS + 5]))
+    archive.flush()
+    first = archive._day("ARB-USDT", "2025-01-01")
+    first.records()
+    assert set(archive._days) == {("ARB-USDT", "2025-01-01"), ("OP-USDT", "2025-01-02")}
+
+    # 2025-01-03 trade'i gelince sadece 02 ve 03 açık kalır; 01 kapatılıp düşülür
+    archive.append("ARB-USDT", _rec([3], ts=[T0 + 2 * DAY_MS + 7]))
+    archive.flush()
+    assert set(archive._days) == {("OP-USDT", "2025-01-02"), ("ARB-USDT", "2025-01-03")}
+    assert first._map is None and first._ids is None
+
+    # Düşülen gün diskten yeniden açılır, tekrarlar yine elenir
+    archive.append("ARB-USDT", _rec([2, 4], ts=[T0 + 2000, T0 + 4000]))
+    assert archive.flush() == 1
+    assert sorted(int(i) for s in archive.slices("ARB-USDT", T0, T0 + DAY_MS) for i in s["trade_id"]) == [1, 2, 4]
+
+
+def test_compact_does_not_cache_old_days(tmp_path):
+    archive = TradeArchive(str(tmp_path))
+    for ids in ([1, 2], [3]):
+        archive.append("ARB-USDT", _rec(ids))
+        archive.flush()
+    archive.close()
+    assert archive._days == {}
+    assert archive.compact(before="2025-01-02") == 1
+    assert archive._days == {}
+    assert [r["blocks"] for r in archive.stats("ARB-USDT")] == [1]
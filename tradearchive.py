@@ -0,0 +1,365 @@
+"""
+Enstrüman ve gün başına, sadece eklenen (append-only) trade arşivi.
+
+    <root>/<INST_ID>/<YYYY-MM-DD>.trades   40 baytlık sabit genişlikte kayıtlar (RECORD_DTYPE)
+    <root>/<INST_ID>/<YYYY-MM-DD>.idx      blok indeksi, blok başına 32 bayt (INDEX_DTYPE)
+
+Gün, trade'in ts'ine göre UTC günüdür. Her yazım bir bloktur: blok içi ts'e göre sıralı,
+indeks satırı (ilk kayıt, kayıt sayısı, min ts, max ts). Okuyucu .trades dosyasını mmap'ler;
+bir zaman aralığı için sadece aralıkla kesişen bloklara bakılır, blok içinde searchsorted ile
+kesilir. Dönen kolonlar mmap üzerinde kopyasız NumPy view'larıdır (TradeColumns), doğrudan
+orderflow_kernel'e gider: JSON ayrıştırma, kopya, API çağrısı yok. compact() bir günü tek
+sıralı bloğa indirir (gün kapandıktan sonra okumayı hızlandırır).
+
+- Tekrar: aynı tradeId bir günde bir kez yazılır (REST sayfaları, WS yeniden bağlanma üst üste biner)
+- Çökme: veri indeksten önce yazılır; açılışta indeksin kapsamadığı kuyruk kesilir, indeksle
+  tutmayan blok sınırları görülürse gün baştan sıralanıp tek bloğa yazılır
+- Tek yazıcı süreç varsayılır; okuyucular (aynı ya da başka süreç) istediği kadar olabilir
+
+    python tradearchive.py data/trades stats ARB-USDT
+    python tradearchive.py data/trades compact --before 2025-01-10
+"""
+
+import argparse
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+from orderflow import TradeColumns
+
+DAY_MS = 86_400_000
+FLUSH_RECORDS = 20_000  # Bellekte biriken trade bu sayıyı geçince diske yazılır
+KEEP_DAYS = 2  # Açık tutulan gün dosyaları: en yeni trade günü + önceki gün (geç gelen trade'ler)
+
+RECORD_DTYPE = np.dtype([
+    ("ts", "<i8"),
+    ("trade_id", "<i8"),
+    ("px", "<f8"),
+    ("sz", "<f8"),
+    ("side", "i1"),
+    ("_pad", "V7"),  # 8 bayt hizası
+])
+INDEX_DTYPE = np.dtype([("start", "<i8"), ("count", "<i8"), ("min_ts", "<i8"), ("max_ts", "<i8")])
+
+
+def day_of(ts_ms):
+    return datetime.fromtimestamp(ts_ms // DAY_MS * DAY_MS / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def day_start_ms(day):
+    return int(datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def to_records(cols):
+    """TradeColumns → RECORD_DTYPE dizisi. ts'i ya da tradeId'si olmayan trade'ler alınmaz."""
+    n = len(cols)
+    rec = np.zeros(n, dtype=RECORD_DTYPE)
+    if not n:
+        return rec
+    rec["ts"] = _col(cols.ts, np.int64)
+    rec["trade_id"] = _col(cols.trade_id, np.int64)
+    rec["px"] = _col(cols.px, np.float64)
+    rec["sz"] = _col(cols.sz, np.float64)
+    rec["side"] = _col(cols.side, np.int8)
+    return rec[(rec["ts"] >= 0) & (rec["trade_id"] >= 0) & (rec["side"] != 0)]
+
+
+def columns_of(rec):
+    """RECORD_DTYPE dizisi (ya da mmap dilimi) → TradeColumns; kolonlar kopyasız strided view."""
+    return TradeColumns(rec["px"], rec["sz"], rec["side"], rec["ts"], rec["trade_id"])
+
+
+def _col(col, dtype):
+    return col if isinstance(col, np.ndarray) else np.frombuffer(col, dtype=dtype)
+
+
+class DayFile:
+    """Bir enstrümanın bir günü: .trades + .idx çifti."""
+
+    def __init__(self, data_path):
+        self.data_path = data_path
+        self.index_path = data_path[: -len(".trades")] + ".idx"
+        self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        self.count = 0
+        self._map = None
+        self._ids = None
+        self._lock = threading.Lock()
+        if os.path.exists(self.index_path):
+            self._open()
+
+    def _open(self):
+        index = np.fromfile(self.index_path, dtype=INDEX_DTYPE)
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        # İndeksi yarım yazılmış satır ya da verisi eksik bloklar: son tutarlı bloğa kadar
+        committed = 0
+        good = 0
+        for row in index:
+            if row["start"] != committed or (committed + row["count"]) * RECORD_DTYPE.itemsize > size:
+                break
+            committed += int(row["count"])
+            good += 1
+        if good < len(index):
+            index = index[:good]
+            _write_atomic(self.index_path, index.tobytes())
+        if size > committed * RECORD_DTYPE.itemsize:
+            # İndekse girmemiş kuyruk: çökme öncesi yazılmış, commit edilmemiş veri
+            with open(self.data_path, "r+b") as f:
+                f.truncate(committed * RECORD_DTYPE.itemsize)
+        self.index = index
+        self.count = committed
+        if not self._blocks_ok():
+            self._rewrite(np.array(self.records()))
+
+    def _blocks_ok(self):
+        rec = self.records()
+        for row in self.index:
+            s, n = int(row["start"]), int(row["count"])
+            if n and (rec["ts"][s] != row["min_ts"] or rec["ts"][s + n - 1] != row["max_ts"]):
+                return False
+        return True
+
+    def close(self):
+        """mmap ve tradeId dizisini bırakır; dışarıda kalan view'lar kendi referanslarıyla geçerli kalır."""
+        with self._lock:
+            self._map = None
+            self._ids = None
+
+    def records(self):
+        """Tüm kayıtlar (salt okunur mmap view). Dosya büyüdükçe yeniden map'lenir."""
+        if not self.count:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+        if self._map is None or len(self._map) != self.count:
+            self._map = np.memmap(self.data_path, dtype=RECORD_DTYPE, mode="r", shape=(self.count,))
+        return self._map
+
+    def _known_ids(self):
+        if self._ids is None:
+            self._ids = np.sort(np.asarray(self.records()["trade_id"]))
+        return self._ids
+
+    def append(self, rec):
+        """Yeni trade'leri tek blok olarak ekler. Dönüş: yazılan (tekrar olmayan) kayıt sayısı."""
+        with self._lock:
+            _, first = np.unique(rec["trade_id"], return_index=True)
+            rec = rec[first]
+            known = self._known_ids()
+            if len(known):
+                rec = rec[~np.isin(rec["trade_id"], known, assume_unique=True)]
+            if not len(rec):
+                return 0
+            rec = rec[np.lexsort((rec["trade_id"], rec["ts"]))]
+            row = np.array([(self.count, len(rec), rec["ts"][0], rec["ts"][-1])], dtype=INDEX_DTYPE)
+            os.makedirs(os.path.dirname(self.data_path), exist_ok=True)
+            with open(self.data_path, "ab") as f:
+                f.write(rec.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.index_path, "ab") as f:
+                f.write(row.tobytes())
+            self.index = np.concatenate([self.index, row])
+            self.count += len(rec)
+            self._ids = np.union1d(known, rec["trade_id"])
+            return len(rec)
+
+    def slices(self, start_ms, end_ms):
+        """[start_ms, end_ms) aralığındaki kayıtlar: blok başına bir kopyasız dilim."""
+        rec = self.records()
+        for row in self.index:
+            if row["max_ts"] < start_ms or row["min_ts"] >= end_ms:
+                continue
+            s, n = int(row["start"]), int(row["count"])
+            block = rec[s:s + n]
+            lo = int(np.searchsorted(block["ts"], start_ms, side="left")) if row["min_ts"] < start_ms else 0
+            hi = int(np.searchsorted(block["ts"], end_ms, side="left")) if row["max_ts"] >= end_ms else n
+            if hi > lo:
+                yield block[lo:hi]
+
+    def compact(self):
+        """Günü ts sırasıyla tek bloğa yeniden yazar. Dönüş: önceki blok sayısı."""
+        with self._lock:
+            blocks = len(self.index)
+            if blocks > 1:
+                self._rewrite(np.array(self.records()))
+            return blocks
+
+    def _rewrite(self, rec):
+        rec = rec[np.lexsort((rec["trade_id"], rec["ts"]))]
+        self._map = None
+        # Önce veri, sonra indeks; arada çökerse açılıştaki blok kontrolü yeniden yazar
+        _write_atomic(self.data_path, rec.tobytes())
+        index = np.array([(0, len(rec), rec["ts"][0], rec["ts"][-1])] if len(rec) else [], dtype=INDEX_DTYPE)
+        _write_atomic(self.index_path, index.tobytes())
+        self.index = index
+        self.count = len(rec)
+        self._ids = None
+
+
+def _write_atomic(path, raw):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class TradeArchive:
+    """
+    Kök dizindeki tüm enstrümanlar. append() bellekte biriktirir (WS'de mesaj başına birkaç
+    trade gelir, her biri ayrı blok olmasın), flush() ya da FLUSH_RECORDS'a ulaşınca yazar.
+    Her flush'ta son keep_days gün (en yeni trade gününe göre) dışındaki DayFile'lar kapatılıp
+    önbellekten düşülür: uzun süren WS sürecinde mmap ve id dizileri günlerle birikmez.
+    """
+
+    def __init__(self, root, flush_records=FLUSH_RECORDS, keep_days=KEEP_DAYS):
+        self.root = root
+        self.flush_records = flush_records
+        self.keep_days = keep_days
+        self._days = {}
+        self._pending = {}
+        self._pending_n = 0
+        self._newest_ms = None
+        self._lock = threading.Lock()
+        # Yazımlar (flush, compact) sırayla: düşülen bir DayFile'a başka thread'den yazılmaz
+        self._write_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _day(self, inst_id, day, cache=True):
+        """cache=False: önbellekte yoksa önbelleğe girmeyen geçici DayFile (bakım işleri için)."""
+        key = (inst_id, day)
+        with self._lock:
+            df = self._days.get(key)
+            if df is None:
+                df = DayFile(os.path.join(self.root, inst_id, f"{day}.trades"))
+                if cache:
+                    self._days[key] = df
+            return df
+
+    def append(self, inst_id, cols):
+        """TradeColumns ya da RECORD_DTYPE dizisi; yazım flush'ta."""
+        rec = cols if isinstance(cols, np.ndarray) else to_records(cols)
+        if not len(rec):
+            return
+        with self._lock:
+            self._pending.setdefault(inst_id, []).append(rec)
+            self._pending_n += len(rec)
+            full = self._pending_n >= self.flush_records
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Biriken trade'leri gün dosyalarına yazar. Dönüş: yazılan (yeni) trade sayısı."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending, self._pending_n = self._pending, {}, 0
+            written = 0
+            for inst_id, parts in pending.items():
+                rec = np.concatenate(parts)
+                days = rec["ts"] // DAY_MS
+                for d in np.unique(days):
+                    written += self._day(inst_id, day_of(int(d) * DAY_MS)).append(rec[days == d])
+                newest = int(rec["ts"].max())
+                if self._newest_ms is None or newest > self._newest_ms:
+                    self._newest_ms = newest
+            self._evict()
+            return written
+
+    def _evict(self):
+        """Son keep_days gün dışındaki DayFile'ları kapatıp önbellekten düşer (yazma kilidi altında)."""
+        if self._newest_ms is None:
+            return
+        oldest_kept = day_of(self._newest_ms - (self.keep_days - 1) * DAY_MS)
+        with self._lock:
+            old = [key for key in self._days if key[1] < oldest_kept]
+            dropped = [self._days.pop(key) for key in old]
+        for df in dropped:
+            df.close()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            dropped, self._days = list(self._days.values()), {}
+        for df in dropped:
+            df.close()
+
+    # ------------ Okuma ------------
+
+    def instruments(self):
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def days(self, inst_id):
+        path = os.path.join(self.root, inst_id)
+        if not os.path.isdir(path):
+            return []
+        return sorted(name[: -len(".trades")] for name in os.listdir(path) if name.endswith(".trades"))
+
+    def slices(self, inst_id, start_ms, end_ms):
+        """[start_ms, end_ms) aralığındaki kayıtlar, eskiden yeniye gün/blok dilimleri (kopyasız)."""
+        first, last = day_start_ms(day_of(start_ms)), end_ms
+        for day in self.days(inst_id):
+            d0 = day_start_ms(day)
+            if d0 + DAY_MS <= first or d0 >= last:
+                continue
+            yield from self._day(inst_id, day).slices(start_ms, end_ms)
+
+    def columns(self, inst_id, start_ms, end_ms):
+        """slices() → TradeColumns (OrderflowAggregator.add'e doğrudan verilir)."""
+        for rec in self.slices(inst_id, start_ms, end_ms):
+            yield columns_of(rec)
+
+    def stats(self, inst_id):
+        """Gün başına {"day", "trades", "blocks", "bytes", "first_ts", "last_ts"}."""
+        out = []
+        for day in self.days(inst_id):
+            df = self._day(inst_id, day)
+            idx = df.index
+            out.append({
+                "day": day,
+                "trades": df.count,
+                "blocks": len(idx),
+                "bytes": df.count * RECORD_DTYPE.itemsize,
+                "first_ts": int(idx["min_ts"].min()) if len(idx) else None,
+                "last_ts": int(idx["max_ts"].max()) if len(idx) else None,
+            })
+        return out
+
+    def compact(self, inst_id=None, before=None):
+        """before (YYYY-MM-DD) öncesi günleri tek bloğa indirir. Dönüş: sıkıştırılan gün sayısı."""
+        done = 0
+        with self._write_lock:
+            for inst in [inst_id] if inst_id else self.instruments():
+                for day in self.days(inst):
+                    if before and day >= before:
+                        continue
+                    # Yazma kilidi altında: önbellekte olmayan gün için başka DayFile nesnesi yok
+                    if self._day(inst, day, cache=False).compact() > 1:
+                        done += 1
+        return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trade arşivi: gün dosyaları, blok sayıları, sıkıştırma")
+    default_root = os.getenv("TRADE_ARCHIVE_DIR") or os.path.join(os.getenv("DATA_DIR", "data"), "trades")
+    parser.add_argument("root", nargs="?", default=default_root)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("stats", help="Enstrümanın gün dosyaları")
+    p.add_argument("inst_id", nargs="?")
+    p = sub.add_parser("compact", help="Günleri tek sıralı bloğa indir")
+    p.add_argument("--inst")
+    p.add_argument("--before", help="YYYY-MM-DD (varsayılan: bugün hariç hepsi)")
+    args = parser.parse_args()
+
+    archive = TradeArchive(args.root)
+    if args.cmd == "stats":
+        for inst in [args.inst_id.upper()] if args.inst_id else archive.instruments():
+            for r in archive.stats(inst):
+                print(f"  {inst:<16} {r['day']}  {r['trades']:>10,} trade  {r['blocks']:>5} blok  {r['bytes'] / 1e6:8.1f} MB")
+    else:
+        before = args.before or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        print(f"{archive.compact(args.inst.upper() if args.inst else None, before)} gün sıkıştırıldı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Küçük, bağımlılıksız WebSocket istemcisi (RFC 6455, sadece metin mesajları).
+
+OKX public kanalları için yeterli olanı yapar: ws:// ve wss:// bağlantı,
+handshake doğrulama, maskeli metin gönderme, parçalı (fragmented) mesaj
+birleştirme, ping → pong ve close. Çerçeve fonksiyonları yerel stand-in
+sunucu (replay_server.py) tarafından da kullanılır.
+"""
+
+import base64
+import hashlib
+import os
+import socket
+import ssl
+import struct
+from urllib.parse import urlsplit
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class WebSocketClosed(ConnectionError):
+    pass
+
+
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def encode_frame(payload, opcode=OP_TEXT, mask=True):
+    """Tek (FIN) çerçeve. İstemci → sunucu çerçeveleri maskeli olmak zorunda."""
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    head = bytearray([0x80 | opcode])
+    n = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if n < 126:
+        head.append(mask_bit | n)
+    elif n < 1 << 16:
+        head.append(mask_bit | 126)
+        head += struct.pack("!H", n)
+    else:
+        head.append(mask_bit | 127)
+        head += struct.pack("!Q", n)
+    if not mask:
+        return bytes(head) + payload
+    key = os.urandom(4)
+    return bytes(head) + key + _xor(payload, key)
+
+
+def _xor(data, key):
+    if not data:
+        return b""
+    # 4 baytlık anahtarı veri boyuna genişletip tek seferde XOR
+    n = len(data)
+    full = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(full, "big")).to_bytes(n, "big")
+
+
+def _read_exact(rfile, n):
+    buf = rfile.read(n)
+    if buf is None or len(buf) < n:
+        raise WebSocketClosed("bağlantı kapandı")
+    return buf
+
+
+def read_frame(rfile):
+    """(fin, opcode, payload) okur; maskeli çerçeveler çözülür."""
+    b1, b2 = _read_exact(rfile, 2)
+    fin = bool(b1 & 0x80)
+    opcode = b1 & 0x0F
+    n = b2 & 0x7F
+    if n == 126:
+        (n,) = struct.unpack("!H", _read_exact(rfile, 2))
+    elif n == 127:
+        (n,) = struct.unpack("!Q", _read_exact(rfile, 8))
+    key = _read_exact(rfile, 4) if b2 & 0x80 else None
+    payload = _read_exact(rfile, n) if n else b""
+    if key:
+        payload = _xor(payload, key)
+    return fin, opcode, payload
+
+
+class SocketReader:
+    """
+    socket.recv üstünde küçük tampon. makefile() aksine zaman aşımından sonra
+    kullanılmaya devam edilebilir: yarım okunan veri tamponda kalır.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buf = bytearray()
+
+    def fill(self):
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise WebSocketClosed("bağlantı kapandı")
+        self.buf += chunk
+
+    def read(self, n):
+        while len(self.buf) < n:
+            self.fill()
+        out = bytes(self.buf[:n])
+        del self.buf[:n]
+        return out
+
+    def readline(self):
+        while b"\n" not in self.buf:
+            self.fill()
+        i = self.buf.index(b"\n") + 1
+        out = bytes(self.buf[:i])
+        del self.buf[:i]
+        return out
+
+
+class WebSocketClient:
+    """
+    Bloklayan WebSocket istemcisi.
+    recv(timeout) bir metin mesajı döndürür; süre dolarsa None.
+    """
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        self.sock = None
+        self.rfile = None
+
+    def connect(self):
+        parts = urlsplit(self.url)
+        secure = parts.scheme == "wss"
+        host = parts.hostname
+        port = parts.port or (443 if secure else 80)
+        sock = socket.create_connection((host, port), timeout=self.timeout)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        request = (
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        )
+        sock.sendall(request.encode())
+
+        rfile = SocketReader(sock)
+        status = rfile.readline().decode("latin-1")
+        headers = {}
+        while True:
+            line = rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if " 101 " not in status or headers.get("sec-websocket-accept") != accept_key(key):
+            sock.close()
+            raise ConnectionError(f"WebSocket handshake başarısız: {status.strip()}")
+
+        self.sock = sock
+        self.rfile = rfile
+        return self
+
+    def send_text(self, text):
+        self.sock.sendall(encode_frame(text, OP_TEXT))
+
+    def recv(self, timeout=None):
+        parts = []
+        while True:
+            # Zaman aşımı sadece yeni mesajın ilk baytını beklerken uygulanır;
+            # çerçeve başladıktan sonra tamamı normal süreyle okunur (yarım çerçeve kaybolmaz)
+            if not parts and not self.rfile.buf:
+                self.sock.settimeout(timeout)
+                try:
+                    self.rfile.fill()
+                except socket.timeout:
+                    return None
+            self.sock.settimeout(self.timeout)
+            fin, opcode, payload = read_frame(self.rfile)
+            if opcode == OP_PING:
+                self.sock.sendall(encode_frame(payload, OP_PONG))
+            elif opcode == OP_CLOSE:
+                self.close()
+                raise WebSocketClosed("sunucu bağlantıyı kapattı")
+            elif opcode in (OP_TEXT, OP_BINARY, OP_CONT):
+                parts.append(payload)
+                if fin:
+                    return b"".join(parts).decode("utf-8")
+
+    def close(self):
+        if self.sock is None:
+            return
+        try:
+            self.sock.sendall(encode_frame(b"", OP_CLOSE))
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        finally:
+            self.sock = None
+            self.rfile = None